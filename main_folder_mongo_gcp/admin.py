@@ -4,26 +4,27 @@ from telegram.ext import (ContextTypes, ConversationHandler, CommandHandler, Mes
                           filters, CallbackQueryHandler
                           )
 from util.utils import refresh_user_commands, confirm_action
-from config import (SUPER_ADMIN_ID, SOLANA_RPC,
+from config import (SUPER_ADMIN_ID,
                     TOKEN_PROGRAM_ID, SYSTEM_PROGRAM_ID, LIST_WALLET_PAGE, WALLET_PAGE_SIZE
                     )
 
 import storage.tiers as tiers
 import storage.payout as payout
+import storage.wallets as wallets
 import storage.user_collection as user_collection
 
 from base58 import b58decode
 from solders.keypair import Keypair # type: ignore
 from solders.pubkey import Pubkey # type: ignore
-from solana.rpc.api import Client
 
-from pwd_loader.env_loader import get_wallet_password
-from secrets_key import encrypt_key
 from storage.payout import add_wallets_to_payout_bulk
 import storage.rpcs as rpcs
+from util.rpc_pool import RPC_POOL
 
 import secrets_key as secrets_key
 import util.wallet_sync as wallet_sync
+import util.wallet_provisioning as wallet_provisioning
+import util.display_names as display_names
 import util.manual_upgrade as manual_upgrade
 import storage.payment_logs as payment_logs
 import logging
@@ -41,8 +42,6 @@ MANUAL_USER_ID, MANUAL_TX_SIG, MANUAL_PAYMENT_ID = range(3)
 ASK_USER_ID, ASK_PAYMENT_ID = range(2)
 # ADMINS = set()
 
-SOLANA_CLIENT = Client(SOLANA_RPC)
-
 logger = logging.getLogger(__name__)
 
 # --- Super Admin ID ---
@@ -222,40 +221,8 @@ async def addwallet(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ No valid secret keys provided.")
         return
 
-    # Ensure DECRYPTED_WALLETS is populated
-    await secrets_key.load_encrypted_keys()
-
-    added = []
-    failed = []
-    password = get_wallet_password()
-
-    # Fetch existing secrets from cache
-    secret_data = {
-        address: encrypt_key(key, password)
-        for address, key in secrets_key.DECRYPTED_WALLETS.items()
-    }
-
-    for base58_secret in base58_keys:
-        try:
-            secret_bytes = b58decode(base58_secret)
-            keypair = Keypair.from_bytes(secret_bytes)
-            address = str(keypair.pubkey())
-
-            if address in secret_data:
-                failed.append((address, "Already exists"))
-                continue
-
-            encrypted_key = encrypt_key(base58_secret, password)
-            secret_data[address] = encrypted_key
-            secrets_key.DECRYPTED_WALLETS[address] = base58_secret
-            added.append(address)
-
-        except Exception as e:
-            failed.append((base58_secret[:6] + "...", str(e)))
-
-    await secrets_key.persist_encrypted_keys(secret_data)
-    await wallet_sync.sync_wallets_from_secrets()
-    await wallet_sync.purge_orphan_wallets()
+    # Keys are validated, encrypted and QR-rendered on a process pool
+    added, failed = await wallet_provisioning.import_deposit_wallets(base58_keys)
 
     msg = ""
     if added:
@@ -265,6 +232,33 @@ async def addwallet(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     await update.message.reply_text(msg.strip())
 
+
+# --- Super Admin Command: Generate deposit wallets ---
+@restricted_to_super_admin
+async def genwallets(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    usage = f"Usage: /gw <count> (1-{wallet_provisioning.MAX_PROVISION_COUNT})"
+    if len(context.args) != 1 or not context.args[0].isdigit():
+        await update.message.reply_text(usage)
+        return
+
+    count = int(context.args[0])
+    if not 1 <= count <= wallet_provisioning.MAX_PROVISION_COUNT:
+        await update.message.reply_text(usage)
+        return
+
+    await update.message.reply_text(f"⏳ Generating {count} deposit wallet(s), please wait...")
+
+    try:
+        added = await wallet_provisioning.generate_deposit_wallets(count)
+    except Exception as e:
+        logger.error(f"❌ Deposit wallet generation failed: {e}")
+        await update.message.reply_text(f"❌ Wallet generation failed: {e}")
+        return
+
+    await update.message.reply_text(
+        f"✅ Added {len(added)} deposit wallet(s). Pool size: {len(wallets.get_all_addresses())}"
+    )
+
 @restricted_to_super_admin
 # async def addpayout(update: Update, context: ContextTypes.DEFAULT_TYPE):
 #     if not context.args:
@@ -365,7 +359,7 @@ async def addpayout(update: Update, context: ContextTypes.DEFAULT_TYPE):
             continue
 
         try:
-            resp = SOLANA_CLIENT.get_account_info(pubkey)
+            resp = await RPC_POOL.call("get_account_info", pubkey)
 
             if resp is None or resp.value is None:
                 valid_new.append(addr)
@@ -427,14 +421,14 @@ async def receive_user_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def receive_payment_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     payment_id = update.message.text.strip()
     user_id = context.user_data.get("query_user_id")
-    logs = payment_logs.PAYMENT_LOGS.get(str(user_id), {})
-    entry = logs.get(payment_id)
-    action = entry.get('action') if entry.get('action') else "Upgrade"
+    entry = await payment_logs.get_user_payment(user_id, payment_id)
 
     if not entry:
         await update.message.reply_text("❌ No matching payment log found.")
         return ConversationHandler.END
 
+    action = entry.get('action') if entry.get('action') else "Upgrade"
+
     msg = (
         f"📄 *Payment Log Found:*\n\n"
         f"📄 Action: {action}\n"
@@ -445,7 +439,7 @@ async def receive_payment_id(update: Update, context: ContextTypes.DEFAULT_TYPE)
         f"💰 Amount: {entry.get('amount_in_usdc')} USDC ≈ {entry.get('amount_in_sol')} SOL\n"
         f"🏦 Wallet: `{entry.get('payment_wallet')}`\n\n"
         f"🕓 Timestamp: {entry.get('start_time')}\n"
-        f"🔗 TX Signature: `{entry.get('tx_sig', 'Not submitted')}`"
+        f"🔗 TX Signature: `{entry.get('tx_sig') or entry.get('submitted_tx_sig', 'Not submitted')}`"
     )
 
     await update.message.reply_text(msg, parse_mode="Markdown")
@@ -484,8 +478,7 @@ async def manual_receive_tx_sig(update: Update, context: ContextTypes.DEFAULT_TY
 async def manual_receive_payment_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     payment_id = update.message.text.strip()
     user_id = context.user_data.get("manual_user_id")
-    logs = payment_logs.PAYMENT_LOGS.get(str(user_id), {})
-    payment = logs.get(payment_id)
+    payment = await payment_logs.get_user_payment(user_id, payment_id)
     context.user_data["manual_payment_id"] = payment_id # Saving payment refernce to user data
 
 
@@ -496,9 +489,11 @@ async def manual_receive_payment_id(update: Update, context: ContextTypes.DEFAUL
 
     tx_sig = context.user_data.get("manual_tx_sig")
     if tx_sig:
+        # Admin-verified signature; the unique index rejects one already used
+        if not await payment_logs.claim_tx_sig(user_id, payment_id, tx_sig):
+            await update.message.reply_text("⚠️ This transaction signature is already linked to another payment.")
+            return ConversationHandler.END
         payment["tx_sig"] = tx_sig
-        # Persist the changes to database
-        await payment_logs.log_user_payment(user_id, payment_id, payment)
 
     await manual_upgrade.complete_verified_upgrade(int(user_id), payment, context)
     await update.message.reply_text("✅ Manual upgrade completed and payment forwarded.")
@@ -521,44 +516,27 @@ manual_upgrade_conv = ConversationHandler(
 @restricted_to_admin
 async def list_referrals(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Admin command to view referral data for all users or a specific user."""
-    
-    await user_collection.load_user_collection_from_mongo()
-
-    # Filter users that have a referral section
-    referral_users = {
-        uid: doc["referral"]
-        for uid, doc in user_collection.USER_COLLECTION.items()
-        if "referral" in doc
-    }
 
     if not context.args:
-        if not referral_users:
+        # Indexed top-K query; the live user cache is never reloaded here
+        top_referrers = await user_collection.get_top_referrers(5)
+        if not top_referrers:
             await update.message.reply_text("📊 No referral data found in the system.")
             return
 
-        # Sort by total_commission
-        sorted_referrers = sorted(
-            referral_users.items(),
-            key=lambda x: x[1].get("total_commission", 0),
-            reverse=True
-        )
+        names = await display_names.get_display_names(context.bot, [doc["_id"] for doc in top_referrers])
 
         msg = "📊 *Referral Program Summary*\n\n"
 
-        for user_id, data in sorted_referrers[:5]:  # top 5
-            try:
-                user_info = await context.bot.get_chat(int(user_id))
-                user_name = user_info.full_name or f"User {user_id}"
-            except:
-                user_name = f"User {user_id}"
-
+        for data in top_referrers:
+            user_id = data["_id"]
             msg += (
-                f"👤 *{user_name}* (ID: `{user_id}`)\n"
-                f"  • All Time Referrals: {data.get('total_referred', 0)}\n"
-                f"  • Successful Referrals: {data.get('successful_referrals', 0)}\n"
-                f"  • Pending Referrals: {len(data.get('referred_users', []))}\n"
-                f"  • Total Commission: ${data.get('total_commission', 0):.2f}\n"
-                f"  • Paid: ${data.get('total_paid', 0):.2f}\n"
+                f"👤 *{names[str(user_id)]}* (ID: `{user_id}`)\n"
+                f"  • All Time Referrals: {data.get('total_referred') or 0}\n"
+                f"  • Successful Referrals: {data.get('successful_referrals') or 0}\n"
+                f"  • Pending Referrals: {data.get('pending_referrals', 0)}\n"
+                f"  • Total Commission: ${data.get('total_commission') or 0:.2f}\n"
+                f"  • Paid: ${data.get('total_paid') or 0:.2f}\n"
             )
 
             if data.get("tx_sig"):
@@ -577,12 +555,7 @@ async def list_referrals(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         data = user_collection.USER_COLLECTION[user_id]["referral"]
-
-        try:
-            user_info = await context.bot.get_chat(int(user_id))
-            user_name = user_info.full_name or f"User {user_id}"
-        except:
-            user_name = f"User {user_id}"
+        user_name = await display_names.get_display_name(context.bot, user_id)
 
         msg = f"📊 *Referral Data for {user_name}* (ID: `{user_id}`)\n\n"
         msg += (
@@ -816,16 +789,10 @@ async def handle_removewallet_callback(update: Update, context: ContextTypes.DEF
                 if wallet_sync.is_wallet_in_use(addr):
                     skipped.append(addr)
                     continue
-                del secrets_key.DECRYPTED_WALLETS[addr]
                 removed.append(addr)
 
         if removed:
-            password = get_wallet_password()
-            encrypted_data = {
-                a: encrypt_key(k, password)
-                for a, k in secrets_key.DECRYPTED_WALLETS.items()
-            }
-            await secrets_key.persist_encrypted_keys(encrypted_data)
+            await secrets_key.remove_encrypted_keys(removed)
 
             await wallet_sync.sync_wallets_from_secrets()
             await wallet_sync.purge_orphan_wallets()
@@ -993,7 +960,8 @@ async def listrpc(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # Step 3: Display the list
     rpc_list = "\n".join([f"{i+1}. {rpc}" for i, rpc in enumerate(rpcs.RPC_LIST)])
-    await update.message.reply_text(f"📡 Current RPC Endpoints:\n{rpc_list}")
+    health = "\n".join(RPC_POOL.status_lines())
+    await update.message.reply_text(f"📡 Current RPC Endpoints:\n{rpc_list}\n\n🩺 Pool health:\n{health}")
 
 
 def register_wallet_commands(app):
@@ -0,0 +1,35 @@
+# backfill_payment_records.py
+
+import asyncio
+from pymongo import UpdateOne
+from mongo_client import connect, disconnect, get_collection
+from storage.payment_collection import CONFIG_DOC_IDS, ensure_payment_indexes, record_fields
+
+async def backfill_payment_records():
+    # Connect to MongoDB
+    await connect()
+    payments = get_collection("payments")
+    records = get_collection("payment_records")
+
+    # One record per payment_id, copied from the per-user payment maps
+    operations = []
+    cursor = payments.find({"_id": {"$nin": list(CONFIG_DOC_IDS)}}, {"payments": 1})
+    async for doc in cursor:
+        user_id = doc["_id"]
+        for payment_id, data in doc.get("payments", {}).items():
+            operations.append(UpdateOne(
+                {"_id": payment_id},
+                {"$set": {**record_fields(data), "payment_id": payment_id, "user_id": user_id}},
+                upsert=True
+            ))
+
+    if operations:
+        await records.bulk_write(operations)
+
+    await ensure_payment_indexes()
+    await disconnect()
+
+    print(f"✅ Backfilled {len(operations)} payment records.")
+
+if __name__ == "__main__":
+    asyncio.run(backfill_payment_records())
@@ -730,6 +730,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "/listadmins or /la — List all admins",
             "/listwallet or /lw — List all wallets\n",
             "/addwallet or /aw — Add deposit wallets",
+            "/genwallets or /gw — Generate deposit wallets in bulk",
             "/removewallet or /rw — Remove deposit wallets\n",
             "/addpayout or /ap — Add wothdrawal wallets",
             "/removepayout or /rp — Remove withdrawal wallets",
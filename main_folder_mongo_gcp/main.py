@@ -45,7 +45,7 @@ from commands import (
 
 from admin import (
     addadmin, removeadmin, listadmins,
-    handle_removeadmin_callback, addwallet, addpayout,
+    handle_removeadmin_callback, addwallet, genwallets, addpayout,
     check_payment_conv, manual_upgrade_conv, list_referrals, register_wallet_commands,
     addrpc, removerpc, listrpc, handle_removerpc_callback, boot
 )
@@ -63,6 +63,7 @@ import mongo_client
 
 #from storage import user_collection, token_collection, payment_collection
 from util import restart_recovery as restart_recovery
+import util.warm_snapshot as warm_snapshot
 #import util.utils as utils
 from storage.notify import (flush_notify_cache_to_db, ensure_notify_records_for_active_users,
                             
@@ -105,7 +106,7 @@ async def callback_restart(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     return
 
                 # Cancel running tasks
-                for attr in ["_monitor_task", "_expiry_task", "_reminder_task"]:
+                for attr in ["_monitor_task", "_expiry_task", "_reminder_task", "_price_feed_task", "_deposit_watcher_task", "_lease_reclaimer_task", "_sweep_task"]:
                     task = getattr(context.application, attr, None)
                     if task and not task.done():
                         task.cancel()
@@ -115,6 +116,7 @@ async def callback_restart(update: Update, context: ContextTypes.DEFAULT_TYPE):
                             pass
                 
                 await flush_notify_cache_to_db()
+                await warm_snapshot.write_snapshot()
                 await asyncio.sleep(1)
                 await mongo_client.disconnect()
                 await asyncio.sleep(1)
@@ -148,7 +150,7 @@ async def callback_stop(update: Update, context: ContextTypes.DEFAULT_TYPE):
         async def safe_shutdown():
             try:
                 # Cancel running tasks
-                for attr in ["_monitor_task", "_expiry_task", "_reminder_task"]:
+                for attr in ["_monitor_task", "_expiry_task", "_reminder_task", "_price_feed_task", "_deposit_watcher_task", "_lease_reclaimer_task", "_sweep_task"]:
                     task = getattr(context.application, attr, None)
                     if task and not task.done():
                         task.cancel()
@@ -173,6 +175,7 @@ async def callback_stop(update: Update, context: ContextTypes.DEFAULT_TYPE):
                             pass
 
                 await flush_notify_cache_to_db()
+                await warm_snapshot.write_snapshot()
                 await asyncio.sleep(1)
                 await mongo_client.disconnect()
                 await asyncio.sleep(1)
@@ -408,6 +411,7 @@ async def init_telegram_app(app_context):
 
     telegram_app.add_handler(CommandHandler(["listadmins", "la"], listadmins))
     telegram_app.add_handler(CommandHandler("aw", addwallet))
+    telegram_app.add_handler(CommandHandler(["genwallets", "gw"], genwallets))
 
     telegram_app.add_handler(CommandHandler("ap", addpayout))
     telegram_app.add_handler(CommandHandler(["listrefs", "lr"], list_referrals))
@@ -0,0 +1,51 @@
+# migrate_tracked_tokens.py
+
+import asyncio
+import sys
+from pymongo import UpdateOne
+from mongo_client import connect, disconnect, get_collection
+from storage.token_collection import LEGACY_TRACKED_DOC_ID, create_token_indexes
+
+async def migrate_tracked_tokens(drop_legacy: bool = False):
+    # Connect to MongoDB
+    await connect()
+    collection = get_collection("tokens")
+
+    legacy = await collection.find_one({"_id": LEGACY_TRACKED_DOC_ID})
+    if not legacy:
+        print("ℹ️ No legacy tracked_token document found.")
+        await create_token_indexes()
+        await disconnect()
+        return
+
+    # Flag each address on its own document; running bots keep reading both shapes
+    operations = []
+    for chain_id, chain_tokens in legacy.get("token_list", {}).items():
+        for token in chain_tokens:
+            operations.append(UpdateOne(
+                {"_id": token["address"]},
+                {"$set": {
+                    "address": token["address"],
+                    "symbol": token.get("symbol"),
+                    "chain_id": chain_id,
+                    "tracked": True
+                }},
+                upsert=True
+            ))
+
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+
+    await create_token_indexes()
+
+    # Only drop the legacy doc once every instance runs the per-token code
+    if drop_legacy:
+        await collection.delete_one({"_id": LEGACY_TRACKED_DOC_ID})
+        print("🗑️ Dropped legacy tracked_token document.")
+
+    await disconnect()
+
+    print(f"✅ Migrated {len(operations)} tracked tokens to per-token documents.")
+
+if __name__ == "__main__":
+    asyncio.run(migrate_tracked_tokens(drop_legacy="--drop-legacy" in sys.argv))
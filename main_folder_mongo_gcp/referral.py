@@ -11,6 +11,8 @@ from telegram.ext import (
 
 from telegram.constants import ChatAction
 import storage.user_collection as user_collection
+import storage.payout_eligibility as payout_eligibility
+from pymongo import UpdateOne
 
 import asyncio
 
@@ -39,18 +41,30 @@ async def register_referral(referrer_id: int, referred_id: int) -> bool:
     referrer_id_str = str(referrer_id)
     referred_id_str = str(referred_id)
 
+    # referred_by is permanent: a user keeps their first referrer, and one who has
+    # already converted (dropped from referred_users) can't be re-registered for
+    # a second commission
+    if user_collection.get_referrer(referred_id_str):
+        return False
+
     referral_data = get_user_referral_data(referrer_id)
-    if referred_id_str not in referral_data["referred_users"]:
-        referral_data["referred_users"].append(referred_id_str)
-        referral_data.setdefault("total_referred", 0)
-        referral_data["total_referred"] += 1
+    if referred_id_str in referral_data["referred_users"]:
+        return False
+
+    referral_data["referred_users"].append(referred_id_str)
+    referral_data["total_referred"] = referral_data.get("total_referred", 0) + 1
+    user_collection.USER_COLLECTION.setdefault(referred_id_str, {"_id": referred_id_str})["referred_by"] = referrer_id_str
+    user_collection.REFERRED_BY[referred_id_str] = referrer_id_str
 
-        await user_collection.update_user_fields(referrer_id_str, {
-            "referral.referred_users": referral_data["referred_users"],
-            "referral.total_referred": referral_data["total_referred"]
-        })
-        return True
-    return False
+    await user_collection.bulk_update_user_fields([
+        UpdateOne(
+            {"_id": referrer_id_str},
+            {"$addToSet": {"referral.referred_users": referred_id_str}, "$inc": {"referral.total_referred": 1}},
+            upsert=True
+        ),
+        UpdateOne({"_id": referred_id_str}, {"$set": {"referred_by": referrer_id_str}}, upsert=True),
+    ])
+    return True
 
 
 async def handle_successful_referral_upgrade(referrer_id: int, upgrade_fee: float) -> float:
@@ -66,6 +80,7 @@ async def handle_successful_referral_upgrade(referrer_id: int, upgrade_fee: floa
         "referral.total_commission": referral_data["total_commission"],
         "referral.successful_referrals": referral_data["successful_referrals"]
     })
+    payout_eligibility.refresh_user(referrer_id_str)
     return commission
 
 # Main referral page handler
@@ -198,6 +213,7 @@ async def save_wallet_address(update: Update, context: ContextTypes.DEFAULT_TYPE
     await user_collection.update_user_fields(user_id_str, {
         "referral.wallet_address": wallet_address
     })
+    payout_eligibility.refresh_user(user_id_str)
     
     await update.message.reply_text(
         "✅ Your wallet address has been saved successfully!"
@@ -300,32 +316,25 @@ async def start_with_referral(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 # Function to integrate with your existing upgrade completion
 async def on_upgrade_completed(user_id: int, upgrade_fee: float, duration_months: int) -> tuple:
-    referred_by = None
     user_id_str = str(user_id)
-    
-    for potential_referrer_id, doc in user_collection.USER_COLLECTION.items():
-        referral_info = doc.get("referral", {})
-        referred_users = referral_info.get("referred_users", [])
-        if user_id_str in referred_users:
-            referred_by = int(potential_referrer_id)
-            break
-
-    if referred_by and duration_months >= 6:
-        commission = await handle_successful_referral_upgrade(referred_by, upgrade_fee)
-
-        referred_by_str = str(referred_by)
-        referral_info = user_collection.USER_COLLECTION.setdefault(referred_by_str, {}).setdefault("referral", {})
-
-        if user_id_str in referral_info.get("referred_users", []):
-            referral_info["referred_users"].remove(user_id_str)
-
-        await user_collection.update_user_fields(referred_by_str, {
-            "referral": referral_info
-        })
-
-        return True, commission, referred_by
-
-    return False, 0, None
+    referred_by_str = user_collection.get_referrer(user_id_str)
+    if not referred_by_str or duration_months < 6:
+        return False, 0, None
+
+    # Only a pending referral earns commission, once
+    referral_info = get_user_referral_data(referred_by_str)
+    if user_id_str not in referral_info["referred_users"]:
+        return False, 0, None
+
+    referred_by = int(referred_by_str)
+    commission = await handle_successful_referral_upgrade(referred_by, upgrade_fee)
+
+    referral_info["referred_users"].remove(user_id_str)
+    await user_collection.get_user_collection().update_one(
+        {"_id": referred_by_str},
+        {"$pull": {"referral.referred_users": user_id_str}}
+    )
+    return True, commission, referred_by
 
 
 # Modify handle_back_to_dashboard to work with referral module
@@ -27,13 +27,15 @@ from util.process_batch_payout_util import process_batch_payouts
 from util.wallet_validator import validate_wallet_addresses
 
 import storage.user_collection as user_collection
+import storage.payout_eligibility as payout_eligibility
+from storage.payout_eligibility import get_eligible_users, MIN_SUCCESSFUL_REFERRALS
+from pymongo import UpdateOne
 
 logger = logging.getLogger(__name__)
 
 # Constants
 MIN_PAYOUT_THRESHOLD = 0.005  # Minimum payout in SOL
 NETWORK_FEE_PER_TX = 0.000005  # SOL fee per transaction
-MIN_SUCCESSFUL_REFERRALS = 5  # Minimum successful referrals to be eligible
 
 # States for the payout conversation
 NOTIFY_MISSING_WALLET, CONFIRM_PAYOUT, ENTER_WALLET_KEY = range(3)
@@ -42,32 +44,9 @@ NOTIFY_MISSING_WALLET, CONFIRM_PAYOUT, ENTER_WALLET_KEY = range(3)
 IS_MAINNET = "mainnet" in SOLANA_RPC.lower()
 CLUSTER = "mainnet" if IS_MAINNET else "devnet"
 
-# Filter eligible users for payout
-def get_eligible_users() -> Tuple[List[Tuple[str, Dict[str, Any]]], List[Tuple[str, Dict[str, Any]]]]:
-    eligible_users = []
-    eligible_without_wallet = []
-
-    for user_id, doc in user_collection.USER_COLLECTION.items():
-        referral_data = doc.get("referral", {})
-        total_commission = referral_data.get("total_commission", 0.0)
-        total_paid = referral_data.get("total_paid", 0.0)
-        wallet_address = referral_data.get("wallet_address", "")
-        successful_referrals = referral_data.get("successful_referrals", 0)
-
-        unpaid_commission = total_commission - total_paid
-
-        if unpaid_commission > 0 and successful_referrals >= MIN_SUCCESSFUL_REFERRALS:
-            if wallet_address:
-                eligible_users.append((user_id, referral_data))
-            else:
-                eligible_without_wallet.append((user_id, referral_data))
-
-    return eligible_users, eligible_without_wallet
-
-
 async def calculate_payout_totals(valid_users: List[Tuple[str, Dict[str, Any]]]) -> Tuple[int, float, float, float, float]:
     total_users = len(valid_users)
-    total_commission_usd = sum(data["total_commission"] - data["total_paid"] for _, data in valid_users)
+    total_commission_usd = sum(payout_eligibility.get_unpaid_commission(user_id) for user_id, _ in valid_users)
     sol_usd_price = await fetch_sol_price_usd()
     network_fee_base = NETWORK_FEE_PER_TX * sol_usd_price
     network_fees = total_users * network_fee_base
@@ -78,10 +57,10 @@ async def calculate_payout_totals(valid_users: List[Tuple[str, Dict[str, Any]]])
 
 
 # Notify users about missing wallet
-async def notify_users_missing_wallet(context: ContextTypes.DEFAULT_TYPE, eligible_without_wallet: List[Tuple[str, Dict[str, Any]]]):
-    for user_id, data in eligible_without_wallet:
+async def notify_users_missing_wallet(context: ContextTypes.DEFAULT_TYPE):
+    # Read at send time, so users who linked a wallet meanwhile are skipped
+    for user_id, unpaid_commission in list(payout_eligibility.ELIGIBLE_WITHOUT_WALLET.items()):
         try:
-            unpaid_commission = data["total_commission"] - data["total_paid"]
             message = (
                 "💰 *You're eligible for a referral commission payout!*\n\n"
                 f"You have ${unpaid_commission:.2f} in unpaid referral commissions ready to be paid out.\n\n"
@@ -104,7 +83,7 @@ async def handle_notification_selection(update: Update, context: ContextTypes.DE
     await query.answer()
     
     if query.data == "notify_missing_wallet":
-        eligible_without_wallet = context.user_data.get("eligible_without_wallet", [])
+        eligible_without_wallet = payout_eligibility.ELIGIBLE_WITHOUT_WALLET
         
         if not eligible_without_wallet:
             await query.edit_message_text("No eligible users without wallets found.")
@@ -114,7 +93,7 @@ async def handle_notification_selection(update: Update, context: ContextTypes.DE
         await query.edit_message_text(f"⏳ Sending notifications to {len(eligible_without_wallet)} users...")
         
         # Notify users
-        await notify_users_missing_wallet(context, eligible_without_wallet)
+        await notify_users_missing_wallet(context)
         
         # Confirm completion
         await context.bot.send_message(
@@ -142,7 +121,7 @@ async def handle_notification_selection(update: Update, context: ContextTypes.DE
         context.user_data["invalid_wallet_notified"] = set()
 
     # Validate wallet addresses
-    valid_users, invalid_users = await validate_wallet_addresses(eligible_users)
+    valid_users, invalid_users, unknown_users = await validate_wallet_addresses(eligible_users)
     
     # Automatically notify users with invalid wallets
     if invalid_users:
@@ -167,7 +146,8 @@ async def handle_notification_selection(update: Update, context: ContextTypes.DE
     if not valid_users:
         await processing_msg.edit_text(
             "❌ No users have valid wallet addresses for payout.\n\n"
-            f"Invalid wallets: {len(invalid_users)}"
+            f"Invalid wallets: {len(invalid_users)}\n"
+            f"Unverified (lookup failed, retry later): {len(unknown_users)}"
         )
         return ConversationHandler.END
     
@@ -189,6 +169,8 @@ async def handle_notification_selection(update: Update, context: ContextTypes.DE
     
     if invalid_users:
         summary += f"⚠️ {len(invalid_users)} users have invalid wallet addresses and will be skipped.\n\n"
+    if unknown_users:
+        summary += f"⚠️ {len(unknown_users)} wallets couldn't be checked and will be retried next run.\n\n"
     
     summary += (
         "Would you like to proceed with processing these payments?\n\n"
@@ -300,9 +282,8 @@ async def notify_invalid_wallets_background(context, chat_id, invalid_users):
 
 async def run_wallet_validation_background(context: ContextTypes.DEFAULT_TYPE, chat_id, eligible_users, processing_msg):
     try:
-        valid_users, invalid_users = await validate_wallet_addresses(eligible_users, processing_msg)
+        valid_users, invalid_users, unknown_users = await validate_wallet_addresses(eligible_users, processing_msg)
 
-        #valid_users, invalid_users = await validate_wallet_addresses(eligible_users)
         context.user_data["valid_users"] = valid_users
         context.user_data["invalid_users"] = invalid_users
 
@@ -315,7 +296,8 @@ async def run_wallet_validation_background(context: ContextTypes.DEFAULT_TYPE, c
         if not valid_users:
             await processing_msg.edit_text(
                 "❌ No users have valid wallet addresses for payout.\n\n"
-                f"Invalid wallets: {len(invalid_users)}"
+                f"Invalid wallets: {len(invalid_users)}\n"
+                f"Unverified (lookup failed, retry later): {len(unknown_users)}"
             )
             return
 
@@ -333,6 +315,8 @@ async def run_wallet_validation_background(context: ContextTypes.DEFAULT_TYPE, c
 
         if invalid_users:
             summary += f"⚠️ {len(invalid_users)} users have invalid wallet addresses and will be skipped.\n\n"
+        if unknown_users:
+            summary += f"⚠️ {len(unknown_users)} wallets couldn't be checked and will be retried next run.\n\n"
 
         
         summary += (
@@ -460,12 +444,13 @@ async def process_payments(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # Prepare bulk updates
     bulk_updates = []
+    valid_by_id = dict(valid_users)
     
     for user_id, success, tx_sig, message in results:
         user_doc = user_collection.USER_COLLECTION.get(user_id, {})
         referral_data = user_doc.get("referral", {})
         # Find the data for this user
-        user_data = next((data for uid, data in valid_users if uid == user_id), None)
+        user_data = valid_by_id.get(user_id)
         
         if not user_data:
             continue
@@ -481,14 +466,19 @@ async def process_payments(update: Update, context: ContextTypes.DEFAULT_TYPE):
             # referral_data["tx_sig"] = tx_sig
             # await user_collection.update_user_fields(user_id, {"referral": referral_data})
 
-            bulk_updates.append({
-            "_id": user_id,
-            "fields": {
-                "referral.total_paid": referral_data.get("total_paid", 0.0) + unpaid_commission,
-                "referral.tx_sig": tx_sig,
-                "referral.successful_referrals": 0
-            }
-            })
+            referral_data["total_paid"] = referral_data.get("total_paid", 0.0) + unpaid_commission
+            referral_data["tx_sig"] = tx_sig
+            referral_data["successful_referrals"] = 0
+            payout_eligibility.refresh_user(user_id)
+
+            bulk_updates.append(UpdateOne(
+                {"_id": user_id},
+                {"$set": {
+                    "referral.total_paid": referral_data["total_paid"],
+                    "referral.tx_sig": tx_sig,
+                    "referral.successful_referrals": 0
+                }}
+            ))
 
             successful_transfers.append((user_id, amount_usd, tx_sig))
         else:
@@ -2,7 +2,7 @@
 
 import base64
 import logging
-from typing import Dict, Optional
+from typing import Dict, Iterable, Optional
 from cryptography.fernet import Fernet, InvalidToken
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.backends import default_backend
@@ -19,22 +19,79 @@ ITERATIONS = 390000
 # === In-memory cache of decrypted wallets ===
 DECRYPTED_WALLETS: Dict[str, str] = {}
 
+# === Key material, fetched and derived once per process ===
+_SALT: Optional[bytes] = None
+_PASSWORD: Optional[str] = None
+_KEYS: Dict[str, bytes] = {}      # password -> derived key
+_FERNETS: Dict[bytes, Fernet] = {}  # derived key -> Fernet
+
 logger = logging.getLogger(__name__)
 
 
 def derive_key(password: str) -> bytes:
-    SALT = get_secret("salt").encode("utf-8")
-    
+    global _SALT
+    if _SALT is None:
+        _SALT = get_secret("salt").encode("utf-8")
+
     kdf = PBKDF2HMAC(
         algorithm=hashes.SHA256(),
         length=32,
-        salt=SALT,
+        salt=_SALT,
         iterations=ITERATIONS,
         backend=default_backend()
     )
     return base64.urlsafe_b64encode(kdf.derive(password.encode("utf-8")))
 
 
+def get_key(password: Optional[str] = None) -> bytes:
+    """
+    Derived Fernet key for the given password (default: the wallet password),
+    running PBKDF2 only the first time each password is seen.
+    """
+    global _PASSWORD
+    if password is None:
+        if _PASSWORD is None:
+            _PASSWORD = get_wallet_password()
+        password = _PASSWORD
+
+    key = _KEYS.get(password)
+    if key is None:
+        key = derive_key(password)
+        _KEYS[password] = key
+        _FERNETS[key] = Fernet(key)
+    return key
+
+
+def get_fernet(password: Optional[str] = None) -> Fernet:
+    return _FERNETS[get_key(password)]
+
+
+def clear_key_cache():
+    """
+    Forget the cached salt, password and derived keys; the next call refetches them.
+    """
+    global _SALT, _PASSWORD
+    _SALT = None
+    _PASSWORD = None
+    _KEYS.clear()
+    _FERNETS.clear()
+
+
+async def rotate_key_material():
+    """
+    Call after rotating the password or salt in Secret Manager: refetch the key
+    material and re-encrypt every loaded wallet under it.
+    """
+    clear_key_cache()
+    fernet = get_fernet()
+    secrets = {
+        address: fernet.encrypt(plain_key.encode()).decode()
+        for address, plain_key in DECRYPTED_WALLETS.items()
+    }
+    await persist_encrypted_keys(secrets)
+    logger.info(f"🔑 Key material rotated; re-encrypted {len(secrets)} wallet secrets")
+
+
 def is_encrypted_value(value: str) -> bool:
     return value.startswith("gAAAA") and len(value) > 80
 
@@ -46,9 +103,7 @@ async def load_encrypted_keys() -> Dict[str, str]:
     global DECRYPTED_WALLETS
 
     secrets = payment_collection.PAYMENT_COLLECTION.get("wallet_secrets", {}).get("secrets", {})
-    password = get_wallet_password()
-    key = derive_key(password)
-    fernet = Fernet(key)
+    fernet = get_fernet()
 
     decrypted_keys = {}
     modified = False
@@ -58,7 +113,7 @@ async def load_encrypted_keys() -> Dict[str, str]:
         try:
             if not is_encrypted_value(stored_value):
                 logger.warning(f"⚠️ Wallet {address} contains an unencrypted key; encrypting it now.")
-                encrypted_value = encrypt_key(stored_value, password)
+                encrypted_value = encrypt_key(stored_value)
                 updated_secrets[address] = encrypted_value
                 stored_value = encrypted_value
                 modified = True
@@ -94,17 +149,47 @@ async def persist_encrypted_keys(secrets: Dict[str, str]):
     payment_collection.PAYMENT_COLLECTION["wallet_secrets"] = {"_id": "wallet_secrets", "secrets": secrets}
 
 
+async def add_encrypted_keys(new_secrets: Dict[str, str]):
+    """
+    Store newly encrypted keys without rewriting the existing ones.
+    """
+    if not new_secrets:
+        return
+    collection = payment_collection.get_payments_collection()
+    await collection.update_one(
+        {"_id": "wallet_secrets"},
+        {"$set": {f"secrets.{address}": value for address, value in new_secrets.items()}},
+        upsert=True
+    )
+    cached = payment_collection.PAYMENT_COLLECTION.setdefault("wallet_secrets", {"_id": "wallet_secrets", "secrets": {}})
+    cached.setdefault("secrets", {}).update(new_secrets)
+
+
+async def remove_encrypted_keys(addresses: Iterable[str]):
+    """
+    Drop keys from the store and the decrypted cache without re-encrypting the rest.
+    """
+    addresses = list(addresses)
+    if not addresses:
+        return
+    collection = payment_collection.get_payments_collection()
+    await collection.update_one(
+        {"_id": "wallet_secrets"},
+        {"$unset": {f"secrets.{address}": "" for address in addresses}}
+    )
+    cached = payment_collection.PAYMENT_COLLECTION.get("wallet_secrets", {}).get("secrets", {})
+    for address in addresses:
+        cached.pop(address, None)
+        DECRYPTED_WALLETS.pop(address, None)
+
+
 def get_decrypted_wallet(address: str) -> Optional[str]:
     return DECRYPTED_WALLETS.get(address)
 
 
-def decrypt_key(encrypted: str, password: str) -> str:
-    key = derive_key(password)
-    fernet = Fernet(key)
-    return fernet.decrypt(encrypted.encode()).decode()
+def decrypt_key(encrypted: str, password: Optional[str] = None) -> str:
+    return get_fernet(password).decrypt(encrypted.encode()).decode()
 
 
-def encrypt_key(plain_key: str, password: str) -> str:
-    key = derive_key(password)
-    fernet = Fernet(key)
-    return fernet.encrypt(plain_key.encode()).decode()
+def encrypt_key(plain_key: str, password: Optional[str] = None) -> str:
+    return get_fernet(password).encrypt(plain_key.encode()).decode()
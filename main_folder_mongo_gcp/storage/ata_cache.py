@@ -0,0 +1,59 @@
+# ata_cache.py
+# Persistent set of associated token accounts already known to exist on-chain
+
+import logging
+from typing import Iterable, Set
+from mongo_client import get_collection
+from pymongo import UpdateOne
+
+# In-memory cache
+KNOWN_ATAS: Set[str] = set()
+
+logger = logging.getLogger(__name__)
+
+
+def get_ata_collection():
+    return get_collection("known_atas")
+
+
+async def load_known_atas():
+    """
+    Load the known ATA addresses from MongoDB into memory.
+    """
+    global KNOWN_ATAS
+    collection = get_ata_collection()
+    KNOWN_ATAS = {doc["_id"] async for doc in collection.find({}, {"_id": 1})}
+    logger.info(f"✅ Loaded {len(KNOWN_ATAS)} known ATAs from database")
+
+
+def is_known_ata(address: str) -> bool:
+    return address in KNOWN_ATAS
+
+
+async def add_known_atas(addresses: Iterable[str]):
+    """
+    Record ATAs confirmed to exist (or created by a finalized payout).
+    """
+    new_atas = {addr for addr in addresses if addr not in KNOWN_ATAS}
+    if not new_atas:
+        return
+
+    collection = get_ata_collection()
+    await collection.bulk_write(
+        [UpdateOne({"_id": addr}, {"$setOnInsert": {"_id": addr}}, upsert=True) for addr in new_atas],
+        ordered=False
+    )
+    KNOWN_ATAS.update(new_atas)
+
+
+async def forget_known_atas(addresses: Iterable[str]):
+    """
+    Drop ATAs whose payout failed; an owner may have closed the account.
+    """
+    stale = [addr for addr in addresses if addr in KNOWN_ATAS]
+    if not stale:
+        return
+
+    collection = get_ata_collection()
+    await collection.delete_many({"_id": {"$in": stale}})
+    KNOWN_ATAS.difference_update(stale)
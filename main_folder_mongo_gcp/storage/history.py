@@ -36,7 +36,7 @@ def compute_data_hash(data: dict) -> str:
 async def save_token_history():
     """
     Save token history and simultaneously clean up unused tokens.
-    Only tracked tokens are saved to TOKEN_COLLECTION.
+    Only tracked tokens are saved to the tokens collection.
     """
     # Get all tokens being tracked from TRACKED_TOKEN
     all_tracked_addresses = {
@@ -82,7 +82,8 @@ async def save_token_history():
                             "hash": LAST_SAVED_HASHES.get(address, ""),
                             "address": address,
                             "chain_id": chain_id,
-                            "symbol": symbol
+                            "symbol": symbol,
+                            "tracked": True
                         }
                     },
                     upsert=True
@@ -154,59 +155,102 @@ def update_token_data(address: str, data: dict) -> bool:
 # Initialize the module
 #load_token_history()
 
-async def load_token_data():
+def cache_token_document(doc: dict):
     """
-    Load data from TOKEN_COLLECTION and populate in-memory caches.
+    Apply one (projected) tokens-collection document to the in-memory caches.
     """
-    global TOKEN_DATA_HISTORY, ACTIVE_TOKEN_DATA, LAST_SAVED_HASHES
-
-    # Fetch all token data from the database
-    collection = token_collection.get_tokens_collection()
-
-    # Fetch all token documents except the "tracked_token" document
-    token_documents = [doc async for doc in collection.find({"_id": {"$ne": "tracked_token"}})]
-
-    # Build caches
-    for doc in token_documents:
-        try:
-            address = doc["address"]
-            hash_key = doc["hash"]
-            symbol = doc["symbol"]
-            chain_id = doc["chain_id"]
-            sessions = doc.get("sessions", [])
-
-            # Populate TOKEN_DATA_HISTORY
-            TOKEN_DATA_HISTORY[address] = [
-                {
-                    "timestamp": session["timestamp"],
-                    "address": address,
-                    "symbol": symbol,
-                    "chain_id": chain_id,
-                    "priceChange_m5": session.get("priceChange_m5"),
-                    "volume_m5": session.get("volume_m5"),
-                    "marketCap": session.get("marketCap")
-                }
-                for session in sessions
-            ]
+    doc_id = doc["_id"]
+
+    # Legacy tracked_token doc and the active_tokens singleton
+    if doc_id == token_collection.LEGACY_TRACKED_DOC_ID:
+        token_collection.LEGACY_TOKEN_LIST.clear()
+        token_collection.LEGACY_TOKEN_LIST.update(doc.get("token_list", {}))
+        return
+    if doc_id == token_collection.ACTIVE_TOKENS_DOC_ID:
+        token_collection.ACTIVE_TOKEN_DATA_CACHE = doc.get("data", {})
+        return
+
+    try:
+        address = doc["address"]
+        symbol = doc["symbol"]
+        chain_id = doc["chain_id"]
+    except KeyError as e:
+        # Log and skip invalid documents
+        logger.warning(f"Skipped document due to missing key: {e}. Document id: {doc_id}")
+        return
+
+    if doc.get("tracked"):
+        token_collection.TRACKED_TOKEN_META[address] = {"chain_id": chain_id, "symbol": symbol}
+        chain_tokens = tokens.TRACKED_TOKENS.setdefault(chain_id, [])
+        if address not in chain_tokens:
+            chain_tokens.append(address)
+        symbols.ADDRESS_TO_SYMBOL[address] = symbol
+
+    # Populate TOKEN_DATA_HISTORY
+    TOKEN_DATA_HISTORY[address] = [
+        {
+            "timestamp": session["timestamp"],
+            "address": address,
+            "symbol": symbol,
+            "chain_id": chain_id,
+            "priceChange_m5": session.get("priceChange_m5"),
+            "volume_m5": session.get("volume_m5"),
+            "marketCap": session.get("marketCap")
+        }
+        for session in doc.get("sessions", [])
+    ]
+    ACTIVE_TOKEN_DATA[address] = TOKEN_DATA_HISTORY[address]
+
+    # Populate LAST_SAVED_HASHES, computing it from history when not stored
+    hash_key = doc.get("hash")
+    if hash_key:
+        LAST_SAVED_HASHES[address] = hash_key
+    elif TOKEN_DATA_HISTORY[address]:
+        LAST_SAVED_HASHES[address] = compute_data_hash(TOKEN_DATA_HISTORY[address][0])
+
+
+def forget_token(address: str):
+    """
+    Drop a deleted token document from the in-memory caches.
+    """
+    TOKEN_DATA_HISTORY.pop(address, None)
+    ACTIVE_TOKEN_DATA.pop(address, None)
+    LAST_SAVED_HASHES.pop(address, None)
+    symbols.ADDRESS_TO_SYMBOL.pop(address, None)
+    meta = token_collection.TRACKED_TOKEN_META.pop(address, None)
+    if meta and address in tokens.TRACKED_TOKENS.get(meta["chain_id"], []):
+        tokens.TRACKED_TOKENS[meta["chain_id"]].remove(address)
 
-            # Populate LAST_SAVED_HASHES
-            LAST_SAVED_HASHES[address] = hash_key
 
-            # Populate ACTIVE_TOKEN_DATA (Example: Use a filter to check active tokens)
-            # Replace with actual active token logic
-            ACTIVE_TOKEN_DATA[address] = TOKEN_DATA_HISTORY[address]
-        
-        except KeyError as e:
-            # Log and skip invalid documents
-            logger.warning(f"Skipped document due to missing key: {e}. Document: {doc}")
-
-    # If no saved hashes or missing entries, compute from history
-    for addr, history_list in TOKEN_DATA_HISTORY.items():
-        if history_list and addr not in LAST_SAVED_HASHES:
-            latest = history_list[0]
-            LAST_SAVED_HASHES[addr] = compute_data_hash(latest)
-    
-    logger.info(f"✅ Loaded token history for {len(TOKEN_DATA_HISTORY)} tokens with {len(LAST_SAVED_HASHES)} hashes")
+async def load_token_data():
+    """
+    Stream the tokens collection once and populate the tracked list, symbols,
+    history and hash caches in the same pass.
+    """
+    TOKEN_DATA_HISTORY.clear()
+    ACTIVE_TOKEN_DATA.clear()
+    LAST_SAVED_HASHES.clear()
+    tokens.TRACKED_TOKENS.clear()
+    symbols.ADDRESS_TO_SYMBOL.clear()
+    token_collection.TRACKED_TOKEN_META.clear()
+    token_collection.LEGACY_TOKEN_LIST.clear()
+
+    async for doc in token_collection.stream_token_documents():
+        cache_token_document(doc)
+
+    # Entries still only present in the legacy doc
+    for chain_id, chain_tokens in token_collection.LEGACY_TOKEN_LIST.items():
+        for token in chain_tokens:
+            address = token["address"]
+            if address not in token_collection.TRACKED_TOKEN_META:
+                tokens.TRACKED_TOKENS.setdefault(chain_id, []).append(address)
+                symbols.ADDRESS_TO_SYMBOL[address] = token.get("symbol")
+
+    num_tracked = sum(len(chain_tokens) for chain_tokens in tokens.TRACKED_TOKENS.values())
+    logger.info(
+        f"✅ Loaded {num_tracked} tracked tokens and history for {len(TOKEN_DATA_HISTORY)} tokens "
+        f"with {len(LAST_SAVED_HASHES)} hashes in a single pass"
+    )
 
 
 async def remove_token_history(addresses: list[str]):
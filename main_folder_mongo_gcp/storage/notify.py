@@ -19,6 +19,13 @@ def get_notify_collection():
     return get_collection("user_notify")
 
 
+def notify_entry_from_doc(doc: dict) -> dict:
+    return {
+        "last_alert_time": doc.get("last_alert_time"),
+        "next_interval": doc.get("next_interval", 24)
+    }
+
+
 async def load_user_notify_cache():
     """
     Load all notify data into memory from MongoDB.
@@ -26,13 +33,7 @@ async def load_user_notify_cache():
     global USER_NOTIFY_CACHE
     collection = get_notify_collection()
     cursor = collection.find({})
-    USER_NOTIFY_CACHE = {
-        doc["_id"]: {
-            "last_alert_time": doc.get("last_alert_time"),
-            "next_interval": doc.get("next_interval", 24)
-        }
-        async for doc in cursor
-    }
+    USER_NOTIFY_CACHE = {doc["_id"]: notify_entry_from_doc(doc) async for doc in cursor}
 
 
 async def save_user_notify_entry(entries: List[Tuple[str | int, dict]]):
@@ -123,11 +124,13 @@ async def remind_inactive_users(app):
 
 
 
-async def ensure_notify_records_for_active_users():
+async def ensure_notify_records_for_active_users(reload: bool = True):
     """
     At startup: load notify cache and ensure every active tracking user has an entry.
+    Pass reload=False when the cache was already restored from a warm snapshot.
     """
-    await load_user_notify_cache()
+    if reload:
+        await load_user_notify_cache()
 
     new_entries = 0
     now_iso = datetime.now().isoformat()
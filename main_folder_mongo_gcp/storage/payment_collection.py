@@ -3,23 +3,51 @@
 
 from mongo_client import get_collection
 from pymongo import UpdateOne
-from typing import Dict, List, Any
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+from util.lru_cache import LRUCache
 import logging
 
-# In-memory cache
+# Config documents that are always kept in memory
+CONFIG_DOC_IDS = ("deposit_wallets", "wallet_secrets", "withdrawal_wallets")
+
+# Max number of users whose payment logs are kept in memory
+PAYMENT_LOG_CACHE_SIZE = 500
+
+# In-memory cache (config docs only)
 PAYMENT_COLLECTION = {}
 
+# In-memory LRU of user payment logs: {user_id: {payment_id: data}}
+USER_PAYMENT_CACHE = LRUCache(PAYMENT_LOG_CACHE_SIZE)
+
+# Hot lookup maps backed by the indexed `payment_records` collection
+PAYMENT_INDEX_CACHE_SIZE = 10000
+PAYMENT_ID_INDEX = LRUCache(PAYMENT_INDEX_CACHE_SIZE)  # payment_id -> (user_id, tx_sig)
+TX_SIG_INDEX = LRUCache(PAYMENT_INDEX_CACHE_SIZE)      # tx_sig -> (user_id, payment_id)
+
+# Field updates waiting for a batched flush: {(user_id, payment_id): {field: value}}
+PENDING_PAYMENT_UPDATES: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
 logger = logging.getLogger(__name__)
 
 def get_payments_collection():
     return get_collection("payments")
 
-# --- Load All Payments ---
+def get_payment_records_collection():
+    return get_collection("payment_records")
+
+# --- Load Config Docs ---
 async def load_payment_collection_from_mongo():
+    """
+    Load only the wallet/secret config docs. User payment logs are fetched on demand.
+    """
     global PAYMENT_COLLECTION
     collection = get_payments_collection()
-    cursor = collection.find()
+    cursor = collection.find({"_id": {"$in": list(CONFIG_DOC_IDS)}})
     PAYMENT_COLLECTION = {doc["_id"]: doc async for doc in cursor}
+    USER_PAYMENT_CACHE.clear()
+    logger.info(f"✅ Loaded {len(PAYMENT_COLLECTION)} payment config docs from database")
 
 # --- Get Deposit Wallets ---
 def get_deposit_wallets() -> List[Dict[str, str]]:
@@ -34,15 +62,83 @@ def get_withdrawal_wallets() -> List[str]:
     return PAYMENT_COLLECTION.get("withdrawal_wallets", {}).get("wallets", [])
 
 # --- Get User Payment Logs ---
-def get_user_payment_log(user_id: str) -> Dict[str, Any]:
-    return PAYMENT_COLLECTION.get(user_id, {}).get("payments", {})
+async def get_user_payment_log(user_id: str) -> Dict[str, Any]:
+    """
+    Return a user's payments dict, fetching it from MongoDB on a cache miss.
+    """
+    payments = USER_PAYMENT_CACHE.get(user_id)
+    if payments is not None:
+        return payments
+
+    collection = get_payments_collection()
+    doc = await collection.find_one({"_id": user_id}, {"payments": 1})
+    payments = doc.get("payments", {}) if doc else {}
+    USER_PAYMENT_CACHE.set(user_id, payments)
+    return payments
 
-# --- Save User Payment Log ---
-async def save_user_payment_log(user_id: str, payments: Dict[str, Any]):
+# --- Set Single Payment Entry ---
+async def set_user_payment_entry(user_id: str, payment_id: str, data: Dict[str, Any]):
+    """
+    Write one `payments.<payment_id>` key without rewriting the user's whole map.
+    """
     collection = get_payments_collection()
-    doc = {"_id": user_id, "payments": payments}
-    await collection.update_one({"_id": user_id}, {"$set": doc}, upsert=True)
-    PAYMENT_COLLECTION[user_id] = doc
+    await collection.update_one(
+        {"_id": user_id},
+        {"$set": {f"payments.{payment_id}": data}},
+        upsert=True
+    )
+
+    payments = USER_PAYMENT_CACHE.peek(user_id)
+    if payments is not None:
+        payments[payment_id] = data
+
+# --- Staged Field Updates ---
+def stage_payment_update(user_id: str, payment_id: str, fields: Dict[str, Any]):
+    """
+    Queue field changes on an existing payment for the next `flush_payment_updates`.
+    """
+    PENDING_PAYMENT_UPDATES.setdefault((user_id, payment_id), {}).update(fields)
+
+    payments = USER_PAYMENT_CACHE.peek(user_id)
+    if payments is not None and payment_id in payments:
+        payments[payment_id].update(fields)
+
+async def flush_payment_updates() -> int:
+    """
+    Write all staged field updates in one bulk call per collection.
+    """
+    if not PENDING_PAYMENT_UPDATES:
+        return 0
+
+    pending = {key: dict(fields) for key, fields in PENDING_PAYMENT_UPDATES.items()}
+
+    payment_ops = [
+        UpdateOne(
+            {"_id": user_id},
+            {"$set": {f"payments.{payment_id}.{key}": value for key, value in fields.items()}}
+        )
+        for (user_id, payment_id), fields in pending.items()
+    ]
+    record_ops = [
+        UpdateOne(
+            {"_id": payment_id},
+            {"$set": {**record_fields(fields), "payment_id": payment_id, "user_id": user_id}},
+            upsert=True
+        )
+        for (user_id, payment_id), fields in pending.items()
+    ]
+
+    # Both updates are idempotent $sets, so a failed flush keeps everything for the next one
+    await get_payments_collection().bulk_write(payment_ops, ordered=False)
+    await get_payment_records_collection().bulk_write(record_ops, ordered=False)
+
+    for key, fields in pending.items():
+        # Drop only what was written; fields staged meanwhile stay queued
+        if PENDING_PAYMENT_UPDATES.get(key) == fields:
+            PENDING_PAYMENT_UPDATES.pop(key)
+
+    logger.info(f"✅ Flushed {len(pending)} staged payment updates.")
+    return len(pending)
 
 # --- Bulk Update Payments ---
 async def bulk_update_payment_data(updates: List[dict | UpdateOne]):
@@ -64,14 +160,16 @@ async def bulk_update_payment_data(updates: List[dict | UpdateOne]):
 
     for entry in updates:
         if isinstance(entry, dict):
-            PAYMENT_COLLECTION[entry["_id"]] = entry
+            if entry["_id"] in CONFIG_DOC_IDS:
+                PAYMENT_COLLECTION[entry["_id"]] = entry
+            elif "payments" in entry:
+                USER_PAYMENT_CACHE.set(entry["_id"], entry["payments"])
 
 # --- Remove Entries from Document by ID ---
 async def remove_fields_from_payment_document(doc_id: str, keys_to_remove: List[str]):
     """
     Removes specified keys from the 'payments' field of a user document.
     """
-    global PAYMENT_COLLECTION
     collection = get_payments_collection()
 
     pull_ops = {f"payments.{key}": "" for key in keys_to_remove}
@@ -80,10 +178,158 @@ async def remove_fields_from_payment_document(doc_id: str, keys_to_remove: List[
     await collection.update_one({"_id": doc_id}, unset_query)
 
     # Update in-memory cache
-    if doc_id in PAYMENT_COLLECTION:
-        payments = PAYMENT_COLLECTION[doc_id].get("payments", {})
+    payments = USER_PAYMENT_CACHE.peek(doc_id)
+    if payments is not None:
         for key in keys_to_remove:
             payments.pop(key, None)
-        PAYMENT_COLLECTION[doc_id]["payments"] = payments
 
     logger.info(f"✅ Removed {len(keys_to_remove)} entries from '{doc_id}' payments.")
+
+
+# --- Individually addressable payment records ---
+async def ensure_payment_indexes():
+    """
+    One document per payment in `payment_records`, looked up by payment_id or tx_sig.
+    `tx_sig` only holds verified signatures and is unique, so one on-chain
+    payment can't complete two payments.
+    """
+    collection = get_payment_records_collection()
+    await collection.create_index("payment_id", unique=True)
+    await collection.create_index("user_id")
+
+    # Signatures written before verification was required are only submissions
+    await collection.update_many(
+        {"tx_sig": {"$exists": True}, "verified_at": {"$exists": False}},
+        {"$rename": {"tx_sig": "submitted_tx_sig"}}
+    )
+    index_info = await collection.index_information()
+    if "tx_sig_1" in index_info and not index_info["tx_sig_1"].get("unique"):
+        await collection.drop_index("tx_sig_1")
+    await collection.create_index("tx_sig", unique=True, sparse=True)
+    logger.info("✅ Indexes created on payment_records collection.")
+
+
+def record_fields(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Payment log entry as stored in `payment_records`; an unverified `tx_sig`
+    is kept as `submitted_tx_sig` so it never occupies the unique index.
+    """
+    fields = dict(data)
+    if "tx_sig" in fields and "verified_at" not in fields:
+        fields["submitted_tx_sig"] = fields.pop("tx_sig")
+    return fields
+
+
+def _index_payment_record(user_id: str, payment_id: str, tx_sig: Optional[str]):
+    previous = PAYMENT_ID_INDEX.peek(payment_id)
+    if previous and previous[1] and previous[1] != tx_sig:
+        TX_SIG_INDEX.pop(previous[1])
+
+    PAYMENT_ID_INDEX.set(payment_id, (user_id, tx_sig))
+    if tx_sig:
+        TX_SIG_INDEX.set(tx_sig, (user_id, payment_id))
+
+
+async def upsert_payment_record(user_id: str, payment_id: str, data: Dict[str, Any]):
+    fields = record_fields(data)
+    collection = get_payment_records_collection()
+    await collection.update_one(
+        {"_id": payment_id},
+        {"$set": {**fields, "payment_id": payment_id, "user_id": user_id}},
+        upsert=True
+    )
+    _index_payment_record(user_id, payment_id, fields.get("tx_sig"))
+
+
+async def claim_tx_sig(user_id: str, payment_id: str, tx_sig: str) -> bool:
+    """
+    Attach a verified signature to its payment. False if the signature already
+    belongs to another payment, or this payment was verified with another one.
+    """
+    verified_at = datetime.now().isoformat()
+    try:
+        await get_payment_records_collection().update_one(
+            {"_id": payment_id, "tx_sig": {"$in": [None, tx_sig]}},
+            {"$set": {"tx_sig": tx_sig, "verified_at": verified_at, "payment_id": payment_id, "user_id": user_id}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+
+    await get_payments_collection().update_one(
+        {"_id": user_id},
+        {"$set": {f"payments.{payment_id}.tx_sig": tx_sig, f"payments.{payment_id}.verified_at": verified_at}}
+    )
+    payments = USER_PAYMENT_CACHE.peek(user_id)
+    if payments is not None and payment_id in payments:
+        payments[payment_id].update({"tx_sig": tx_sig, "verified_at": verified_at})
+
+    _index_payment_record(user_id, payment_id, tx_sig)
+    return True
+
+
+async def find_payment_record(payment_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Return (user_id, payment) for a payment_id, or None.
+    """
+    indexed = PAYMENT_ID_INDEX.get(payment_id)
+    if indexed is not None:
+        user_id = indexed[0]
+        payment = (await get_user_payment_log(user_id)).get(payment_id)
+        if payment is not None:
+            return user_id, payment
+
+    collection = get_payment_records_collection()
+    doc = await collection.find_one({"payment_id": payment_id})
+    if not doc:
+        return await _backfill_payment_record(payment_id)
+
+    user_id = doc.pop("user_id")
+    doc.pop("_id", None)
+    doc.pop("payment_id", None)
+    _index_payment_record(user_id, payment_id, doc.get("tx_sig"))
+    return user_id, doc
+
+
+async def _backfill_payment_record(payment_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Fall back to the per-user payment maps for payments logged before
+    `payment_records` existed, and copy the one found into it.
+    """
+    doc = await get_payments_collection().find_one(
+        {f"payments.{payment_id}": {"$exists": True}},
+        {f"payments.{payment_id}": 1}
+    )
+    if not doc:
+        return None
+
+    user_id = doc["_id"]
+    payment = doc["payments"][payment_id]
+    await upsert_payment_record(user_id, payment_id, payment)
+    return user_id, payment
+
+
+async def find_payment_by_tx_sig(tx_sig: str) -> Optional[Tuple[str, str]]:
+    """
+    Return (user_id, payment_id) of the payment a signature was submitted for, or None.
+    """
+    ref = TX_SIG_INDEX.get(tx_sig)
+    if ref is not None:
+        return ref
+
+    collection = get_payment_records_collection()
+    doc = await collection.find_one({"tx_sig": tx_sig}, {"user_id": 1, "payment_id": 1})
+    if not doc:
+        return None
+
+    _index_payment_record(doc["user_id"], doc["payment_id"], tx_sig)
+    return doc["user_id"], doc["payment_id"]
+
+
+async def delete_payment_record(payment_id: str):
+    collection = get_payment_records_collection()
+    await collection.delete_one({"_id": payment_id})
+
+    indexed = PAYMENT_ID_INDEX.pop(payment_id)
+    if indexed and indexed[1]:
+        TX_SIG_INDEX.pop(indexed[1])
@@ -3,97 +3,81 @@ from datetime import datetime
 from typing import Optional, Tuple
 import storage.payment_collection as payment_collection
 
-PAYMENT_LOGS = {}  # In-memory: {user_id: {payment_id: data}}
-
 logger = logging.getLogger(__name__)
 
 async def load_payment_logs():
     """
-    Load payment logs from `payment_collection.py` and populate the in-memory cache.
+    User payment logs are loaded lazily by `payment_collection.get_user_payment_log`,
+    so there is nothing to copy at boot.
     """
-    global PAYMENT_LOGS
-    # Use payment_collection as the source of truth
-    PAYMENT_LOGS = {
-        user_id: payment_collection.get_user_payment_log(user_id)
-        for user_id in payment_collection.PAYMENT_COLLECTION
-        if "payments" in payment_collection.PAYMENT_COLLECTION[user_id]
-    }
-
-    logger.info("✅ PAYMENT LOGS loaded and formatted from database")
+    logger.info(
+        f"✅ PAYMENT LOGS served on demand (LRU of {payment_collection.PAYMENT_LOG_CACHE_SIZE} users)"
+    )
 
 
 async def save_payment_logs():
     """
-    Save the in-memory cache to MongoDB using bulk operations.
+    Flush staged payment field updates to MongoDB using bulk operations.
+    """
+    await payment_collection.flush_payment_updates()
+
+
+def stage_payment_update(user_id: int, payment_id: str, fields: dict) -> None:
+    """
+    Queue field changes on an existing payment; persisted by `save_payment_logs`.
     """
-    global PAYMENT_LOGS
+    payment_collection.stage_payment_update(str(user_id), payment_id, fields)
 
-    # Prepare bulk update operations
-    updates = [
-        {
-            "_id": user_id,
-            "payments": payments
-        }
-        for user_id, payments in PAYMENT_LOGS.items()
-    ]
 
-    # Use payment_collection's bulk update functionality
-    await payment_collection.bulk_update_payment_data(updates)
+async def get_user_payment_logs(user_id: int) -> dict:
+    """
+    Get all payment entries for a user ({payment_id: data}).
+    """
+    return await payment_collection.get_user_payment_log(str(user_id))
 
 
 async def log_user_payment(user_id: int, payment_id: str, data: dict) -> None:
     """
     Store a user's payment attempt under their ID and payment_id.
     """
-    global PAYMENT_LOGS
     user_key = str(user_id)
-
-    # Ensure user_key exists in PAYMENT_LOGS
-    if user_key not in PAYMENT_LOGS:
-        PAYMENT_LOGS[user_key] = {}
-
-    # Log the payment
-    PAYMENT_LOGS[user_key][payment_id] = {
+    entry = {
         **data,
         "logged_at": datetime.now().isoformat()
     }
 
-    # Persist the payment log
-    await payment_collection.save_user_payment_log(user_key, PAYMENT_LOGS[user_key])
+    # Persist only this payment's key (write-through) and its indexed record
+    await payment_collection.set_user_payment_entry(user_key, payment_id, entry)
+    await payment_collection.upsert_payment_record(user_key, payment_id, entry)
 
 
 async def get_user_payment(user_id: int, payment_id: str) -> Optional[dict]:
     """
     Get a specific user's payment details.
     """
-    user_key = str(user_id)
-
-    # First, check the in-memory cache
-    if user_key in PAYMENT_LOGS:
-        return PAYMENT_LOGS[user_key].get(payment_id)
-
-    # Fallback to payment_collection for database fetch
-    return payment_collection.get_user_payment_log(user_key).get(payment_id)
+    payments = await payment_collection.get_user_payment_log(str(user_id))
+    return payments.get(payment_id)
 
 
 async def find_payment_globally(payment_id: str) -> Optional[Tuple[str, dict]]:
     """
-    Search for a payment ID globally across all users.
+    Look up a payment ID across all users via the payment_id index.
     """
-    global PAYMENT_LOGS
+    return await payment_collection.find_payment_record(payment_id)
+
 
-    # Search in the in-memory cache first
-    for user_id, payments in PAYMENT_LOGS.items():
-        if payment_id in payments:
-            return user_id, payments[payment_id]
+async def find_payment_by_tx_sig(tx_sig: str) -> Optional[Tuple[str, str]]:
+    """
+    Return (user_id, payment_id) whose verification used a transaction signature.
+    """
+    return await payment_collection.find_payment_by_tx_sig(tx_sig)
 
-    # Search in the database using `payment_collection.PAYMENT_COLLECTION`
-    for user_id, user_data in payment_collection.PAYMENT_COLLECTION.items():
-        payments = user_data.get("payments", {})
-        if payment_id in payments:
-            return user_id, payments[payment_id]
 
-    return None
+async def claim_tx_sig(user_id: int, payment_id: str, tx_sig: str) -> bool:
+    """
+    Record a verified signature for a payment; False if it is already taken.
+    """
+    return await payment_collection.claim_tx_sig(str(user_id), payment_id, tx_sig)
 
 
 async def remove_user_payment(user_id: int, payment_id: str) -> None:
@@ -102,9 +86,6 @@ async def remove_user_payment(user_id: int, payment_id: str) -> None:
     """
     user_key = str(user_id)
 
-    # Remove from in-memory cache
-    if user_key in PAYMENT_LOGS:
-        PAYMENT_LOGS[user_key].pop(payment_id, None)
-
-    # Remove from the database
+    # Remove from the database and the cache
     await payment_collection.remove_fields_from_payment_document(user_key, [payment_id])
+    await payment_collection.delete_payment_record(payment_id)
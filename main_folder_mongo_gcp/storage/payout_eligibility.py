@@ -0,0 +1,66 @@
+# payout_eligibility.py
+# Referral payout eligibility kept up to date as users' referral state changes
+
+import logging
+from typing import Any, Dict, List, Tuple
+
+import storage.user_collection as user_collection
+
+logger = logging.getLogger(__name__)
+
+MIN_SUCCESSFUL_REFERRALS = 5  # Minimum successful referrals to be eligible
+
+# user_id -> unpaid commission (USD), split by whether a payout wallet is linked
+ELIGIBLE_WITH_WALLET: Dict[str, float] = {}
+ELIGIBLE_WITHOUT_WALLET: Dict[str, float] = {}
+
+
+def _referral_data(user_id: str) -> Dict[str, Any]:
+    return user_collection.USER_COLLECTION.get(user_id, {}).get("referral", {})
+
+
+def refresh_user(user_id: str):
+    """
+    Re-evaluate one user; call after anything that changes their commission,
+    successful referrals, payouts or wallet.
+    """
+    user_id = str(user_id)
+    ELIGIBLE_WITH_WALLET.pop(user_id, None)
+    ELIGIBLE_WITHOUT_WALLET.pop(user_id, None)
+
+    referral_data = _referral_data(user_id)
+    unpaid_commission = referral_data.get("total_commission", 0.0) - referral_data.get("total_paid", 0.0)
+    if unpaid_commission <= 0 or referral_data.get("successful_referrals", 0) < MIN_SUCCESSFUL_REFERRALS:
+        return
+
+    if referral_data.get("wallet_address"):
+        ELIGIBLE_WITH_WALLET[user_id] = unpaid_commission
+    else:
+        ELIGIBLE_WITHOUT_WALLET[user_id] = unpaid_commission
+
+
+def rebuild_eligibility_index():
+    """
+    Full pass over the user cache; only needed once the users are loaded at boot.
+    """
+    ELIGIBLE_WITH_WALLET.clear()
+    ELIGIBLE_WITHOUT_WALLET.clear()
+    for user_id, doc in user_collection.USER_COLLECTION.items():
+        if "referral" in doc:
+            refresh_user(user_id)
+
+    logger.info(
+        f"✅ PAYOUT ELIGIBILITY indexed: {len(ELIGIBLE_WITH_WALLET)} with wallet, "
+        f"{len(ELIGIBLE_WITHOUT_WALLET)} without"
+    )
+
+
+def get_unpaid_commission(user_id: str) -> float:
+    return ELIGIBLE_WITH_WALLET.get(user_id, ELIGIBLE_WITHOUT_WALLET.get(user_id, 0.0))
+
+
+def get_eligible_users() -> Tuple[List[Tuple[str, Dict[str, Any]]], List[Tuple[str, Dict[str, Any]]]]:
+    return (
+        [(user_id, _referral_data(user_id)) for user_id in ELIGIBLE_WITH_WALLET],
+        [(user_id, _referral_data(user_id)) for user_id in ELIGIBLE_WITHOUT_WALLET],
+    )
@@ -3,6 +3,7 @@
 import logging
 from typing import List
 from mongo_client import get_collection
+from util.rpc_pool import RPC_POOL
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +23,7 @@ async def load_rpc_list():
     doc = await collection.find_one({"_id": "rpc_list"})
     RPC_LIST = doc.get("endpoints", []) if doc else []
     RPC_INDEX = 0
+    RPC_POOL.set_endpoints(RPC_LIST)
     logger.info("✅ RPCs loaded from rpcs collection")
 
 
@@ -62,6 +64,7 @@ async def add_rpcs_bulk(rpcs: List[str]) -> List[str]:
         return []
 
     RPC_LIST.extend(new_rpcs)
+    RPC_POOL.set_endpoints(RPC_LIST)
 
     collection = get_rpc_collection()
     await collection.update_one(
@@ -85,6 +88,7 @@ async def remove_rpcs_bulk(rpcs: List[str]) -> List[str]:
         return []
 
     RPC_LIST = [rpc for rpc in RPC_LIST if rpc not in to_remove]
+    RPC_POOL.set_endpoints(RPC_LIST)
 
     collection = get_rpc_collection()
     await collection.update_one(
@@ -8,7 +8,7 @@ logger = logging.getLogger(__name__)
 
 def load_symbols():
     """
-    Load the symbols from TOKEN_COLLECTION and update the cache with address-symbol pairs.
+    Rebuild ADDRESS_TO_SYMBOL from the cached tracked-token metadata.
     """
     global ADDRESS_TO_SYMBOL
     
@@ -6,8 +6,20 @@ from pymongo import UpdateOne
 from typing import Dict, List
 import logging
 
-# In-memory cache
-TOKEN_COLLECTION = {}
+# Legacy monolithic document, read alongside per-token docs until migrated
+LEGACY_TRACKED_DOC_ID = "tracked_token"
+ACTIVE_TOKENS_DOC_ID = "active_tokens"
+
+# In-memory caches (filled by history.load_token_data in a single pass)
+TRACKED_TOKEN_META: Dict[str, Dict] = {}         # address -> {"chain_id", "symbol"}
+LEGACY_TOKEN_LIST: Dict[str, List[Dict]] = {}    # token_list of the legacy doc
+ACTIVE_TOKEN_DATA_CACHE: Dict = {}
+
+# Only the fields the boot caches need
+TOKEN_PROJECTION = {
+    "address": 1, "symbol": 1, "chain_id": 1, "tracked": 1,
+    "hash": 1, "sessions": 1, "token_list": 1, "data": 1
+}
 
 logger = logging.getLogger(__name__)
 
@@ -15,68 +27,89 @@ logger = logging.getLogger(__name__)
 def get_tokens_collection():
     return get_collection("tokens")
 
-# --- Load All Tokens ---
-async def load_token_collection_from_mongo():
-    global TOKEN_COLLECTION
-    collection = get_tokens_collection()
-    cursor = collection.find()
-    TOKEN_COLLECTION = {doc["_id"]: doc async for doc in cursor}
+# --- Stream All Tokens ---
+def stream_token_documents():
+    """
+    Async cursor over every token document, projected to the cached fields.
+    """
+    return get_tokens_collection().find({}, TOKEN_PROJECTION)
 
 # --- Fetch Tracked Tokens ---
-def get_tracked_tokens():
+def get_tracked_tokens() -> Dict[str, List[Dict]]:
     """
-    Retrieve the tracked tokens list from the in-memory cache or the database.
+    Build {chain_id: [{"address", "symbol"}]} from per-token docs flagged `tracked`,
+    merged with any entries still only present in the legacy tracked_token doc.
     """
-    return TOKEN_COLLECTION.get("tracked_token", {}).get("token_list", {})
+    token_list: Dict[str, List[Dict]] = {}
+
+    for address, meta in TRACKED_TOKEN_META.items():
+        token_list.setdefault(meta.get("chain_id"), []).append(
+            {"address": address, "symbol": meta.get("symbol")}
+        )
+
+    for chain_id, chain_tokens in LEGACY_TOKEN_LIST.items():
+        for token in chain_tokens:
+            if token["address"] not in TRACKED_TOKEN_META:
+                token_list.setdefault(chain_id, []).append(token)
+
+    return token_list
 
-# --- Save Tracked Tokens ---
-async def save_tracked_tokens(updated_token_list: Dict[str, List[Dict]]):
+# --- Mark Tokens Tracked ---
+async def mark_tokens_tracked(new_tokens: Dict[str, List[Dict]]):
     """
-    Save tracked tokens to MongoDB using $addToSet for appending without overwriting.
-    
-    :param updated_token_list: Dictionary of chain IDs and their respective tokens.
+    Flag tokens as tracked on their own documents (one upsert per address).
+
+    :param new_tokens: {chain_id: [{"address": ..., "symbol": ...}, ...]}
     """
     collection = get_tokens_collection()
 
-    # Prepare bulk operations for appending tokens
     bulk_operations = []
-    for chain_id, tokens in updated_token_list.items():
-        bulk_operations.append(
-            UpdateOne(
-                {"_id": "tracked_token"},
-                {"$addToSet": {f"token_list.{chain_id}": {"$each": tokens}}},
-                upsert=True
+    for chain_id, chain_tokens in new_tokens.items():
+        for token in chain_tokens:
+            bulk_operations.append(
+                UpdateOne(
+                    {"_id": token["address"]},
+                    {"$set": {
+                        "address": token["address"],
+                        "symbol": token.get("symbol"),
+                        "chain_id": chain_id,
+                        "tracked": True
+                    }},
+                    upsert=True
+                )
             )
-        )
 
-    # Execute bulk operations
     if bulk_operations:
-        await collection.bulk_write(bulk_operations)
+        await collection.bulk_write(bulk_operations, ordered=False)
 
     # Update in-memory cache
-    global TOKEN_COLLECTION
-    TOKEN_COLLECTION["tracked_token"] = {"_id": "tracked_token", "token_list": updated_token_list}
+    for chain_id, chain_tokens in new_tokens.items():
+        for token in chain_tokens:
+            TRACKED_TOKEN_META[token["address"]] = {
+                "chain_id": chain_id,
+                "symbol": token.get("symbol")
+            }
 
 # --- Fetch Active Token Data ---
 def get_active_token_data():
     """
     Retrieve the active token data from the in-memory cache or the database.
     """
-    return TOKEN_COLLECTION.get("active_tokens", {}).get("data", {})
+    return ACTIVE_TOKEN_DATA_CACHE
 
 # --- Save Active Token Data ---
 async def save_active_token_data(active_data):
     """
     Persist the active token data to the database and update the cache.
     """
-    global TOKEN_COLLECTION
+    global ACTIVE_TOKEN_DATA_CACHE
     collection = get_tokens_collection()
     await collection.update_one(
-        {"_id": "active_tokens"},
+        {"_id": ACTIVE_TOKENS_DOC_ID},
         {"$set": {"data": active_data}},
         upsert=True
     )
-    TOKEN_COLLECTION["active_tokens"] = {"_id": "active_tokens", "data": active_data}
+    ACTIVE_TOKEN_DATA_CACHE = active_data
 
 # --- Bulk Update Tokens ---
 async def bulk_update_token_data(updates: list):
@@ -103,8 +136,11 @@ async def bulk_update_token_data(updates: list):
 
     # Update in-memory cache
     for entry in updates:
-        if isinstance(entry, dict):
-            TOKEN_COLLECTION[entry["_id"]] = entry
+        if isinstance(entry, dict) and entry.get("tracked"):
+            TRACKED_TOKEN_META[entry["_id"]] = {
+                "chain_id": entry.get("chain_id"),
+                "symbol": entry.get("symbol")
+            }
 
 # async def remove_from_tracked_tokens(removals: list[dict]):
 #     """
@@ -157,7 +193,7 @@ async def bulk_update_token_data(updates: list):
 
 async def remove_from_tracked_tokens(removals: list[dict]):
     """
-    Remove tokens from the tracked token list in the database and update the cache.
+    Remove tokens from tracking by deleting their per-token documents and update the cache.
 
     :param removals: List of dictionaries in the format:
         [
@@ -165,62 +201,42 @@ async def remove_from_tracked_tokens(removals: list[dict]):
             {"ethereum": ["token_address3"]}
         ]
     """
-    global TOKEN_COLLECTION
-
     collection = get_tokens_collection()
 
-    # Build MongoDB update operations for "tracked_token"
     pull_operations = {}
     addresses_to_remove = []
 
     for chain_update in removals:
         for chain_id, addresses in chain_update.items():
-            # Collect addresses for database deletion
             addresses_to_remove.extend(addresses)
-
-            # Prepare $pull operation for "tracked_token"
             pull_operations[f"token_list.{chain_id}"] = {"address": {"$in": addresses}}
 
-            # Update TOKEN_COLLECTION["tracked_token"]["token_list"]
-            if "tracked_token" in TOKEN_COLLECTION:
-                token_list = TOKEN_COLLECTION["tracked_token"].get("token_list", {})
-                if chain_id in token_list:
-                    TOKEN_COLLECTION["tracked_token"]["token_list"][chain_id] = [
-                        token for token in token_list[chain_id] if token["address"] not in addresses
-                    ]
-
-    # Execute $pull for "tracked_token"
-    if pull_operations:
-        await collection.update_one(
-            {"_id": "tracked_token"},
-            {"$pull": pull_operations}
-        )
-
-    # Remove the documents corresponding to the addresses from TOKEN_COLLECTION
-    for address in addresses_to_remove:
-        TOKEN_COLLECTION.pop(address, None)
-
     # Remove documents for token addresses globally
     if addresses_to_remove:
         await collection.delete_many({"_id": {"$in": addresses_to_remove}})
 
-    logger.info(f"✅ Removed tokens globally from tracked_token and {len(addresses_to_remove)} documents.")
+    for address in addresses_to_remove:
+        TRACKED_TOKEN_META.pop(address, None)
+
+    # Keep the legacy doc consistent while it still exists
+    if LEGACY_TOKEN_LIST and pull_operations:
+        await collection.update_one({"_id": LEGACY_TRACKED_DOC_ID}, {"$pull": pull_operations})
+
+        removed = set(addresses_to_remove)
+        for chain_id in LEGACY_TOKEN_LIST:
+            LEGACY_TOKEN_LIST[chain_id] = [
+                token for token in LEGACY_TOKEN_LIST[chain_id] if token["address"] not in removed
+            ]
+
+    logger.info(f"✅ Removed {len(addresses_to_remove)} tracked token documents.")
 
 
-async def create_token_list_index():
+async def create_token_indexes():
     """
     Create necessary indexes on the tokens collection for efficient queries.
     """
     collection = get_tokens_collection()
 
-    # Ensure an index on token_list.<chain_id>.address for all possible chain IDs
-    index_fields = [
-        ("token_list.bsc.address", 1),
-        ("token_list.ethereum.address", 1),
-        ("token_list.solana.address", 1),
-        ("token_list.sui.address", 1)
-    ]
-    for field, direction in index_fields:
-        await collection.create_index([(field, direction)], background=True)
+    await collection.create_index([("tracked", 1), ("chain_id", 1)], background=True)
 
     logger.info("✅ Indexes created on tokens collection for efficient queries.")
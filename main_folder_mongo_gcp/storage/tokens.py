@@ -4,7 +4,7 @@ import logging
 
 
 
-TRACKED_TOKENS = []
+TRACKED_TOKENS: Dict[str, List[str]] = {}
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +28,7 @@ def load_tracked_tokens():
 
 async def append_to_tracked_tokens(updates: list[dict]):
     """
-    Append tokens to the tracked token list and synchronize both TRACKED_TOKEN and TOKEN_COLLECTION.
+    Append tokens to the tracked token list and synchronize both TRACKED_TOKENS and the token documents.
     
     :param updates: List of updates in the format:
         [
@@ -38,32 +38,22 @@ async def append_to_tracked_tokens(updates: list[dict]):
     """
     global TRACKED_TOKENS
 
-    # Fetch the current state of tracked tokens
-    current_tracked = token_collection.get_tracked_tokens()
-
-    # Update TOKEN_COLLECTION
+    # Collect tokens not yet tracked, avoiding duplicates
+    new_tokens: Dict[str, List[Dict]] = {}
     for chain_update in updates:
-        for chain_id, new_tokens in chain_update.items():
-            # Ensure chain exists in TOKEN_COLLECTION
-            if chain_id not in current_tracked:
-                current_tracked[chain_id] = []
-
-            # Add tokens, avoiding duplicates
-            existing_addresses = {token["address"] for token in current_tracked[chain_id]}
-            for token in new_tokens:
-                if token["address"] not in existing_addresses:
-                    current_tracked[chain_id].append(token)
-
-    # Persist updated TOKEN_COLLECTION
-    await token_collection.save_tracked_tokens(current_tracked)
+        for chain_id, chain_tokens in chain_update.items():
+            tracked = TRACKED_TOKENS.setdefault(chain_id, [])
+            for token in chain_tokens:
+                if token["address"] not in tracked:
+                    tracked.append(token["address"])
+                    new_tokens.setdefault(chain_id, []).append(token)
 
-    # Update TRACKED_TOKEN
-    for chain_id, tokens in current_tracked.items():
-        TRACKED_TOKENS[chain_id] = [token["address"] for token in tokens]
+    # Persist only the newly tracked token documents
+    await token_collection.mark_tokens_tracked(new_tokens)
 
 def rebuild_tracked_token():
     """
-    Rebuild the TRACKED_TOKEN cache from TOKEN_COLLECTION.
+    Rebuild the TRACKED_TOKEN cache from the cached tracked-token metadata.
     """
     global TRACKED_TOKEN
 
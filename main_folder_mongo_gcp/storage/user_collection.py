@@ -1,6 +1,7 @@
 # user_collection.py
 # MongoDB-backed user data manager with in-memory cache support
 
+from typing import Dict, List, Optional
 from mongo_client import get_collection
 from pymongo import UpdateOne
 
@@ -8,6 +9,9 @@ from pymongo import UpdateOne
 # In-memory cache
 USER_COLLECTION = {}
 
+# Reverse referral map: referred user_id -> referrer user_id
+REFERRED_BY: Dict[str, str] = {}
+
 def get_user_collection():
     return get_collection("users")
 
@@ -22,6 +26,61 @@ async def load_user_collection_from_mongo():
 def get_user(user_id: str) -> dict:
     return USER_COLLECTION.get(user_id, {})
 
+# --- Referral Reverse Index ---
+def get_referrer(user_id: str) -> Optional[str]:
+    return REFERRED_BY.get(user_id)
+
+
+async def load_referred_by_index():
+    """
+    Build REFERRED_BY from the cached users. Users referred before the
+    `referred_by` field existed are found through their referrer's pending
+    list and backfilled in one bulk write.
+    """
+    REFERRED_BY.clear()
+    for user_id, doc in USER_COLLECTION.items():
+        if doc.get("referred_by"):
+            REFERRED_BY[user_id] = doc["referred_by"]
+
+    backfill = {}
+    for referrer_id, doc in USER_COLLECTION.items():
+        for referred_id in doc.get("referral", {}).get("referred_users", []):
+            if referred_id not in REFERRED_BY:
+                REFERRED_BY[referred_id] = referrer_id
+                backfill[referred_id] = referrer_id
+
+    if backfill:
+        await get_user_collection().bulk_write(
+            [UpdateOne({"_id": uid}, {"$set": {"referred_by": rid}}, upsert=True) for uid, rid in backfill.items()],
+            ordered=False
+        )
+        for uid, rid in backfill.items():
+            USER_COLLECTION.setdefault(uid, {"_id": uid})["referred_by"] = rid
+
+
+# --- Referral Leaderboard ---
+async def get_top_referrers(limit: int = 5) -> List[dict]:
+    """
+    Top referrers by total commission, served by the referral.total_commission
+    index; pending referrals come back as a count, not the full list.
+    """
+    pipeline = [
+        {"$match": {"referral.total_commission": {"$exists": True}}},
+        {"$sort": {"referral.total_commission": -1}},
+        {"$limit": limit},
+        {"$project": {
+            "total_referred": "$referral.total_referred",
+            "successful_referrals": "$referral.successful_referrals",
+            "pending_referrals": {"$size": {"$ifNull": ["$referral.referred_users", []]}},
+            "total_commission": "$referral.total_commission",
+            "total_paid": "$referral.total_paid",
+            "tx_sig": "$referral.tx_sig",
+        }},
+    ]
+    cursor = await get_user_collection().aggregate(pipeline)
+    return [doc async for doc in cursor]
+
+
 # --- Partial Update (One) ---
 async def update_user_fields(user_id: str, fields: dict):
     collection = get_user_collection()
@@ -130,4 +189,6 @@ async def ensure_user_indexes():
     await collection.create_index("expiry")
     await collection.create_index("referral.wallet_address")
     await collection.create_index("referral.successful_referrals")
+    await collection.create_index("referral.total_commission")
+    await collection.create_index("referred_by")
     await collection.create_index("active_restart")
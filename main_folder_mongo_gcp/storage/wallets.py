@@ -1,67 +1,255 @@
 # wallets.py
+# Deposit wallet pool: address index, O(1) free list and expiring leases
+
+import asyncio
+import heapq
 import logging
 import random
-from typing import Optional, Dict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from mongo_client import get_collection
+from pymongo import DeleteOne, UpdateOne
 import storage.payment_collection as payment_collection
 
-# In-memory wallet cache
-WALLET_LIST = []
+# How long an upgrade/renewal may hold a deposit wallet before it is reclaimed
+LEASE_DURATION = timedelta(minutes=15)
+LEASE_RECLAIM_INTERVAL = 60  # seconds
+
+# address -> {"address", "status", "leased_to", "lease_expires_at"}
+WALLET_INDEX: Dict[str, Dict] = {}
+
+# Available addresses, with each one's position for O(1) removal
+FREE_WALLETS: List[str] = []
+_FREE_POSITION: Dict[str, int] = {}
+
+# (expiry timestamp, address) min-heap; entries go stale when a lease ends early
+LEASE_HEAP: List[Tuple[float, str]] = []
 
 logger = logging.getLogger(__name__)
 
 
+def get_wallet_collection():
+    return get_collection("deposit_wallets")
+
+
+# --- Free List ---
+def _push_free(address: str):
+    if address not in _FREE_POSITION:
+        _FREE_POSITION[address] = len(FREE_WALLETS)
+        FREE_WALLETS.append(address)
+
+
+def _remove_free(address: str):
+    position = _FREE_POSITION.pop(address, None)
+    if position is None:
+        return
+    last = FREE_WALLETS.pop()
+    if last != address:
+        FREE_WALLETS[position] = last
+        _FREE_POSITION[last] = position
+
+
+def _index_wallet(wallet: Dict):
+    address = wallet["address"]
+    WALLET_INDEX[address] = wallet
+    if wallet["status"] == "available":
+        _push_free(address)
+    else:
+        _remove_free(address)
+        expires_at = wallet.get("lease_expires_at")
+        if expires_at:
+            heapq.heappush(LEASE_HEAP, (datetime.fromisoformat(expires_at).timestamp(), address))
+
+
+# --- Load ---
 async def load_wallets():
     """
-    Load wallet data from the payments collection into memory.
+    Load per-wallet docs into the pool, seeding them once from the legacy
+    `payments.deposit_wallets` array.
     """
-    global WALLET_LIST
-    WALLET_LIST = payment_collection.get_deposit_wallets()
-    await initialize_wallet_statuses()
+    collection = get_wallet_collection()
+    await collection.create_index("status")
+
+    docs = [doc async for doc in collection.find({}, {"qr_png": 0})]
+    if not docs:
+        docs = await _migrate_legacy_wallets()
+
+    WALLET_INDEX.clear()
+    FREE_WALLETS.clear()
+    _FREE_POSITION.clear()
+    LEASE_HEAP.clear()
+
+    unleased = []
+    for doc in docs:
+        wallet = {
+            "address": doc["_id"],
+            "status": doc.get("status", "available"),
+            "leased_to": doc.get("leased_to"),
+            "lease_expires_at": doc.get("lease_expires_at"),
+        }
+        # In-use wallets from before leases existed get one, so they are reclaimed
+        if wallet["status"] == "in-use" and not wallet["lease_expires_at"]:
+            wallet["lease_expires_at"] = (datetime.now() + LEASE_DURATION).isoformat()
+            unleased.append(wallet)
+        _index_wallet(wallet)
+
+    if unleased:
+        await _persist_wallets(unleased)
 
-    logger.info("✅ DEPOSIT WALLETS loaded and formatted from database")
+    logger.info(f"✅ DEPOSIT WALLETS loaded: {len(WALLET_INDEX)} total, {len(FREE_WALLETS)} available")
 
-async def save_wallets():
+
+async def _migrate_legacy_wallets() -> List[Dict]:
     """
-    Persist the current wallet list to the database.
+    Runs once: the legacy doc is marked afterwards, so a pool that is later emptied
+    isn't re-seeded from its stale addresses and statuses.
     """
-    collection = payment_collection.get_payments_collection()
+    # Read from Mongo, not the config cache, which a warm start restores from the snapshot
+    payments = payment_collection.get_payments_collection()
+    legacy_doc = await payments.find_one({"_id": "deposit_wallets"}) or {}
+    if legacy_doc.get("migrated_at"):
+        return []
+
+    docs = []
+    for wallet in legacy_doc.get("wallets", []):
+        if isinstance(wallet, str):
+            wallet = {"address": wallet}
+        docs.append({"_id": wallet["address"], "status": wallet.get("status", "available")})
+
+    if docs:
+        await get_wallet_collection().bulk_write(
+            [UpdateOne({"_id": d["_id"]}, {"$setOnInsert": d}, upsert=True) for d in docs],
+            ordered=False
+        )
+        await payments.update_one({"_id": "deposit_wallets"}, {"$set": {"migrated_at": datetime.now().isoformat()}})
+        logger.info(f"📦 Migrated {len(docs)} deposit wallets to per-wallet documents")
+    return docs
 
-    try:
-        # Replace the entire `wallet_list` in the database with the in-memory cache
-        await collection.update_one(
-            {"_id": "deposit_wallets"},
-            {"$set": {"wallets": WALLET_LIST}},
+
+async def _persist_wallets(wallet_list: Iterable[Dict], extra_fields: Optional[Dict[str, Dict]] = None):
+    extra_fields = extra_fields or {}
+    ops = [
+        UpdateOne(
+            {"_id": w["address"]},
+            {"$set": {
+                "status": w["status"],
+                "leased_to": w.get("leased_to"),
+                "lease_expires_at": w.get("lease_expires_at"),
+                **extra_fields.get(w["address"], {}),
+            }},
             upsert=True
         )
-        payment_collection.PAYMENT_COLLECTION["wallets"] = {"_id": "wallets", "wallet_list": WALLET_LIST}
-        logger.info(f"✅ Successfully saved {len(WALLET_LIST)} wallets to the database.")
-    except Exception as e:
-        logger.error(f"❌ Failed to save wallets to the database: {e}")
+        for w in wallet_list
+    ]
+    if ops:
+        await get_wallet_collection().bulk_write(ops, ordered=False)
+
 
+# --- Pool Membership ---
+async def add_wallets(addresses: Iterable[str], qr_codes: Optional[Dict[str, bytes]] = None) -> List[str]:
+    """
+    Add new addresses to the pool as available, in one bulk write; returns the
+    ones actually added. Pre-rendered QR PNGs are stored on the wallet docs.
+    """
+    added = [
+        {"address": addr, "status": "available", "leased_to": None, "lease_expires_at": None}
+        for addr in dict.fromkeys(addresses) if addr not in WALLET_INDEX
+    ]
+    for wallet in added:
+        _index_wallet(wallet)
+    await _persist_wallets(added, {addr: {"qr_png": png} for addr, png in (qr_codes or {}).items()})
+    return [w["address"] for w in added]
 
-async def get_random_wallet() -> Optional[str]:
-    if not WALLET_LIST:
-        await load_wallets()
-    available_wallets = [w for w in WALLET_LIST if w.get("status") == "available"]
-    return random.choice(available_wallets)["address"] if available_wallets else None
+
+async def remove_wallets(addresses: Iterable[str]) -> List[str]:
+    removed = [addr for addr in dict.fromkeys(addresses) if addr in WALLET_INDEX]
+    for addr in removed:
+        WALLET_INDEX.pop(addr)
+        _remove_free(addr)
+    if removed:
+        await get_wallet_collection().bulk_write([DeleteOne({"_id": addr}) for addr in removed], ordered=False)
+    return removed
+
+
+def get_all_addresses() -> List[str]:
+    return list(WALLET_INDEX)
 
 
 def get_wallet_by_address(address: str) -> Optional[Dict]:
-    for wallet in WALLET_LIST:
-        if wallet.get("address") == address:
-            return wallet
-    return None
+    return WALLET_INDEX.get(address)
+
+
+# --- QR Assets ---
+async def load_qr_file_ids() -> Dict[str, str]:
+    """
+    Telegram file_ids of already-uploaded wallet QR codes.
+    """
+    cursor = get_wallet_collection().find({"qr_file_id": {"$exists": True}}, {"qr_file_id": 1})
+    return {doc["_id"]: doc["qr_file_id"] async for doc in cursor}
+
+
+async def load_qr_pngs(addresses: Iterable[str]) -> Dict[str, bytes]:
+    cursor = get_wallet_collection().find(
+        {"_id": {"$in": list(addresses)}, "qr_png": {"$exists": True}},
+        {"qr_png": 1}
+    )
+    return {doc["_id"]: bytes(doc["qr_png"]) async for doc in cursor}
+
+
+async def save_qr_pngs(qr_codes: Dict[str, bytes]):
+    if qr_codes:
+        await get_wallet_collection().bulk_write(
+            [UpdateOne({"_id": addr}, {"$set": {"qr_png": png}}) for addr, png in qr_codes.items()],
+            ordered=False
+        )
+
+
+async def save_qr_file_id(address: str, file_id: str):
+    await get_wallet_collection().update_one({"_id": address}, {"$set": {"qr_file_id": file_id}})
+
+
+# --- Leases ---
+async def lease_wallet(user_id, duration: timedelta = LEASE_DURATION) -> Optional[str]:
+    """
+    Take a random available wallet and mark it in-use until the lease expires.
+    """
+    if not FREE_WALLETS:
+        return None
+
+    address = FREE_WALLETS[random.randrange(len(FREE_WALLETS))]
+    _remove_free(address)
+
+    expires_at = datetime.now() + duration
+    wallet = WALLET_INDEX[address]
+    wallet.update({"status": "in-use", "leased_to": user_id, "lease_expires_at": expires_at.isoformat()})
+    heapq.heappush(LEASE_HEAP, (expires_at.timestamp(), address))
+
+    await _persist_wallets([wallet])
+    return address
 
 
 async def set_wallet_status(address: str, status: str) -> bool:
     """
-    Update wallet status in memory and persist that specific wallet to DB.
+    Update wallet status in memory and persist that wallet's document.
     """
-    for wallet in WALLET_LIST:
-        if wallet.get("address") == address:
-            wallet["status"] = status
-            return await _persist_wallet_status_to_db(address, status)
-    return False
+    wallet = WALLET_INDEX.get(address)
+    if wallet is None:
+        return False
+
+    wallet["status"] = status
+    if status == "available":
+        wallet["leased_to"] = None
+        wallet["lease_expires_at"] = None
+        _push_free(address)
+    else:
+        _remove_free(address)
+        if not wallet.get("lease_expires_at"):
+            expires_at = datetime.now() + LEASE_DURATION
+            wallet["lease_expires_at"] = expires_at.isoformat()
+            heapq.heappush(LEASE_HEAP, (expires_at.timestamp(), address))
+
+    await _persist_wallets([wallet])
+    return True
 
 async def mark_wallet_as_available(address: str) -> bool:
     return await set_wallet_status(address, "available")
@@ -69,49 +257,77 @@ async def mark_wallet_as_available(address: str) -> bool:
 
 async def revert_wallet_status_from_context(context) -> bool:
     wallet = context.user_data.get("payment_wallet")
-    if wallet:
+    # A paid wallet stays held until its deposit has been swept
+    if wallet and (WALLET_INDEX.get(wallet) or {}).get("status") == "in-use":
         return await set_wallet_status(wallet, "available")
     return False
 
 
-async def initialize_wallet_statuses():
+# --- Sweep Hold ---
+async def hold_for_sweep(address: str) -> bool:
     """
-    Ensure all wallets have valid dict structure with 'status'. Persist only updated ones.
+    Keep a paid wallet out of the free list, with no lease to expire, until the
+    sweep has moved its balance; otherwise the next payer's deposit gets swept too.
     """
-    changed_wallets = []
+    wallet = WALLET_INDEX.get(address)
+    if wallet is None:
+        return False
 
-    for i, wallet in enumerate(WALLET_LIST):
-        if isinstance(wallet, str):
-            WALLET_LIST[i] = {"address": wallet, "status": "available"}
-            changed_wallets.append(WALLET_LIST[i])
-        elif "status" not in wallet:
-            wallet["status"] = "available"
-            changed_wallets.append(wallet)
-
-    for wallet in changed_wallets:
-        await _persist_wallet_status_to_db(wallet["address"], wallet["status"])
-
-
-async def _persist_wallet_status_to_db(address: str, status: str) -> bool:
-    """
-    Update only the status of a specific wallet inside the 'wallets' array in MongoDB.
-    """
-    collection = payment_collection.get_payments_collection()
-    result = await collection.update_one(
-        {
-            "_id": "deposit_wallets",
-            "wallets.address": address
-        },
-        {
-            "$set": {
-                "wallets.$.status": status
-            }
-        }
-    )
-    # Sync to in-memory cache
-    if "deposit_wallets" in payment_collection.PAYMENT_COLLECTION:
-        for w in payment_collection.PAYMENT_COLLECTION["deposit_wallets"].get("wallets", []):
-            if w["address"] == address:
-                w["status"] = status
-                break
-    return result.modified_count > 0
\ No newline at end of file
+    wallet.update({"status": "awaiting-sweep", "lease_expires_at": None})
+    _remove_free(address)
+    await _persist_wallets([wallet])
+    return True
+
+
+async def release_swept_wallets(addresses: Iterable[str]) -> List[str]:
+    """
+    Return held wallets to the free list once the sweep has emptied them.
+    """
+    released = [
+        WALLET_INDEX[addr] for addr in dict.fromkeys(addresses)
+        if (WALLET_INDEX.get(addr) or {}).get("status") == "awaiting-sweep"
+    ]
+    for wallet in released:
+        wallet.update({"status": "available", "leased_to": None, "lease_expires_at": None})
+        _push_free(wallet["address"])
+
+    await _persist_wallets(released)
+    return [w["address"] for w in released]
+
+
+async def reclaim_expired_leases(now: Optional[datetime] = None) -> List[str]:
+    """
+    Return wallets whose lease has run out to the free list.
+    """
+    now_ts = (now or datetime.now()).timestamp()
+    reclaimed = []
+
+    while LEASE_HEAP and LEASE_HEAP[0][0] <= now_ts:
+        expires_ts, address = heapq.heappop(LEASE_HEAP)
+        wallet = WALLET_INDEX.get(address)
+        # Skip entries for wallets released, removed or re-leased since
+        if (
+            wallet is None
+            or wallet["status"] == "available"
+            or not wallet.get("lease_expires_at")
+            or datetime.fromisoformat(wallet["lease_expires_at"]).timestamp() != expires_ts
+        ):
+            continue
+
+        wallet.update({"status": "available", "leased_to": None, "lease_expires_at": None})
+        _push_free(address)
+        reclaimed.append(wallet)
+
+    if reclaimed:
+        await _persist_wallets(reclaimed)
+        logger.info(f"♻️ Reclaimed {len(reclaimed)} deposit wallets with expired leases")
+    return [w["address"] for w in reclaimed]
+
+
+async def run_lease_reclaimer(interval: float = LEASE_RECLAIM_INTERVAL):
+    while True:
+        try:
+            await reclaim_expired_leases()
+        except Exception as e:
+            logger.error(f"❌ Wallet lease reclaim failed: {e}")
+        await asyncio.sleep(interval)
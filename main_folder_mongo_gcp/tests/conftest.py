@@ -0,0 +1,22 @@
+# conftest.py
+# Modules in this package use top-level imports (`import storage.x`), so the
+# package directory itself has to be on sys.path.
+
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+@pytest.fixture
+def offline_secrets(monkeypatch):
+    """
+    Replace the Secret Manager loader, which opens a GCP client at import time.
+    """
+    gcp_loader = types.ModuleType("pwd_loader.gcp_loader")
+    gcp_loader.get_secret = lambda name, version="latest": None
+    gcp_loader.get_wallet_password = lambda: "test-password"
+    monkeypatch.setitem(sys.modules, "pwd_loader.gcp_loader", gcp_loader)
@@ -0,0 +1,44 @@
+# test_display_names.py
+# Admin listings fetch each display name once, concurrently, and reuse it.
+
+import asyncio
+from types import SimpleNamespace
+
+import util.display_names as display_names
+
+
+class FakeBot:
+    def __init__(self, failing=()):
+        self.calls = []
+        self.failing = set(failing)
+
+    async def get_chat(self, chat_id):
+        self.calls.append(chat_id)
+        if chat_id in self.failing:
+            raise RuntimeError("Chat not found")
+        return SimpleNamespace(full_name=f"Name {chat_id}")
+
+
+def test_names_are_fetched_once():
+    display_names.DISPLAY_NAMES.clear()
+    bot = FakeBot()
+
+    async def scenario():
+        first = await display_names.get_display_names(bot, [1, 2])
+        second = await display_names.get_display_names(bot, ["1", "2"])
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first == second == {"1": "Name 1", "2": "Name 2"}
+    assert sorted(bot.calls) == [1, 2]
+
+
+def test_failed_lookup_is_not_cached():
+    display_names.DISPLAY_NAMES.clear()
+    bot = FakeBot(failing={3})
+
+    assert asyncio.run(display_names.get_display_name(bot, 3)) == "User 3"
+
+    bot.failing.clear()
+    assert asyncio.run(display_names.get_display_name(bot, 3)) == "Name 3"
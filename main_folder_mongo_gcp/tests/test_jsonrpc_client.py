@@ -0,0 +1,135 @@
+# test_jsonrpc_client.py
+# JsonRpcBatchClient against a local JSON-RPC stub server.
+
+import asyncio
+
+from aiohttp import web
+
+from util.jsonrpc_client import JsonRpcBatchClient, JsonRpcError
+
+
+class StubRpcServer:
+    """Answers getSlot/echo, fails "boom", and records every POST it receives."""
+
+    def __init__(self):
+        self.posts = []
+        self.peers = set()
+        self.status = 200
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.posts.append(body)
+        self.peers.add(request.transport.get_extra_info("peername"))
+
+        if self.status != 200:
+            return web.Response(status=self.status)
+
+        requests = body if isinstance(body, list) else [body]
+        replies = []
+        for req in requests:
+            if req["method"] == "boom":
+                replies.append({"jsonrpc": "2.0", "id": req["id"], "error": {"code": -32000, "message": "boom"}})
+            elif req["method"] == "echo":
+                replies.append({"jsonrpc": "2.0", "id": req["id"], "result": req["params"][0]})
+            else:
+                replies.append({"jsonrpc": "2.0", "id": req["id"], "result": 42})
+
+        # Servers may answer a batch in any order
+        replies.reverse()
+        return web.json_response(replies if isinstance(body, list) else replies[0])
+
+
+async def _with_server(scenario):
+    server = StubRpcServer()
+    app = web.Application()
+    app.router.add_post("/", server.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    client = JsonRpcBatchClient(f"http://127.0.0.1:{port}/")
+    try:
+        return await scenario(server, client)
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+def test_concurrent_calls_share_one_post():
+    async def scenario(server, client):
+        results = await asyncio.gather(*[client.call("echo", [i]) for i in range(20)])
+        return server, results
+
+    server, results = asyncio.run(_with_server(scenario))
+
+    assert results == list(range(20))
+    assert len(server.posts) == 1
+    assert len(server.posts[0]) == 20
+
+
+def test_error_only_fails_its_own_caller():
+    async def scenario(server, client):
+        return await asyncio.gather(
+            client.call("getSlot"),
+            client.call("boom"),
+            client.call("echo", ["ok"]),
+            return_exceptions=True
+        )
+
+    slot, failed, echoed = asyncio.run(_with_server(scenario))
+
+    assert slot == 42
+    assert isinstance(failed, JsonRpcError) and failed.code == -32000
+    assert echoed == "ok"
+
+
+def test_call_batch_returns_results_in_request_order():
+    async def scenario(server, client):
+        results = await client.call_batch([("echo", ["a"]), ("boom", None), ("echo", ["b"])])
+        return server, results
+
+    server, results = asyncio.run(_with_server(scenario))
+
+    assert results[0] == "a"
+    assert isinstance(results[1], JsonRpcError)
+    assert results[2] == "b"
+    assert len(server.posts) == 1
+
+
+def test_sequential_calls_reuse_keep_alive_connection():
+    async def scenario(server, client):
+        for i in range(5):
+            assert await client.call("echo", [i]) == i
+        return server
+
+    server = asyncio.run(_with_server(scenario))
+
+    assert len(server.posts) == 5
+    assert len(server.peers) == 1
+
+
+def test_http_failure_fails_every_caller():
+    async def scenario(server, client):
+        server.status = 503
+        return await asyncio.gather(*[client.call("getSlot") for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(_with_server(scenario))
+
+    assert len(results) == 3
+    assert all(isinstance(r, Exception) for r in results)
+
+
+def test_large_bursts_are_split_at_max_batch_size(monkeypatch):
+    import util.jsonrpc_client as jsonrpc_client
+    monkeypatch.setattr(jsonrpc_client, "MAX_BATCH_SIZE", 10)
+
+    async def scenario(server, client):
+        results = await asyncio.gather(*[client.call("echo", [i]) for i in range(25)])
+        return server, results
+
+    server, results = asyncio.run(_with_server(scenario))
+
+    assert results == list(range(25))
+    assert sorted(len(post) for post in server.posts) == [5, 10, 10]
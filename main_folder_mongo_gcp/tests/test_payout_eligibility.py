@@ -0,0 +1,51 @@
+# test_payout_eligibility.py
+# The eligibility index tracks single-user changes without rescanning the user cache.
+
+
+def _referral(commission=0.0, paid=0.0, successful=0, wallet=""):
+    return {
+        "referred_users": [],
+        "total_commission": commission,
+        "total_paid": paid,
+        "wallet_address": wallet,
+        "successful_referrals": successful,
+        "total_referred": successful,
+    }
+
+
+def _index_over(monkeypatch, users):
+    import storage.payout_eligibility as payout_eligibility
+    import storage.user_collection as user_collection
+
+    monkeypatch.setattr(user_collection, "USER_COLLECTION", users)
+    monkeypatch.setattr(payout_eligibility, "ELIGIBLE_WITH_WALLET", {})
+    monkeypatch.setattr(payout_eligibility, "ELIGIBLE_WITHOUT_WALLET", {})
+    payout_eligibility.rebuild_eligibility_index()
+    return payout_eligibility
+
+
+def test_rebuild_splits_by_wallet(offline_secrets, monkeypatch):
+    payout_eligibility = _index_over(monkeypatch, {
+        "1": {"referral": _referral(commission=50.0, paid=10.0, successful=5, wallet="Wallet1")},
+        "2": {"referral": _referral(commission=20.0, successful=6)},
+        "3": {"referral": _referral(commission=20.0, successful=4, wallet="Wallet3")},
+        "4": {"referral": _referral(commission=20.0, paid=20.0, successful=9, wallet="Wallet4")},
+        "5": {},
+    })
+
+    assert payout_eligibility.ELIGIBLE_WITH_WALLET == {"1": 40.0}
+    assert payout_eligibility.ELIGIBLE_WITHOUT_WALLET == {"2": 20.0}
+
+
+def test_refresh_follows_wallet_link_and_payout(offline_secrets, monkeypatch):
+    users = {"2": {"referral": _referral(commission=20.0, successful=6)}}
+    payout_eligibility = _index_over(monkeypatch, users)
+
+    users["2"]["referral"]["wallet_address"] = "Wallet2"
+    payout_eligibility.refresh_user("2")
+    with_wallet, without_wallet = payout_eligibility.get_eligible_users()
+    assert [uid for uid, _ in with_wallet] == ["2"] and without_wallet == []
+
+    users["2"]["referral"].update({"total_paid": 20.0, "successful_referrals": 0})
+    payout_eligibility.refresh_user("2")
+    assert payout_eligibility.get_eligible_users() == ([], [])
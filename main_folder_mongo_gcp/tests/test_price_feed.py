@@ -0,0 +1,112 @@
+# test_price_feed.py
+# SolPriceFeed against local stub price sources.
+
+import asyncio
+
+import pytest
+from aiohttp import web
+
+import util.price_feed as price_feed
+from util.price_feed import PriceUnavailable, SolPriceFeed
+
+
+class StubPriceSources:
+    """Two local price endpoints whose answers and failures the test controls."""
+
+    def __init__(self):
+        self.hits = {"primary": 0, "backup": 0}
+        self.prices = {"primary": 150.0, "backup": 149.0}
+        self.failing = set()
+        self.delay = 0.0
+
+    def handler(self, name):
+        async def handle(request: web.Request) -> web.Response:
+            self.hits[name] += 1
+            await asyncio.sleep(self.delay)
+            if name in self.failing:
+                return web.Response(status=429)
+            return web.json_response({"usd": self.prices[name]})
+        return handle
+
+
+async def _with_feed(scenario):
+    stub = StubPriceSources()
+    app = web.Application()
+    app.router.add_get("/primary", stub.handler("primary"))
+    app.router.add_get("/backup", stub.handler("backup"))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    feed = SolPriceFeed([
+        (name, f"http://127.0.0.1:{port}/{name}", lambda data: data["usd"])
+        for name in ("primary", "backup")
+    ])
+    try:
+        return await scenario(stub, feed)
+    finally:
+        await feed.close()
+        await runner.cleanup()
+
+
+def test_concurrent_callers_share_one_fetch():
+    async def scenario(stub, feed):
+        stub.delay = 0.05
+        prices = await asyncio.gather(*[feed.get_price() for _ in range(20)])
+        return stub, prices
+
+    stub, prices = asyncio.run(_with_feed(scenario))
+
+    assert prices == [150.0] * 20
+    assert stub.hits["primary"] == 1
+
+
+def test_fresh_price_is_served_from_cache():
+    async def scenario(stub, feed):
+        await feed.get_price()
+        await feed.get_price()
+        return stub
+
+    stub = asyncio.run(_with_feed(scenario))
+
+    assert stub.hits["primary"] == 1
+
+
+def test_falls_back_to_next_source():
+    async def scenario(stub, feed):
+        stub.failing.add("primary")
+        return await feed.get_price(), feed.source
+
+    price, source = asyncio.run(_with_feed(scenario))
+
+    assert price == 149.0
+    assert source == "backup"
+
+
+def test_stale_price_is_served_while_refreshing():
+    async def scenario(stub, feed):
+        await feed.get_price()
+        stub.prices["primary"] = 160.0
+        feed.updated_at -= price_feed.REFRESH_INTERVAL + 1
+
+        served = await feed.get_price()
+        await asyncio.sleep(0.1)  # let the background refresh land
+        return served, feed.price
+
+    served, refreshed = asyncio.run(_with_feed(scenario))
+
+    assert served == 150.0
+    assert refreshed == 160.0
+
+
+def test_price_past_max_staleness_is_not_served():
+    async def scenario(stub, feed):
+        await feed.get_price()
+        stub.failing.update({"primary", "backup"})
+        feed.updated_at -= price_feed.MAX_STALENESS + 1
+        await feed.get_price()
+
+    with pytest.raises(PriceUnavailable):
+        asyncio.run(_with_feed(scenario))
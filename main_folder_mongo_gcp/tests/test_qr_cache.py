@@ -0,0 +1,76 @@
+# test_qr_cache.py
+# Payment screens upload a wallet's QR once, then reuse Telegram's file_id.
+
+import asyncio
+from types import SimpleNamespace
+
+from telegram import InputFile
+from telegram.error import BadRequest
+
+
+class FakeChat:
+    """Records what send_photo was given; uploads get a fresh file_id."""
+
+    def __init__(self, reject_file_ids: bool = False):
+        self.sent = []
+        self.reject_file_ids = reject_file_ids
+
+    async def send_photo(self, photo, **kwargs):
+        self.sent.append(photo)
+        if isinstance(photo, str):
+            if self.reject_file_ids:
+                raise BadRequest("Wrong file identifier/http url specified")
+            return SimpleNamespace(photo=[])
+        return SimpleNamespace(photo=[SimpleNamespace(file_id=f"file-{len(self.sent)}")])
+
+
+def _offline_storage(monkeypatch):
+    import util.qr_cache as qr_cache
+
+    saved = {"pngs": {}, "file_ids": {}}
+
+    async def load_qr_pngs(addresses):
+        return {}
+
+    async def save_qr_pngs(qr_codes):
+        saved["pngs"].update(qr_codes)
+
+    async def save_qr_file_id(address, file_id):
+        saved["file_ids"][address] = file_id
+
+    monkeypatch.setattr(qr_cache.wallets, "load_qr_pngs", load_qr_pngs)
+    monkeypatch.setattr(qr_cache.wallets, "save_qr_pngs", save_qr_pngs)
+    monkeypatch.setattr(qr_cache.wallets, "save_qr_file_id", save_qr_file_id)
+    monkeypatch.setattr(qr_cache, "QR_FILE_IDS", {})
+    qr_cache.QR_PNG_CACHE.clear()
+    return qr_cache, saved
+
+
+def test_second_send_reuses_file_id(offline_secrets, monkeypatch):
+    qr_cache, saved = _offline_storage(monkeypatch)
+    chat = FakeChat()
+
+    async def scenario():
+        await qr_cache.send_wallet_qr(chat, "Wallet1111", caption="pay")
+        await qr_cache.send_wallet_qr(chat, "Wallet1111", caption="pay")
+
+    asyncio.run(scenario())
+
+    upload, reuse = chat.sent
+    assert isinstance(upload, InputFile)
+    assert reuse == "file-1"
+    assert saved["file_ids"] == {"Wallet1111": "file-1"}
+    assert "Wallet1111" in saved["pngs"]
+
+
+def test_rejected_file_id_falls_back_to_upload(offline_secrets, monkeypatch):
+    qr_cache, _ = _offline_storage(monkeypatch)
+    qr_cache.QR_FILE_IDS["Wallet1111"] = "stale-id"
+    chat = FakeChat(reject_file_ids=True)
+
+    asyncio.run(qr_cache.send_wallet_qr(chat, "Wallet1111", caption="pay"))
+
+    stale, upload = chat.sent
+    assert stale == "stale-id"
+    assert isinstance(upload, InputFile)
+    assert qr_cache.QR_FILE_IDS["Wallet1111"] == "file-2"
@@ -0,0 +1,106 @@
+# test_referral_index.py
+# Referrer lookups on upgrade go through the referred_by reverse map, not a user scan.
+
+import asyncio
+
+
+class FakeUserCollection:
+    """Records the Mongo writes made by the referral code."""
+
+    def __init__(self):
+        self.bulk_writes = []
+        self.updates = []
+
+    async def bulk_write(self, ops, ordered=True):
+        self.bulk_writes.append(ops)
+
+    async def update_one(self, query, update, upsert=False):
+        self.updates.append((query, update))
+
+
+def _offline_users(monkeypatch, users):
+    import storage.user_collection as user_collection
+
+    fake = FakeUserCollection()
+    monkeypatch.setattr(user_collection, "get_user_collection", lambda: fake)
+    monkeypatch.setattr(user_collection, "USER_COLLECTION", users)
+    monkeypatch.setattr(user_collection, "REFERRED_BY", {})
+    return user_collection, fake
+
+
+def _referral(referred_users=(), successful=0, commission=0.0):
+    return {
+        "referred_users": list(referred_users),
+        "total_commission": commission,
+        "total_paid": 0.0,
+        "wallet_address": "",
+        "successful_referrals": successful,
+        "total_referred": len(referred_users),
+    }
+
+
+def test_legacy_referrals_are_backfilled(offline_secrets, monkeypatch):
+    user_collection, fake = _offline_users(monkeypatch, {
+        "1": {"_id": "1", "referral": _referral(["2", "3"])},
+        "2": {"_id": "2"},
+        "3": {"_id": "3", "referred_by": "9"},
+    })
+
+    asyncio.run(user_collection.load_referred_by_index())
+
+    assert user_collection.REFERRED_BY == {"2": "1", "3": "9"}
+    assert user_collection.USER_COLLECTION["2"]["referred_by"] == "1"
+    assert len(fake.bulk_writes) == 1 and len(fake.bulk_writes[0]) == 1
+
+
+def test_upgrade_credits_pending_referrer_once(offline_secrets, monkeypatch):
+    import referral
+
+    user_collection, fake = _offline_users(monkeypatch, {
+        "1": {"_id": "1", "referral": _referral(["2"])},
+        "2": {"_id": "2", "referred_by": "1"},
+    })
+    user_collection.REFERRED_BY["2"] = "1"
+
+    async def scenario():
+        first = await referral.on_upgrade_completed(2, 100.0, 6)
+        second = await referral.on_upgrade_completed(2, 100.0, 6)
+        return first, second
+
+    (credited, commission, referrer), second = asyncio.run(scenario())
+
+    assert credited and referrer == 1 and commission == 100.0 * referral.REFERRAL_PERCENTAGE
+    assert second == (False, 0, None)
+    assert user_collection.USER_COLLECTION["1"]["referral"]["referred_users"] == []
+    assert ({"_id": "1"}, {"$pull": {"referral.referred_users": "2"}}) in fake.updates
+
+
+def test_register_keeps_first_referrer(offline_secrets, monkeypatch):
+    import referral
+
+    user_collection, _ = _offline_users(monkeypatch, {})
+
+    async def scenario():
+        return await referral.register_referral(1, 2), await referral.register_referral(3, 2)
+
+    assert asyncio.run(scenario()) == (True, False)
+    assert user_collection.get_referrer("2") == "1"
+
+
+def test_converted_user_cannot_be_re_registered(offline_secrets, monkeypatch):
+    import referral
+
+    user_collection, _ = _offline_users(monkeypatch, {})
+
+    async def scenario():
+        await referral.register_referral(1, 2)
+        first = await referral.on_upgrade_completed(2, 100.0, 6)
+        registered_again = await referral.register_referral(1, 2)
+        second = await referral.on_upgrade_completed(2, 100.0, 6)
+        return first, registered_again, second
+
+    (credited, _, _), registered_again, second = asyncio.run(scenario())
+
+    assert credited and not registered_again
+    assert second == (False, 0, None)
+    assert user_collection.USER_COLLECTION["1"]["referral"]["successful_referrals"] == 1
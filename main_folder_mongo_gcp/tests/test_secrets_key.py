@@ -0,0 +1,61 @@
+# test_secrets_key.py
+# Key material is fetched and derived once per process, not once per wallet.
+
+
+def _counting_key_source(monkeypatch, secrets_key):
+    calls = {"salt": 0, "password": 0, "derive": 0}
+
+    def get_secret(name, version="latest"):
+        calls["salt"] += 1
+        return "test-salt"
+
+    def get_wallet_password():
+        calls["password"] += 1
+        return "test-password"
+
+    real_derive_key = secrets_key.derive_key
+
+    def derive_key(password):
+        calls["derive"] += 1
+        return real_derive_key(password)
+
+    monkeypatch.setattr(secrets_key, "get_secret", get_secret)
+    monkeypatch.setattr(secrets_key, "get_wallet_password", get_wallet_password)
+    monkeypatch.setattr(secrets_key, "derive_key", derive_key)
+    secrets_key.clear_key_cache()
+    return calls
+
+
+def test_many_wallets_share_one_derivation(offline_secrets, monkeypatch):
+    import secrets_key
+
+    calls = _counting_key_source(monkeypatch, secrets_key)
+
+    plain_keys = [f"wallet-secret-{i}" for i in range(50)]
+    encrypted = [secrets_key.encrypt_key(k) for k in plain_keys]
+
+    assert [secrets_key.decrypt_key(e) for e in encrypted] == plain_keys
+    assert calls == {"salt": 1, "password": 1, "derive": 1}
+
+
+def test_explicit_password_matches_default_key(offline_secrets, monkeypatch):
+    import secrets_key
+
+    calls = _counting_key_source(monkeypatch, secrets_key)
+
+    encrypted = secrets_key.encrypt_key("wallet-secret", "test-password")
+
+    assert secrets_key.decrypt_key(encrypted) == "wallet-secret"
+    assert calls["derive"] == 1
+
+
+def test_clear_key_cache_refetches_material(offline_secrets, monkeypatch):
+    import secrets_key
+
+    calls = _counting_key_source(monkeypatch, secrets_key)
+
+    secrets_key.encrypt_key("wallet-secret")
+    secrets_key.clear_key_cache()
+    secrets_key.encrypt_key("wallet-secret")
+
+    assert calls == {"salt": 2, "password": 2, "derive": 2}
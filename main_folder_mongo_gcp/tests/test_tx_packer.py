@@ -0,0 +1,103 @@
+# test_tx_packer.py
+# Packed payout transactions must serialize within the real size and compute limits.
+
+import pytest
+from solders.hash import Hash # type: ignore
+from solders.instruction import AccountMeta, Instruction # type: ignore
+from solders.keypair import Keypair # type: ignore
+from solders.message import Message # type: ignore
+from solders.pubkey import Pubkey # type: ignore
+from solders.transaction import Transaction # type: ignore
+
+from util.tx_packer import (
+    MAX_TRANSACTION_SIZE, TRANSFER_COMPUTE_UNITS, CREATE_ATA_COMPUTE_UNITS,
+    pack_instructions, transaction_size, legacy_transaction_count
+)
+
+TOKEN_PROGRAM_ID = Pubkey.from_string("TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA")
+ASSOCIATED_TOKEN_PROGRAM_ID = Pubkey.from_string("ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL")
+SYSTEM_PROGRAM_ID = Pubkey.from_string("11111111111111111111111111111111")
+SYSVAR_RENT_PUBKEY = Pubkey.from_string("SysvarRent111111111111111111111111111111111")
+USDC_MINT = Pubkey.from_string("4zMMC9srt5Ri5X14GAgXhaHii3GnPAEERYPJgZJDncDU")
+
+SENDER = Keypair()
+SENDER_TOKEN_ACCOUNT = Pubkey.new_unique()
+
+
+def _payout_item(index: int, create_ata: bool):
+    owner = Pubkey.new_unique()
+    ata = Pubkey.new_unique()
+    instructions = []
+
+    if create_ata:
+        instructions.append(Instruction(
+            program_id=ASSOCIATED_TOKEN_PROGRAM_ID,
+            accounts=[
+                AccountMeta(pubkey=SENDER.pubkey(), is_signer=True, is_writable=True),
+                AccountMeta(pubkey=ata, is_signer=False, is_writable=True),
+                AccountMeta(pubkey=owner, is_signer=False, is_writable=False),
+                AccountMeta(pubkey=USDC_MINT, is_signer=False, is_writable=False),
+                AccountMeta(pubkey=SYSTEM_PROGRAM_ID, is_signer=False, is_writable=False),
+                AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
+                AccountMeta(pubkey=SYSVAR_RENT_PUBKEY, is_signer=False, is_writable=False),
+            ],
+            data=bytes()
+        ))
+
+    instructions.append(Instruction(
+        program_id=TOKEN_PROGRAM_ID,
+        accounts=[
+            AccountMeta(pubkey=SENDER_TOKEN_ACCOUNT, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=ata, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=SENDER.pubkey(), is_signer=True, is_writable=False),
+        ],
+        data=bytes([3]) + (1_000_000 + index).to_bytes(8, byteorder="little")
+    ))
+
+    compute_units = TRANSFER_COMPUTE_UNITS + (CREATE_ATA_COMPUTE_UNITS if create_ata else 0)
+    return instructions, compute_units, index
+
+
+def _signed_size(group) -> int:
+    instructions = [ix for item in group for ix in item[0]]
+    message = Message.new_with_blockhash(instructions, SENDER.pubkey(), Hash.default())
+    return len(bytes(Transaction([SENDER], message, Hash.default())))
+
+
+def test_transaction_size_matches_signed_transaction():
+    item = _payout_item(0, create_ata=True)
+    assert transaction_size(item[0], SENDER.pubkey()) == _signed_size([item])
+
+
+def test_packs_mixed_payouts_up_to_size_limit():
+    items = [_payout_item(i, create_ata=(i % 3 == 0)) for i in range(60)]
+    packed = pack_instructions(items, SENDER.pubkey())
+
+    # Every payout lands exactly once, in order
+    assert [payload for group in packed for _, _, payload in group] == list(range(60))
+
+    for group, next_group in zip(packed, packed[1:]):
+        assert _signed_size(group) <= MAX_TRANSACTION_SIZE
+        # Greedy: the next payout would not have fit
+        assert _signed_size(group + [next_group[0]]) > MAX_TRANSACTION_SIZE
+    assert _signed_size(packed[-1]) <= MAX_TRANSACTION_SIZE
+
+    # Mixed transactions exist and beat the old 5-per-tx / 2-ATA-per-tx batching
+    assert any(len({ct > TRANSFER_COMPUTE_UNITS for _, ct, _ in g}) == 2 for g in packed)
+    assert len(packed) < legacy_transaction_count(40, 20)
+
+
+def test_respects_compute_limit():
+    items = [_payout_item(i, create_ata=True) for i in range(6)]
+    per_item = TRANSFER_COMPUTE_UNITS + CREATE_ATA_COMPUTE_UNITS
+
+    packed = pack_instructions(items, SENDER.pubkey(), max_compute=per_item * 2)
+
+    assert [len(group) for group in packed] == [2, 2, 2]
+
+
+def test_oversized_payout_is_rejected():
+    item = _payout_item(0, create_ata=True)
+
+    with pytest.raises(ValueError):
+        pack_instructions([item], SENDER.pubkey(), max_size=200)
@@ -0,0 +1,33 @@
+# test_wallet_keygen.py
+# Worker-side wallet provisioning: keys, encryption and QR PNGs line up per wallet.
+
+from base58 import b58decode, b58encode
+from cryptography.fernet import Fernet
+from solders.keypair import Keypair # type: ignore
+
+from util.wallet_keygen import generate_wallets, import_wallets
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def test_generated_wallets_round_trip():
+    key = Fernet.generate_key()
+
+    provisioned = generate_wallets(3, key)
+
+    assert len({address for address, _, _, _ in provisioned}) == 3
+    for address, secret, encrypted, qr_png in provisioned:
+        assert str(Keypair.from_bytes(b58decode(secret)).pubkey()) == address
+        assert Fernet(key).decrypt(encrypted.encode()).decode() == secret
+        assert qr_png.startswith(PNG_SIGNATURE)
+
+
+def test_import_keeps_valid_keys_and_reports_invalid_ones():
+    keypair = Keypair()
+    secret = b58encode(bytes(keypair)).decode()
+
+    results = import_wallets([secret, "not-a-key"], Fernet.generate_key())
+
+    (_, wallet, error), (bad_input, bad_wallet, bad_error) = results
+    assert error is None and wallet[0] == str(keypair.pubkey())
+    assert bad_input == "not-a-key" and bad_wallet is None and bad_error
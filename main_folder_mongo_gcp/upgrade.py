@@ -1,12 +1,9 @@
 import asyncio
-import aiohttp
-import qrcode
-import io
 import secrets
 
 
 from telegram.error import BadRequest
-from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, InputFile
+from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import (ContextTypes, ConversationHandler, CommandHandler, CallbackQueryHandler,
                           MessageHandler, filters
                           )
@@ -16,13 +13,18 @@ import storage.tiers as tiers
 
 from storage import wallets
 from storage import payment_logs
-from withdrawal import forward_user_payment, run_forward_user_payment
+from util.sweep_scheduler import schedule_sweep
 
 from datetime import datetime, timedelta
+from functools import partial
 
-from util.utils import build_custom_update_from_query, send_message
+from util.utils import build_custom_update_from_query, build_custom_update_for_user, send_message
+import util.tx_cache as tx_cache
+import util.deposit_watcher as deposit_watcher
+import util.qr_cache as qr_cache
+from util.price_feed import SOL_PRICE_FEED
 from config import (SUPER_ADMIN_ID, BOT_ERROR_LOGS_ID, DIVIDER_LINE, BOT_TG_GROUP,
-                    SOLANA_RPC, SOL_DECIMALS, SOL_PAYMENT_TOLERANCE,
+                    SOL_DECIMALS, SOL_PAYMENT_TOLERANCE,
                     BOT_INFO_LOGS_ID, BOT_REFERRAL_LOGS_ID
                     )
 
@@ -34,12 +36,8 @@ SELECTING_TIER, SELECTING_DURATION, PAYMENT, ASK_TRANSACTION_HASH, VERIFICATION
 
 
 async def fetch_sol_price_usd() -> float:
-    """Fetch current SOL price in USD from CoinGecko."""
-    url = "https://api.coingecko.com/api/v3/simple/price?ids=solana&vs_currencies=usd"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as resp:
-            data = await resp.json()
-            return data['solana']['usd']
+    """Current SOL price in USD from the cached, background-refreshed feed."""
+    return await SOL_PRICE_FEED.get_price()
 
 # === TRANSACTION HASH PROMPT ===
 async def prompt_transaction_hash(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -266,14 +264,12 @@ async def handle_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return ConversationHandler.END
 
 
-    chosen_wallet = await wallets.get_random_wallet()
+    # Lease a wallet; it returns to the pool on its own if the payment is abandoned
+    chosen_wallet = await wallets.lease_wallet(user_id)
     if not chosen_wallet:
         await query.message.edit_text("❌ No wallets available for payment at this time. Please try again later.")
         return ConversationHandler.END
 
-    # Mark wallet as in-use
-    await wallets.set_wallet_status(chosen_wallet, "in-use")
-
 
     # Set price in USDC based on duration (you can customize this mapping)
     tier_prices_usdc = {
@@ -305,13 +301,12 @@ async def handle_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "payment_start_time": datetime.now()
     })
 
+    # 👀 Let the deposit watcher complete this payment without a pasted hash
+    deposit_watcher.open_session(
+        chosen_wallet, user_id, payment_id, amount_in_sol, context.user_data["payment_start_time"],
+        partial(complete_detected_payment, context, user_id, payment_id)
+    )
 
-    # Generate QR code (wallet address only)
-    qr = qrcode.make(chosen_wallet)
-    bio = io.BytesIO()
-    bio.name = 'qr.png'
-    qr.save(bio, 'PNG')
-    bio.seek(0)
 
     # Build payment message
     payment_para_1 = (
@@ -345,8 +340,10 @@ async def handle_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # Send payment instructions + QR code
     await query.message.delete()
-    await update.effective_chat.send_photo(
-        photo=InputFile(bio),
+    # QR comes from the pre-rendered cache, or Telegram's file_id once uploaded
+    await qr_cache.send_wallet_qr(
+        update.effective_chat,
+        chosen_wallet,
         caption=payment_msg,
         parse_mode="Markdown",
         reply_markup=payment_keyboard
@@ -380,6 +377,12 @@ async def verify_payment_from_hash(update: Update, context: ContextTypes.DEFAULT
         return ConversationHandler.END
 
     tx_sig = user_input.strip()
+
+    # 🔁 Reject a signature that already verified another payment
+    existing = await payment_logs.find_payment_by_tx_sig(tx_sig)
+    if existing and existing != (str(user_id), payment_reference):
+        await update.message.reply_text("⚠️ This transaction hash has already been used for another payment.")
+        return ASK_TRANSACTION_HASH
     
     # ✅ Log new payment only after hash is submitted
     await payment_logs.log_user_payment(user_id, payment_reference, {
@@ -389,24 +392,13 @@ async def verify_payment_from_hash(update: Update, context: ContextTypes.DEFAULT
     "amount_in_usdc": upgrade_fee,
     "amount_in_sol": amount_expected,
     "start_time": start_time.isoformat(),
-    "tx_sig": tx_sig
+    "submitted_tx_sig": tx_sig
     })
 
 
     # === Call Solana RPC to get transaction info ===
-    headers = {"Content-Type": "application/json"}
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "getTransaction",
-        "params": [tx_sig, {"encoding": "jsonParsed"}]
-    }
-
-    async with aiohttp.ClientSession() as session:
-        async with session.post(SOLANA_RPC, headers=headers, json=payload) as resp:
-            data = await resp.json()
+    transaction = await tx_cache.get_transaction(tx_sig)
 
-    transaction = data.get("result")
     if not transaction:
         await update.message.reply_text("❌ Could not find transaction on-chain. Check your hash and try again.")
         return ASK_TRANSACTION_HASH
@@ -434,12 +426,22 @@ async def verify_payment_from_hash(update: Update, context: ContextTypes.DEFAULT
             sol_amount = lamports / 10**SOL_DECIMALS
 
             if dest == wallet_address and abs(sol_amount - amount_expected) <= SOL_PAYMENT_TOLERANCE:
+                # The signature is bound to this payment only once it has checked out
+                if not await payment_logs.claim_tx_sig(user_id, payment_reference, tx_sig):
+                    await update.message.reply_text("⚠️ This transaction hash has already been used for another payment.")
+                    return ASK_TRANSACTION_HASH
+
+                # Only one of the deposit watcher and a pasted hash may complete it
+                if not deposit_watcher.claim_payment(payment_reference):
+                    await update.message.reply_text("✅ This payment has already been verified.")
+                    return ConversationHandler.END
+
                 # === Payment verified — handle upgrade ===
                 await tiers.set_user_tier(user_id, selected_tier)
                 expiry_date = datetime.now() + timedelta(days=int(duration_months) * 30)
                 await tiers.set_user_expiry(user_id, expiry_date)
 
-                await wallets.mark_wallet_as_available(wallet_address)
+                await wallets.hold_for_sweep(wallet_address)
 
                 success, commission, referrer_id = await on_upgrade_completed(user_id, upgrade_fee, int(duration_months))
 
@@ -491,19 +493,8 @@ async def verify_payment_from_hash(update: Update, context: ContextTypes.DEFAULT
 
                 await update.message.reply_text(success_msg, parse_mode="Markdown", reply_markup=complete_keyboard)
 
-                # # Auto-forward funds
-                # success_forward, result = await forward_user_payment(wallet_address, context)
-
-                # if not success_forward:
-                #     #await update.message.reply_text(f"⚠️ Upgrade successful, but auto-forward failed:\n{result}")
-                #     await send_message(
-                #         context.bot,
-                #         f"⚠️ Auto-forward failed for {user_id} ({wallet_address}) — Error: {result}",
-                #         chat_id=BOT_ERROR_LOGS_ID
-                #     )
-
-                # Start background auto-forward
-                asyncio.create_task(run_forward_user_payment(wallet_address, context, user_id))
+                # Queue the deposit wallet for the next batched sweep
+                schedule_sweep(wallet_address, user_id, upgrade_fee)
                 return VERIFICATION
 
     
@@ -537,6 +528,20 @@ async def complete_upgrade(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data.clear()
     return ConversationHandler.END
 
+async def complete_detected_payment(context: ContextTypes.DEFAULT_TYPE, user_id: int, payment_reference: str, tx_sig: str):
+    """
+    Verify a deposit the watcher matched to this user's upgrade, as if they had pasted the hash.
+    This runs outside the conversation, so it can't move its state; the "complete"
+    button is handled in PAYMENT and ASK_TRANSACTION_HASH to end it from there.
+    """
+    if context.user_data.get("payment_reference") != payment_reference:
+        return  # the user has moved on to another payment session
+    update = build_custom_update_for_user(context.bot, user_id, tx_sig)
+    if await verify_payment_from_hash(update, context) != ASK_TRANSACTION_HASH:
+        # The session is spent either way; don't let "back" or a pasted hash reuse it
+        context.user_data.clear()
+
+
 async def retry_verification(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Retry payment verification safely."""
     query = update.callback_query
@@ -683,10 +688,12 @@ upgrade_conv_handler = ConversationHandler(
         ],
         PAYMENT: [
             CallbackQueryHandler(prompt_transaction_hash, pattern="^verify$"),
-            CallbackQueryHandler(back_to_duration, pattern="^back$")
+            CallbackQueryHandler(back_to_duration, pattern="^back$"),
+            CallbackQueryHandler(complete_upgrade, pattern="^complete$")
         ],
         ASK_TRANSACTION_HASH: [
-            MessageHandler(filters.TEXT & ~filters.COMMAND, verify_payment_from_hash)
+            MessageHandler(filters.TEXT & ~filters.COMMAND, verify_payment_from_hash),
+            CallbackQueryHandler(complete_upgrade, pattern="^complete$")
         ],
         VERIFICATION: [
             CallbackQueryHandler(complete_upgrade, pattern="^complete$"),
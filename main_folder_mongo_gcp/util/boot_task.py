@@ -1,29 +1,34 @@
 import mongo_client
 import storage.user_collection as user_collection
+import storage.payout_eligibility as payout_eligibility
 import storage.token_collection as token_collection
 from storage.history import load_token_data
 import storage.payment_collection as payment_collection
 from storage.users import load_user_tracking
 
-from storage.symbols import load_symbols
-from storage.tokens import load_tracked_tokens
 from storage.payment_logs import load_payment_logs
 from storage.payout import load_payout_wallets
-from storage.wallets import load_wallets
+from storage.wallets import load_wallets, run_lease_reclaimer
 
 from secrets_key import load_encrypted_keys
 from util.wallet_sync import sync_wallets_from_secrets, purge_orphan_wallets
+from util.qr_cache import warm_qr_cache
 from storage.rpcs import load_rpc_list
+from storage.ata_cache import load_known_atas
 from storage.notify import ensure_notify_records_for_active_users, remind_inactive_users
 
 import storage.tiers as tiers
 import util. restart_recovery as restart_recovery
+import util.warm_snapshot as warm_snapshot
 import storage.tokens
 import storage.thresholds as thresholds
 
 import storage.users
 from monitor import background_price_monitor
 from storage.tiers import check_and_process_tier_expiry_scheduler
+from util.price_feed import SOL_PRICE_FEED
+from util.deposit_watcher import run_deposit_watcher
+from util.sweep_scheduler import run_sweep_scheduler
 import logging
 
 logger = logging.getLogger(__name__)
@@ -36,19 +41,24 @@ async def perform_boot_tasks(app):
     await mongo_client.connect()
     logger.info("✅ MongoDB connected successfully")
 
-    await user_collection.load_user_collection_from_mongo()
-    await user_collection.ensure_user_indexes()
+    # ⚡ Warm restart: users, tokens, payment config and notify from the local snapshot
+    warm_start = await warm_snapshot.restore_from_snapshot()
 
-    await token_collection.load_token_collection_from_mongo()
-    await token_collection.create_token_list_index()
-    await load_token_data()
+    if not warm_start:
+        await user_collection.load_user_collection_from_mongo()
+        await load_token_data()
+        await payment_collection.load_payment_collection_from_mongo()
 
-    await payment_collection.load_payment_collection_from_mongo()
+    # Idempotent, so run on warm starts too: a /restart that ships new indexes needs them built
+    await user_collection.ensure_user_indexes()
+    await token_collection.create_token_indexes()
+    # Also migrates unverified signatures off the unique tx_sig index
+    await payment_collection.ensure_payment_indexes()
 
+    await user_collection.load_referred_by_index()
+    payout_eligibility.rebuild_eligibility_index()
     load_user_tracking()
 
-    load_symbols
-    load_tracked_tokens()
 
     await load_payment_logs()
     load_payout_wallets()
@@ -57,8 +67,10 @@ async def perform_boot_tasks(app):
     await load_encrypted_keys()
     await sync_wallets_from_secrets()
     await purge_orphan_wallets()
+    await warm_qr_cache()
     await load_rpc_list()
-    await ensure_notify_records_for_active_users()
+    await load_known_atas()
+    await ensure_notify_records_for_active_users(reload=not warm_start)
 
     # 🔒 Enforce token limits based on user tiers
     await tiers.enforce_token_limits_bulk()
@@ -97,6 +109,26 @@ async def perform_boot_tasks(app):
     app._expiry_task = expiry_task
     logger.info("🔄 Tier expiry check scheduler started (2-day interval)")
 
+    # 💲 Keep the SOL/USD price warm for payment screens and payouts
+    price_feed_task = app.create_task(SOL_PRICE_FEED.run())
+    app._price_feed_task = price_feed_task
+    logger.info("💲 SOL price feed refresh loop started.")
+
+    # 👀 Auto-detect upgrade/renewal deposits on in-use wallets
+    deposit_watcher_task = app.create_task(run_deposit_watcher())
+    app._deposit_watcher_task = deposit_watcher_task
+    logger.info("👀 Deposit watcher started.")
+
+    # ♻️ Return abandoned deposit wallet leases to the pool
+    lease_reclaimer_task = app.create_task(run_lease_reclaimer())
+    app._lease_reclaimer_task = lease_reclaimer_task
+    logger.info("♻️ Wallet lease reclaimer started.")
+
+    # 🧹 Sweep paid deposit wallets to the payout wallet in batches
+    sweep_task = app.create_task(run_sweep_scheduler(app))
+    app._sweep_task = sweep_task
+    logger.info("🧹 Deposit sweep scheduler started.")
+
     logger.info("✅ perform_boot_tasks() complete")
 
 
@@ -34,6 +34,7 @@ super_admin_cmds = [
     BotCommand("removeadmin", "Remove an admin -- /ra"),
     BotCommand("listadmins", "List all admins -- /la"),
     BotCommand("addwallet", "Add new deposit wallets -- /aw"),
+    BotCommand("genwallets", "Generate deposit wallets in bulk -- /gw"),
     BotCommand("addpayout", "Add withdrawal wallet -- /ap"),
     BotCommand("listwallet", "List wallets (deposit & withdrawal) -- /lw"),
     BotCommand("removewallet", "Remove deposit wallets -- /rm"),
@@ -0,0 +1,120 @@
+# confirmation_watcher.py
+# One background poller confirming every outgoing Solana transaction in batches
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+from solders.signature import Signature # type: ignore
+from util.rpc_pool import RPC_POOL
+
+logger = logging.getLogger(__name__)
+
+MAX_SIGNATURES_PER_CALL = 256  # getSignatureStatuses limit
+POLL_INTERVAL = 2  # seconds
+DEFAULT_CONFIRM_TIMEOUT = 60  # seconds
+
+# Outcomes a waiter can receive
+CONFIRM_FINALIZED = "finalized"
+CONFIRM_FAILED = "failed"
+CONFIRM_TIMEOUT = "timeout"
+
+
+def is_finalized(conf_status) -> bool:
+    """
+    Tolerates the enum, its .value and plain strings returned by different solders versions.
+    """
+    return (
+        "Finalized" in str(conf_status)
+        or conf_status == "finalized"
+        or (hasattr(conf_status, 'value') and conf_status.value == 'finalized')
+    )
+
+
+class _PendingSignature:
+    def __init__(self, signature: Signature, deadline: float):
+        self.signature = signature
+        self.deadline = deadline
+        self.waiters: List[asyncio.Future] = []
+
+    def resolve(self, outcome: Tuple[str, Optional[str]]):
+        for waiter in self.waiters:
+            if not waiter.done():
+                waiter.set_result(outcome)
+
+
+class ConfirmationWatcher:
+    """
+    Holds all pending signatures and polls them together, up to 256 per
+    getSignatureStatuses call. Each caller awaits a future resolving to
+    (CONFIRM_FINALIZED | CONFIRM_FAILED | CONFIRM_TIMEOUT, error_or_None).
+    """
+
+    def __init__(self):
+        self.pending: Dict[str, _PendingSignature] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def watch(self, signature: Union[str, Signature], timeout: float = DEFAULT_CONFIRM_TIMEOUT) -> asyncio.Future:
+        if isinstance(signature, str):
+            signature = Signature.from_string(signature)
+
+        loop = asyncio.get_running_loop()
+        key = str(signature)
+        deadline = time.monotonic() + timeout
+
+        entry = self.pending.get(key)
+        if entry is None:
+            entry = self.pending[key] = _PendingSignature(signature, deadline)
+        else:
+            entry.deadline = max(entry.deadline, deadline)
+
+        waiter = loop.create_future()
+        entry.waiters.append(waiter)
+
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+        return waiter
+
+    async def wait(self, signature: Union[str, Signature], timeout: float = DEFAULT_CONFIRM_TIMEOUT) -> Tuple[str, Optional[str]]:
+        return await self.watch(signature, timeout)
+
+    async def _poll_chunk(self, keys: List[str]):
+        entries = [self.pending[key] for key in keys]
+        try:
+            response = await RPC_POOL.call("get_signature_statuses", [e.signature for e in entries])
+            statuses = response.value
+        except Exception as e:
+            # Keep the signatures pending; their deadlines still apply
+            logger.warning(f"⚠️ Signature status poll failed for {len(keys)} signatures: {e}")
+            statuses = [None] * len(entries)
+
+        now = time.monotonic()
+        for key, entry, status in zip(keys, entries, statuses):
+            if status is not None and status.err:
+                outcome = (CONFIRM_FAILED, str(status.err))
+            elif status is not None and is_finalized(status.confirmation_status):
+                outcome = (CONFIRM_FINALIZED, None)
+            elif now >= entry.deadline:
+                outcome = (CONFIRM_TIMEOUT, None)
+            else:
+                continue
+
+            self.pending.pop(key, None)
+            entry.resolve(outcome)
+
+    async def _run(self):
+        while self.pending:
+            keys = list(self.pending)
+            chunks = [
+                keys[i:i + MAX_SIGNATURES_PER_CALL]
+                for i in range(0, len(keys), MAX_SIGNATURES_PER_CALL)
+            ]
+            await asyncio.gather(*[self._poll_chunk(chunk) for chunk in chunks])
+
+            if self.pending:
+                await asyncio.sleep(POLL_INTERVAL)
+
+
+# Shared watcher for withdrawals and payouts
+CONFIRMATION_WATCHER = ConfirmationWatcher()
@@ -0,0 +1,180 @@
+# deposit_watcher.py
+# Detects upgrade/renewal deposits on in-use wallets without waiting for a pasted hash
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Set
+
+import storage.wallets as wallets
+import util.tx_cache as tx_cache
+from util.jsonrpc_client import JSONRPC_CLIENT
+from util.lru_cache import LRUCache
+from config import SOL_DECIMALS, SOL_PAYMENT_TOLERANCE
+
+logger = logging.getLogger(__name__)
+
+DEPOSIT_POLL_INTERVAL = 5       # seconds
+PAYMENT_WINDOW = timedelta(minutes=10)
+SESSION_GRACE = timedelta(minutes=2)  # keep watching briefly after the window closes
+SIGNATURES_PER_WALLET = 20
+
+# wallet_address -> open payment session
+OPEN_SESSIONS: Dict[str, Dict[str, Any]] = {}
+
+# Payment references already completed by either the watcher or a pasted hash
+CLAIMED_PAYMENTS = LRUCache(1000)
+
+# Running on_deposit callbacks; held here so they aren't garbage-collected mid-flight
+COMPLETION_TASKS: Set[asyncio.Task] = set()
+
+
+# --- Session Registry ---
+def open_session(
+        wallet_address: str,
+        user_id: int,
+        payment_reference: str,
+        amount_sol: float,
+        start_time: datetime,
+        on_deposit: Callable[[str], Awaitable[Any]]
+        ):
+    """
+    Watch a deposit wallet for this payment; on_deposit(tx_sig) runs once a
+    matching transfer is seen.
+    """
+    OPEN_SESSIONS[wallet_address] = {
+        "user_id": user_id,
+        "payment_reference": payment_reference,
+        "amount_sol": amount_sol,
+        "start_time": start_time,
+        "on_deposit": on_deposit,
+        "until": None,      # newest signature already inspected
+        "matched": False,
+    }
+
+
+def close_session(wallet_address: str):
+    OPEN_SESSIONS.pop(wallet_address, None)
+
+
+def claim_payment(payment_reference: str) -> bool:
+    """
+    True exactly once per payment, so the watcher and a pasted hash can't both complete it.
+    """
+    if payment_reference in CLAIMED_PAYMENTS:
+        return False
+    CLAIMED_PAYMENTS.set(payment_reference, True)
+
+    for wallet_address, session in list(OPEN_SESSIONS.items()):
+        if session["payment_reference"] == payment_reference:
+            close_session(wallet_address)
+    return True
+
+
+# --- Matching ---
+def _matches_session(transaction: Dict[str, Any], wallet_address: str, session: Dict[str, Any]) -> bool:
+    block_time = transaction.get("blockTime")
+    if block_time:
+        tx_time = datetime.fromtimestamp(block_time)
+        if tx_time < session["start_time"] or tx_time > session["start_time"] + PAYMENT_WINDOW:
+            return False
+
+    for instr in transaction["transaction"]["message"]["instructions"]:
+        parsed = instr.get("parsed", {})
+        if not isinstance(parsed, dict) or parsed.get("type") != "transfer":
+            continue
+        info = parsed.get("info", {})
+        sol_amount = int(info.get("lamports", 0)) / 10**SOL_DECIMALS
+        if info.get("destination") == wallet_address and abs(sol_amount - session["amount_sol"]) <= SOL_PAYMENT_TOLERANCE:
+            return True
+    return False
+
+
+def _watched_wallets(now: datetime) -> List[str]:
+    for wallet_address, session in list(OPEN_SESSIONS.items()):
+        if now > session["start_time"] + PAYMENT_WINDOW + SESSION_GRACE:
+            close_session(wallet_address)
+
+    return [
+        wallet_address for wallet_address, session in OPEN_SESSIONS.items()
+        if not session["matched"]
+        and (wallets.get_wallet_by_address(wallet_address) or {}).get("status") == "in-use"
+    ]
+
+
+async def _inspect(wallet_address: str, session: Dict[str, Any], signature_infos: List[Dict[str, Any]]):
+    start_ts = session["start_time"].timestamp()
+    candidates = [
+        info["signature"] for info in signature_infos
+        if info.get("err") is None and (info.get("blockTime") or start_ts) >= start_ts
+    ]
+    # Concurrent lookups are micro-batched by the JSON-RPC client
+    transactions = await asyncio.gather(*[tx_cache.get_transaction(sig) for sig in candidates], return_exceptions=True)
+
+    # Move the cursor past these signatures only once every lookup succeeded
+    if signature_infos and all(t and not isinstance(t, Exception) for t in transactions):
+        session["until"] = signature_infos[0]["signature"]  # newest first
+
+    for tx_sig, transaction in zip(candidates, transactions):
+        if isinstance(transaction, Exception) or not transaction:
+            continue
+        if _matches_session(transaction, wallet_address, session) and not session["matched"]:
+            # Stops further polling while on_deposit runs; _complete reopens it on failure
+            session["matched"] = True
+            logger.info(f"💸 Deposit {tx_sig} matched payment {session['payment_reference']} on {wallet_address}")
+            task = asyncio.create_task(_complete(session, tx_sig))
+            COMPLETION_TASKS.add(task)
+            task.add_done_callback(COMPLETION_TASKS.discard)
+            return
+
+
+async def _complete(session: Dict[str, Any], tx_sig: str):
+    try:
+        await session["on_deposit"](tx_sig)
+    except Exception as e:
+        logger.error(f"❌ Auto-verification of {tx_sig} for payment {session['payment_reference']} failed: {e}")
+        # Rescan from the start of the window so the next poll sees this deposit again
+        session["matched"] = False
+        session["until"] = None
+
+
+# --- Polling ---
+async def poll_once() -> int:
+    """
+    One round: a single batched getSignaturesForAddress POST for every watched
+    wallet, then getTransaction only for signatures not seen before.
+    """
+    watched = _watched_wallets(datetime.now())
+    if not watched:
+        return 0
+
+    calls = []
+    for wallet_address in watched:
+        options: Dict[str, Any] = {"limit": SIGNATURES_PER_WALLET}
+        if OPEN_SESSIONS[wallet_address]["until"]:
+            options["until"] = OPEN_SESSIONS[wallet_address]["until"]
+        calls.append(("getSignaturesForAddress", [wallet_address, options]))
+
+    try:
+        replies = await JSONRPC_CLIENT.call_batch(calls)
+    except Exception as e:
+        logger.warning(f"⚠️ Deposit poll failed for {len(watched)} wallets: {e}")
+        return 0
+
+    inspections = []
+    for wallet_address, reply in zip(watched, replies):
+        session = OPEN_SESSIONS.get(wallet_address)
+        if session is None or isinstance(reply, Exception) or not reply:
+            continue
+        inspections.append(_inspect(wallet_address, session, reply))
+    await asyncio.gather(*inspections)
+    return len(watched)
+
+
+async def run_deposit_watcher(interval: float = DEPOSIT_POLL_INTERVAL):
+    while True:
+        try:
+            await poll_once()
+        except Exception as e:
+            logger.error(f"❌ Deposit watcher round failed: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,36 @@
+# display_names.py
+# Cached Telegram display names for admin listings
+
+import asyncio
+import time
+from typing import Dict, Iterable
+
+from util.lru_cache import LRUCache
+
+NAME_TTL = 6 * 60 * 60  # seconds a fetched name is reused
+
+# user_id -> (display name, fetched at)
+DISPLAY_NAMES = LRUCache(2000)
+
+
+async def get_display_name(bot, user_id) -> str:
+    user_id = str(user_id)
+    cached = DISPLAY_NAMES.get(user_id)
+    if cached and time.monotonic() - cached[1] < NAME_TTL:
+        return cached[0]
+
+    try:
+        chat = await bot.get_chat(int(user_id))
+        name = chat.full_name or f"User {user_id}"
+    except Exception:
+        # Keep a stale name over a placeholder, but don't cache the failure
+        return cached[0] if cached else f"User {user_id}"
+
+    DISPLAY_NAMES.set(user_id, (name, time.monotonic()))
+    return name
+
+
+async def get_display_names(bot, user_ids: Iterable) -> Dict[str, str]:
+    user_ids = [str(uid) for uid in user_ids]
+    names = await asyncio.gather(*[get_display_name(bot, uid) for uid in user_ids])
+    return dict(zip(user_ids, names))
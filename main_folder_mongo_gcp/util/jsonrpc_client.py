@@ -0,0 +1,133 @@
+# jsonrpc_client.py
+# Shared Solana JSON-RPC client: keep-alive session, array batching and micro-batching
+
+import asyncio
+import itertools
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+from config import SOLANA_RPC
+
+logger = logging.getLogger(__name__)
+
+BATCH_WINDOW = 0.005      # seconds concurrent calls wait to share one POST
+MAX_BATCH_SIZE = 100      # requests per POST
+REQUEST_TIMEOUT = 15      # seconds per POST
+
+
+class JsonRpcError(Exception):
+    def __init__(self, error: Dict[str, Any]):
+        self.code = error.get("code")
+        self.data = error.get("data")
+        super().__init__(f"{error.get('message', 'JSON-RPC error')} (code {self.code})")
+
+
+class JsonRpcBatchClient:
+    """
+    Calls made within BATCH_WINDOW of each other go out as one JSON-RPC array
+    POST over a reused keep-alive session. Each caller gets its own result or
+    JsonRpcError.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._ids = itertools.count(1)
+        self._queue: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+                headers={"Content-Type": "application/json"},
+            )
+        return self._session
+
+    def _request(self, method: str, params: Optional[list]) -> Dict[str, Any]:
+        request = {"jsonrpc": "2.0", "id": next(self._ids), "method": method}
+        if params is not None:
+            request["params"] = params
+        return request
+
+    async def call(self, method: str, params: Optional[list] = None) -> Any:
+        """
+        Queue one request for the next micro-batch and return its result.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((self._request(method, params), future))
+
+        if len(self._queue) >= MAX_BATCH_SIZE:
+            self._flush_now()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(BATCH_WINDOW, self._flush_now)
+
+        return await future
+
+    async def call_batch(self, calls: List[Tuple[str, Optional[list]]]) -> List[Any]:
+        """
+        Send (method, params) pairs as array batches right away. Failed items
+        come back as JsonRpcError instances instead of raising.
+        """
+        entries = [(self._request(method, params), asyncio.get_running_loop().create_future()) for method, params in calls]
+        for i in range(0, len(entries), MAX_BATCH_SIZE):
+            await self._send(entries[i:i + MAX_BATCH_SIZE])
+
+        results = []
+        for _, future in entries:
+            error = future.exception()
+            results.append(error if error is not None else future.result())
+        return results
+
+    def _flush_now(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        entries, self._queue = self._queue, []
+        if entries:
+            asyncio.get_running_loop().create_task(self._send(entries))
+
+    async def _send(self, entries: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        pending = {request["id"]: future for request, future in entries}
+        try:
+            async with self._get_session().post(self.url, json=[r for r, _ in entries]) as resp:
+                resp.raise_for_status()
+                replies = await resp.json(content_type=None)
+
+            # A single-object reply means the whole batch was rejected
+            if isinstance(replies, dict):
+                raise JsonRpcError(replies.get("error") or {"message": "Unexpected batch reply"})
+
+            for reply in replies:
+                future = pending.pop(reply.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if "error" in reply:
+                    future.set_exception(JsonRpcError(reply["error"]))
+                else:
+                    future.set_result(reply.get("result"))
+
+            if pending:
+                raise JsonRpcError({"message": "No reply for request in batch"})
+
+        except Exception as e:
+            if not isinstance(e, JsonRpcError):
+                logger.warning(f"⚠️ JSON-RPC batch of {len(entries)} to {self.url} failed: {e!r}")
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+
+        logger.debug(f"JSON-RPC batch of {len(entries)} sent to {self.url}")
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# Shared client for the verify flows
+JSONRPC_CLIENT = JsonRpcBatchClient(SOLANA_RPC)
@@ -1,9 +1,9 @@
 # wallet_sync.py (inside utils/)
 
 from datetime import datetime, timedelta
-from config import SUPER_ADMIN_ID, BOT_ERROR_LOGS_ID, BOT_INFO_LOGS_ID
+from config import SUPER_ADMIN_ID, BOT_INFO_LOGS_ID
 from referral import on_upgrade_completed
-from withdrawal import forward_user_payment
+from util.sweep_scheduler import schedule_sweep
 from util.utils import send_message
 import storage.wallets as wallets
 from telegram.ext import ContextTypes
@@ -33,7 +33,7 @@ async def complete_verified_upgrade(user_id: int, payment: dict, context: Contex
 
 
     # set assigned wallet back to available
-    wallets.mark_wallet_as_available(wallet_address)
+    await wallets.hold_for_sweep(wallet_address)
 
     # Referral + commission
     success, commission, referrer_id = await on_upgrade_completed(user_id, usdc_amount, duration)
@@ -75,11 +75,5 @@ async def complete_verified_upgrade(user_id: int, payment: dict, context: Contex
             parse_mode="Markdown"
         )
 
-    # Auto-forward payment
-    success_forward, result = await forward_user_payment(wallet_address, context)
-    if not success_forward:
-        await send_message(
-            context.bot,
-            f"⚠️ Auto-forward failed for {user_id} ({wallet_address}) — Error: {result}",
-            chat_id=BOT_ERROR_LOGS_ID
-        )
+    # Queue the deposit wallet for the next batched sweep
+    schedule_sweep(wallet_address, user_id, usdc_amount)
@@ -0,0 +1,129 @@
+# price_feed.py
+# Cached SOL/USD price refreshed in the background, with fallback across sources
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = 60      # seconds between background refreshes; also the freshness window
+MAX_STALENESS = 10 * 60    # seconds a cached price may still be served while refreshing fails
+SOURCE_TIMEOUT = 5         # seconds per source request
+
+# (name, url, extractor) tried in order until one yields a price
+PriceSource = Tuple[str, str, Callable[[Any], float]]
+
+PRICE_SOURCES: List[PriceSource] = [
+    ("coingecko", "https://api.coingecko.com/api/v3/simple/price?ids=solana&vs_currencies=usd",
+     lambda data: data["solana"]["usd"]),
+    ("binance", "https://api.binance.com/api/v3/ticker/price?symbol=SOLUSDT",
+     lambda data: data["price"]),
+    ("coinbase", "https://api.coinbase.com/v2/prices/SOL-USD/spot",
+     lambda data: data["data"]["amount"]),
+]
+
+
+class PriceUnavailable(Exception):
+    pass
+
+
+class SolPriceFeed:
+    """
+    Serves the last fetched price instantly. A stale price (older than
+    REFRESH_INTERVAL) is still returned while a refresh runs behind it, up to
+    MAX_STALENESS. Concurrent refreshes share one round of source requests.
+    """
+
+    def __init__(self, sources: List[PriceSource]):
+        self.sources = sources
+        self.price: Optional[float] = None
+        self.updated_at = 0.0
+        self.source: Optional[str] = None
+        self._refresh: Optional[asyncio.Future] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def age(self) -> float:
+        return time.monotonic() - self.updated_at
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=SOURCE_TIMEOUT))
+        return self._session
+
+    async def _fetch_from_sources(self) -> float:
+        errors = []
+        for name, url, extract in self.sources:
+            try:
+                async with self._get_session().get(url) as resp:
+                    resp.raise_for_status()
+                    price = float(extract(await resp.json(content_type=None)))
+                if price <= 0:
+                    raise ValueError(f"non-positive price {price}")
+            except Exception as e:
+                errors.append(f"{name}: {e!r}")
+                continue
+
+            self.price = price
+            self.updated_at = time.monotonic()
+            self.source = name
+            return price
+
+        raise PriceUnavailable("All SOL price sources failed: " + "; ".join(errors))
+
+    async def refresh(self) -> float:
+        """
+        Fetch a new price; callers arriving mid-refresh await the same result.
+        """
+        if self._refresh is not None and not self._refresh.done():
+            return await asyncio.shield(self._refresh)
+
+        self._refresh = asyncio.ensure_future(self._fetch_from_sources())
+        return await asyncio.shield(self._refresh)
+
+    def _refresh_in_background(self):
+        if self._refresh is not None and not self._refresh.done():
+            return
+        task = asyncio.ensure_future(self.refresh())
+        task.add_done_callback(self._log_background_failure)
+
+    @staticmethod
+    def _log_background_failure(task: asyncio.Future):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"⚠️ Background SOL price refresh failed: {task.exception()}")
+
+    async def get_price(self) -> float:
+        if self.price is not None:
+            age = self.age()
+            if age < REFRESH_INTERVAL:
+                return self.price
+            if age < MAX_STALENESS:
+                self._refresh_in_background()
+                return self.price
+
+        # No price yet, or too stale to serve: wait for a fresh one
+        return await self.refresh()
+
+    async def run(self, interval: float = REFRESH_INTERVAL):
+        """
+        Background loop keeping the price warm for the payment screens.
+        """
+        while True:
+            try:
+                price = await self.refresh()
+                logger.debug(f"SOL/USD {price} from {self.source}")
+            except PriceUnavailable as e:
+                logger.warning(f"⚠️ {e}")
+            await asyncio.sleep(interval)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# Shared feed behind upgrade.fetch_sol_price_usd
+SOL_PRICE_FEED = SolPriceFeed(PRICE_SOURCES)
@@ -6,22 +6,29 @@ from solders.message import Message  # type: ignore
 from solders.keypair import Keypair  # type: ignore
 
 import logging
-from typing import Tuple, Union, List, Tuple, Dict, Any
+import time
+from typing import Any, Dict, List, Optional, Tuple
 from base58 import b58decode
 
-from solana.rpc.api import Client
 from solders.keypair import Keypair # type: ignore
 from solders.pubkey import Pubkey # type: ignore
 from solders.transaction import Transaction # type: ignore
 from solders.message import Message # type: ignore
 from solders.system_program import transfer, TransferParams
 from solders.signature import Signature # type: ignore
-from solana.rpc.api import Client
+from solana.rpc.types import DataSliceOpts
 
 from telegram.ext import ContextTypes
 import asyncio
 import aiohttp
 from upgrade import fetch_sol_price_usd
+from util.rpc_pool import RPC_POOL
+from util.confirmation_watcher import CONFIRMATION_WATCHER, CONFIRM_FINALIZED, CONFIRM_FAILED, CONFIRM_TIMEOUT
+from util.tx_packer import (
+    pack_instructions, legacy_transaction_count,
+    LAMPORTS_PER_SIGNATURE, TRANSFER_COMPUTE_UNITS, CREATE_ATA_COMPUTE_UNITS
+)
+import storage.ata_cache as ata_cache
 
 logger = logging.getLogger(__name__)
 
@@ -29,20 +36,59 @@ logger = logging.getLogger(__name__)
 MAX_CONFIRMATION_ATTEMPTS = 20
 CONFIRMATION_CHECK_INTERVAL = 3  # seconds
 
+# Pipelined submission
+MAX_SUBMISSIONS = 3  # signings per transaction; each follows a confirmed blockhash expiry
+BLOCK_HEIGHT_POLL_INTERVAL = 2  # seconds
+BLOCKHASH_EXPIRY_MAX_WAIT = 120  # seconds
 
-SOLANA_CLIENT = Client("https://api.devnet.solana.com")
 
 # Constants for fee calculation
 ATA_CREATION_FEE_SOL = 0.0022  # SOL cost to create an Associated Token Account
 
 # Constants for batch processing
-MAX_ACCOUNTS_PER_TX = 10  # Max number of token accounts per transaction (can adjust based on testing)
-MAX_BATCH_SIZE = 5  # Maximum number of payments to include in a single transaction
+MAX_ACCOUNTS_PER_LOOKUP = 100  # getMultipleAccounts limit per request
+
+
+async def resolve_ata_existence(atas: List[Pubkey]) -> Dict[str, bool]:
+    """
+    Return {ata_address: exists}. Known ATAs skip the RPC; the rest are looked up
+    with getMultipleAccounts in groups of MAX_ACCOUNTS_PER_LOOKUP, concurrently.
+    """
+    existence = {}
+    unknown = []
+    for ata in dict.fromkeys(atas):
+        if ata_cache.is_known_ata(str(ata)):
+            existence[str(ata)] = True
+        else:
+            unknown.append(ata)
+
+    chunks = [
+        unknown[i:i + MAX_ACCOUNTS_PER_LOOKUP]
+        for i in range(0, len(unknown), MAX_ACCOUNTS_PER_LOOKUP)
+    ]
+    responses = await asyncio.gather(*[
+        # Only existence matters, so ask for zero bytes of account data
+        RPC_POOL.call("get_multiple_accounts", chunk, data_slice=DataSliceOpts(offset=0, length=0))
+        for chunk in chunks
+    ])
+
+    found = []
+    for chunk, response in zip(chunks, responses):
+        for ata, account in zip(chunk, response.value):
+            existence[str(ata)] = account is not None
+            if account is not None:
+                found.append(str(ata))
+
+    await ata_cache.add_known_atas(found)
+    logger.info(f"Resolved {len(existence)} ATAs: {len(existence) - len(unknown)} cached, {len(unknown)} via {len(chunks)} RPC(s)")
+    return existence
+
 
 async def process_batch_payouts(
     payment_batch: List[Tuple[str, str, float]],  # List of (user_id, wallet_address, amount_usdc)
     keypair: Keypair,
-    context: ContextTypes.DEFAULT_TYPE
+    context: ContextTypes.DEFAULT_TYPE,
+    pipelined: bool = True
 ) -> List[Tuple[str, bool, str, str]]:  # Returns list of (user_id, success, tx_sig, message)
     """
     Process a batch of USDC payments in optimized transactions.
@@ -51,10 +97,13 @@ async def process_batch_payouts(
         payment_batch: List of tuples containing (user_id, wallet_address, amount_usdc)
         keypair: The sender's keypair
         context: Telegram context
+        pipelined: Submit all transactions before confirming any (False sends and
+            confirms them one at a time)
         
     Returns:
         List of tuples containing (user_id, success, tx_signature, message)
     """
+    results = []
     try:
         logger.info(f"Processing batch of {len(payment_batch)} USDC payments")
         
@@ -73,263 +122,301 @@ async def process_batch_payouts(
         sender_pubkey = keypair.pubkey()
         sender_token_account = find_associated_token_address(sender_pubkey, USDC_MINT)
         
-        # Helper to divide payments into optimal batches
-        def create_optimized_batches(payments):
-            # First, check which receivers need ATAs created
-            needs_ata_creation = []
-            no_ata_creation = []
-            
-            for payment in payments:
-                user_id, wallet_address, _ = payment
-                receiver_pubkey = Pubkey.from_string(wallet_address)
-                receiver_token_account = find_associated_token_address(receiver_pubkey, USDC_MINT)
-                
-                # Check if receiver's token account exists
-                account_info_response = SOLANA_CLIENT.get_account_info(receiver_token_account)
-                if account_info_response.value is None:
-                    needs_ata_creation.append(payment)
-                else:
-                    no_ata_creation.append(payment)
-            
-            # # We'll process those needing ATAs individually since each needs 2 instructions
-            # individual_batches = [[payment] for payment in needs_ata_creation]
-
-            # Group payments needing ATA creation into batches of 2
-            individual_batches = []
-            current_ata_batch = []
-            for payment in needs_ata_creation:
-                current_ata_batch.append(payment)
-                if len(current_ata_batch) == 2:
-                    individual_batches.append(current_ata_batch)
-                    current_ata_batch = []
-            if current_ata_batch:
-                individual_batches.append(current_ata_batch)
-            
-            # For those not needing ATAs, we can batch more efficiently
-            remaining_batches = []
-            current_batch = []
-            
-            for payment in no_ata_creation:
-                if len(current_batch) >= MAX_BATCH_SIZE:
-                    remaining_batches.append(current_batch)
-                    current_batch = []
-                current_batch.append(payment)
-                
-            if current_batch:
-                remaining_batches.append(current_batch)
-                
-            # Combine all batches
-            return individual_batches + remaining_batches
-        
-        # Process all payment batches
-        results = []
-        optimized_batches = create_optimized_batches(payment_batch)
-        
-        logger.info(f"Split into {len(optimized_batches)} optimized transaction batches")
-        
-        for batch_idx, current_batch in enumerate(optimized_batches):
-            logger.info(f"Processing batch {batch_idx+1}/{len(optimized_batches)} with {len(current_batch)} payments")
-            
-            # Get latest blockhash
-            blockhash_response = SOLANA_CLIENT.get_latest_blockhash()
-            if not blockhash_response.value:
-                error_msg = "Failed to get latest blockhash"
-                for user_id, wallet_address, _ in current_batch:
-                    results.append((user_id, False, "", error_msg))
-                continue
-                
-            recent_blockhash = blockhash_response.value.blockhash
-            
-            # Prepare instructions for this batch
-            instructions = []
-            
-            # Track which users are in this transaction
-            batch_user_info = []
-            
-            for user_id, wallet_address, amount_usdc in current_batch:
-                receiver_pubkey = Pubkey.from_string(wallet_address)
-                receiver_token_account = find_associated_token_address(receiver_pubkey, USDC_MINT)
-                
-                # Check if receiver's token account exists
-                account_info_response = SOLANA_CLIENT.get_account_info(receiver_token_account)
-                receiver_account_exists = account_info_response.value is not None
-                
-                # Store original amount for reference
-                original_amount_usdc = amount_usdc
-                adjusted_amount_usdc = amount_usdc
-                ata_fee_in_usdc = 0
-                
-                # Calculate fee in USDC equivalent if we need to create an ATA
-                if not receiver_account_exists:
-                    # Get SOL/USD price
-                    try:
-                        sol_to_usdc = await fetch_sol_price_usd()
-                        ata_fee_in_usdc = ATA_CREATION_FEE_SOL * sol_to_usdc
-                        logger.info(f"Receiver needs ATA creation. Fee: {ATA_CREATION_FEE_SOL} SOL = {ata_fee_in_usdc:.6f} USDC")
-                        
-                        # Deduct the fee from the USDC amount
-                        adjusted_amount_usdc = max(0, amount_usdc - ata_fee_in_usdc)
-                        
-                        # Check if amount is now too small to process
-                        if adjusted_amount_usdc <= 0:
-                            results.append((user_id, False, "", f"After ATA creation fee deduction ({ata_fee_in_usdc:.6f} USDC), the remaining amount would be zero or negative."))
-                            continue
-                        
-                        logger.info(f"Adjusted USDC amount after fee deduction: {adjusted_amount_usdc} (original: {amount_usdc})")
-                    except Exception as e:
-                        logger.error(f"Error getting price data: {e}")
-                        results.append((user_id, False, "", f"Error getting price data: {str(e)}"))
+        # Derive every receiver ATA once and resolve existence in bulk
+        receiver_atas = {
+            wallet_address: find_associated_token_address(Pubkey.from_string(wallet_address), USDC_MINT)
+            for _, wallet_address, _ in payment_batch
+        }
+        ata_exists = await resolve_ata_existence(list(receiver_atas.values()))
+
+        # Build each payment's instructions; the packer then fills transactions
+        pack_items = []
+
+        for user_id, wallet_address, amount_usdc in payment_batch:
+            receiver_pubkey = Pubkey.from_string(wallet_address)
+            receiver_token_account = receiver_atas[wallet_address]
+            receiver_account_exists = ata_exists[str(receiver_token_account)]
+
+            # Store original amount for reference
+            original_amount_usdc = amount_usdc
+            adjusted_amount_usdc = amount_usdc
+            ata_fee_in_usdc = 0
+            user_instructions = []
+
+            # Calculate fee in USDC equivalent if we need to create an ATA
+            if not receiver_account_exists:
+                # Get SOL/USD price
+                try:
+                    sol_to_usdc = await fetch_sol_price_usd()
+                    ata_fee_in_usdc = ATA_CREATION_FEE_SOL * sol_to_usdc
+                    logger.info(f"Receiver needs ATA creation. Fee: {ATA_CREATION_FEE_SOL} SOL = {ata_fee_in_usdc:.6f} USDC")
+
+                    # Deduct the fee from the USDC amount
+                    adjusted_amount_usdc = max(0, amount_usdc - ata_fee_in_usdc)
+
+                    # Check if amount is now too small to process
+                    if adjusted_amount_usdc <= 0:
+                        results.append((user_id, False, "", f"After ATA creation fee deduction ({ata_fee_in_usdc:.6f} USDC), the remaining amount would be zero or negative."))
                         continue
-                
-                # Create associated token account instruction if needed
-                if not receiver_account_exists:
-                    create_ata_accounts = [
-                        # 0. [signer, writable] Funding account
-                        AccountMeta(pubkey=sender_pubkey, is_signer=True, is_writable=True),
-                        # 1. [writable] Associated token account address to be created
-                        AccountMeta(pubkey=receiver_token_account, is_signer=False, is_writable=True),
-                        # 2. [] Wallet address for the new associated token account
-                        AccountMeta(pubkey=receiver_pubkey, is_signer=False, is_writable=False),
-                        # 3. [] The token mint for the new associated token account
-                        AccountMeta(pubkey=USDC_MINT, is_signer=False, is_writable=False),
-                        # 4. [] System program
-                        AccountMeta(pubkey=SYSTEM_PROGRAM_ID, is_signer=False, is_writable=False),
-                        # 5. [] SPL Token program
-                        AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
-                        # 6. [] Rent sysvar
-                        AccountMeta(pubkey=SYSVAR_RENT_PUBKEY, is_signer=False, is_writable=False),
-                    ]
-                    
-                    create_ata_ix = Instruction(
-                        program_id=ASSOCIATED_TOKEN_PROGRAM_ID,
-                        accounts=create_ata_accounts,
-                        data=bytes()  # No data needed for this instruction
-                    )
-                    
-                    instructions.append(create_ata_ix)
-                
-                # Convert amount to token amount (USDC has 6 decimals)
-                usdc_decimals = 6
-                token_amount = int(adjusted_amount_usdc * (10 ** usdc_decimals))
-                
-                # Create token transfer instruction
-                transfer_data = bytes([3]) + token_amount.to_bytes(8, byteorder="little")
-                
-                transfer_accounts = [
-                    # 0. [writable] Source token account
-                    AccountMeta(pubkey=sender_token_account, is_signer=False, is_writable=True),
-                    # 1. [writable] Destination token account
+
+                    logger.info(f"Adjusted USDC amount after fee deduction: {adjusted_amount_usdc} (original: {amount_usdc})")
+                except Exception as e:
+                    logger.error(f"Error getting price data: {e}")
+                    results.append((user_id, False, "", f"Error getting price data: {str(e)}"))
+                    continue
+
+            # Create associated token account instruction if needed
+            if not receiver_account_exists:
+                create_ata_accounts = [
+                    # 0. [signer, writable] Funding account
+                    AccountMeta(pubkey=sender_pubkey, is_signer=True, is_writable=True),
+                    # 1. [writable] Associated token account address to be created
                     AccountMeta(pubkey=receiver_token_account, is_signer=False, is_writable=True),
-                    # 2. [signer] Owner of source account
-                    AccountMeta(pubkey=sender_pubkey, is_signer=True, is_writable=False),
+                    # 2. [] Wallet address for the new associated token account
+                    AccountMeta(pubkey=receiver_pubkey, is_signer=False, is_writable=False),
+                    # 3. [] The token mint for the new associated token account
+                    AccountMeta(pubkey=USDC_MINT, is_signer=False, is_writable=False),
+                    # 4. [] System program
+                    AccountMeta(pubkey=SYSTEM_PROGRAM_ID, is_signer=False, is_writable=False),
+                    # 5. [] SPL Token program
+                    AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
+                    # 6. [] Rent sysvar
+                    AccountMeta(pubkey=SYSVAR_RENT_PUBKEY, is_signer=False, is_writable=False),
                 ]
-                
-                transfer_ix = Instruction(
-                    program_id=TOKEN_PROGRAM_ID,
-                    accounts=transfer_accounts,
-                    data=transfer_data
+
+                create_ata_ix = Instruction(
+                    program_id=ASSOCIATED_TOKEN_PROGRAM_ID,
+                    accounts=create_ata_accounts,
+                    data=bytes()  # No data needed for this instruction
                 )
-                
-                instructions.append(transfer_ix)
-                
-                # Track user in this batch for results
-                batch_user_info.append({
-                    "user_id": user_id,
-                    "wallet_address": wallet_address,
-                    "original_amount": original_amount_usdc,
-                    "adjusted_amount": adjusted_amount_usdc,
-                    "ata_fee": ata_fee_in_usdc,
-                    "receiver_account_exists": receiver_account_exists
-                })
-            
-            if not instructions:
-                logger.warning("No valid instructions generated for batch")
-                continue
-                
-            # Create and sign transaction
-            message = Message.new_with_blockhash(
-                instructions,
-                sender_pubkey,
-                recent_blockhash
+
+                user_instructions.append(create_ata_ix)
+
+            # Convert amount to token amount (USDC has 6 decimals)
+            usdc_decimals = 6
+            token_amount = int(adjusted_amount_usdc * (10 ** usdc_decimals))
+
+            # Create token transfer instruction
+            transfer_data = bytes([3]) + token_amount.to_bytes(8, byteorder="little")
+
+            transfer_accounts = [
+                # 0. [writable] Source token account
+                AccountMeta(pubkey=sender_token_account, is_signer=False, is_writable=True),
+                # 1. [writable] Destination token account
+                AccountMeta(pubkey=receiver_token_account, is_signer=False, is_writable=True),
+                # 2. [signer] Owner of source account
+                AccountMeta(pubkey=sender_pubkey, is_signer=True, is_writable=False),
+            ]
+
+            transfer_ix = Instruction(
+                program_id=TOKEN_PROGRAM_ID,
+                accounts=transfer_accounts,
+                data=transfer_data
             )
-            transaction = Transaction([keypair], message, recent_blockhash)
-            
-            # Send transaction
-            try:
-                send_response = SOLANA_CLIENT.send_transaction(transaction)
-                if not send_response.value:
-                    error_msg = "Failed to send transaction"
-                    for user_info in batch_user_info:
-                        results.append((user_info["user_id"], False, "", error_msg))
-                    continue
-                        
-                sig = send_response.value
-                tx_signature = str(sig)
-                
-                logger.info(f"Sent batch transaction {tx_signature} with {len(current_batch)} payments")
-                
-                # Wait for confirmation
-                transaction_confirmed = False
-                for attempt in range(MAX_CONFIRMATION_ATTEMPTS):
-                    try:
-                        status_resp = SOLANA_CLIENT.get_signature_statuses([sig])
-                        if not status_resp or not status_resp.value or not status_resp.value[0]:
-                            logger.info(f"Transaction status not available yet, attempt {attempt + 1}/{MAX_CONFIRMATION_ATTEMPTS}")
-                            await asyncio.sleep(CONFIRMATION_CHECK_INTERVAL)
-                            continue
-                            
-                        status = status_resp.value[0]
-                        if status:
-                            # Check for errors
-                            err = status.err
-                            if err:
-                                logger.error(f"Transaction failed: {err}")
-                                error_msg = f"Transaction failed: {err}"
-                                for user_info in batch_user_info:
-                                    results.append((user_info["user_id"], False, "", error_msg))
-                                break
-                            
-                            # Check confirmation status
-                            conf_status = status.confirmation_status
-                            
-                            # Check if the transaction is finalized
-                            is_finalized = False
-                            if "Finalized" in str(conf_status) or conf_status == "finalized" or \
-                               (hasattr(conf_status, 'value') and conf_status.value == 'finalized'):
-                                is_finalized = True
-                                
-                            if is_finalized:
-                                transaction_confirmed = True
-                                # Record success for all users in this batch
-                                for user_info in batch_user_info:
-                                    fee_info = ""
-                                    if not user_info["receiver_account_exists"]:
-                                        fee_info = f" (ATA creation fee of {ATA_CREATION_FEE_SOL} SOL = {user_info['ata_fee']:.6f} USDC was deducted from original amount of {user_info['original_amount']})"
-                                    
-                                    success_message = f"Transaction successful{fee_info}"
-                                    results.append((user_info["user_id"], True, tx_signature, success_message))
-                                break
-                    except Exception as e:
-                        logger.error(f"Error checking transaction status: {e}")
-                    
-                    await asyncio.sleep(CONFIRMATION_CHECK_INTERVAL)
-                
-                # If we exhausted all attempts without confirmation
-                if not transaction_confirmed:
-                    for user_info in batch_user_info:
-                        results.append((user_info["user_id"], False, "", "Transaction timed out waiting for confirmation"))
-                
-            except Exception as e:
-                logger.error(f"Error sending transaction: {str(e)}")
-                for user_info in batch_user_info:
-                    results.append((user_info["user_id"], False, "", f"Transaction failed: {str(e)}"))
+
+            user_instructions.append(transfer_ix)
+
+            compute_units = TRANSFER_COMPUTE_UNITS
+            if not receiver_account_exists:
+                compute_units += CREATE_ATA_COMPUTE_UNITS
+
+            # Track user with their instructions for packing and results
+            pack_items.append((user_instructions, compute_units, {
+                "user_id": user_id,
+                "wallet_address": wallet_address,
+                "original_amount": original_amount_usdc,
+                "adjusted_amount": adjusted_amount_usdc,
+                "ata_fee": ata_fee_in_usdc,
+                "receiver_account_exists": receiver_account_exists,
+                "receiver_token_account": str(receiver_token_account)
+            }))
+
+        if not pack_items:
+            logger.warning("No valid instructions generated for payout batch")
+            return results
+
+        packed = pack_instructions(pack_items, sender_pubkey)
+        prepared = [
+            {
+                "instructions": [ix for instructions, _, _ in group for ix in instructions],
+                "users": [user_info for _, _, user_info in group],
+                "signature": None,
+                "send_error": None
+            }
+            for group in packed
+        ]
+
+        ata_payments = sum(1 for _, _, u in pack_items if not u["receiver_account_exists"])
+        legacy_count = legacy_transaction_count(len(pack_items) - ata_payments, ata_payments)
+        fees_saved = (legacy_count - len(prepared)) * LAMPORTS_PER_SIGNATURE / 1e9
+        logger.info(
+            f"💰 Packed {len(pack_items)} payments into {len(prepared)} transactions "
+            f"(fixed batching needed {legacy_count}); {fees_saved:.6f} SOL in fees saved"
+        )
+
+        if pipelined:
+            # Sign and submit everything on one blockhash, then confirm together
+            await submit_and_confirm(prepared, keypair, results)
+        else:
+            for tx in prepared:
+                await submit_and_confirm([tx], keypair, results)
         
         return results
         
     except Exception as e:
         logger.error(f"Error processing batch payments: {str(e)}")
-        # Return failed result for all payments in the batch
-        return [(user_id, False, "", f"Batch processing failed: {str(e)}") for user_id, _, _ in payment_batch]
+        # Keep outcomes already recorded (some may have been paid) and fail the rest
+        reported = {user_id for user_id, _, _, _ in results}
+        return results + [
+            (user_id, False, "", f"Batch processing failed: {str(e)}")
+            for user_id, _, _ in payment_batch if user_id not in reported
+        ]
+
+
+# --- Pipelined Submission ---
+def _record_outcome(tx: Dict[str, Any], success: bool, message: str, results: list):
+    tx_signature = str(tx["signature"]) if success else ""
+    for user_info in tx["users"]:
+        if success and not user_info["receiver_account_exists"]:
+            message_for_user = f"{message} (ATA creation fee of {ATA_CREATION_FEE_SOL} SOL = {user_info['ata_fee']:.6f} USDC was deducted from original amount of {user_info['original_amount']})"
+        else:
+            message_for_user = message
+        results.append((user_info["user_id"], success, tx_signature, message_for_user))
+
+
+async def _finish_transaction(tx: Dict[str, Any], status: str, error: Optional[str], results: list):
+    if status == CONFIRM_FINALIZED:
+        _record_outcome(tx, True, "Transaction successful", results)
+        # ATAs created by this transaction now exist
+        await ata_cache.add_known_atas(u["receiver_token_account"] for u in tx["users"])
+    else:
+        logger.error(f"Transaction {tx['signature']} failed: {error}")
+        _record_outcome(tx, False, f"Transaction failed: {error}", results)
+        # A cached ATA may have been closed since; re-check next round
+        await ata_cache.forget_known_atas(
+            u["receiver_token_account"] for u in tx["users"] if u["receiver_account_exists"]
+        )
+
+
+async def _send(tx: Dict[str, Any], transaction: Transaction):
+    try:
+        await RPC_POOL.call("send_transaction", transaction)
+        tx["send_error"] = None
+    except Exception as e:
+        # The node may still have forwarded it, so it stays watched until expiry
+        logger.warning(f"⚠️ Send of {tx['signature']} raised: {e}")
+        tx["send_error"] = str(e)
+
+
+async def _wait_for_blockhash_expiry(last_valid_block_height: int) -> bool:
+    """
+    Wait until no transaction signed with the blockhash can still land.
+    """
+    deadline = time.monotonic() + BLOCKHASH_EXPIRY_MAX_WAIT
+    while time.monotonic() < deadline:
+        try:
+            height = (await RPC_POOL.call("get_block_height")).value
+            if height > last_valid_block_height:
+                return True
+        except Exception as e:
+            logger.warning(f"⚠️ Block height check failed: {e}")
+        await asyncio.sleep(BLOCK_HEIGHT_POLL_INTERVAL)
+    return False
+
+
+async def submit_and_confirm(prepared: List[Dict[str, Any]], keypair: Keypair, results: list):
+    """
+    Sign all prepared transactions with one recent blockhash, submit them
+    concurrently and confirm them together through the shared watcher.
+
+    A transaction is re-signed with a fresh blockhash only once the previous
+    blockhash has expired and its signature is confirmed absent, so the old
+    version can never land alongside the new one.
+    """
+    pending = list(prepared)
+    sender_pubkey = keypair.pubkey()
+
+    for submission in range(1, MAX_SUBMISSIONS + 1):
+        if not pending:
+            return
+
+        try:
+            blockhash_response = await RPC_POOL.call("get_latest_blockhash")
+            recent_blockhash = blockhash_response.value.blockhash
+            last_valid_block_height = blockhash_response.value.last_valid_block_height
+        except Exception as e:
+            # Nothing in `pending` can land any more, so failing them is safe
+            logger.error(f"Failed to get latest blockhash: {e}")
+            for tx in pending:
+                _record_outcome(tx, False, "Failed to get latest blockhash", results)
+            return
+
+        transactions = []
+        for tx in pending:
+            message = Message.new_with_blockhash(tx["instructions"], sender_pubkey, recent_blockhash)
+            transaction = Transaction([keypair], message, recent_blockhash)
+            tx["signature"] = transaction.signatures[0]
+            transactions.append(transaction)
+
+        await asyncio.gather(*[_send(tx, transaction) for tx, transaction in zip(pending, transactions)])
+        logger.info(f"Submitted {len(pending)} payout transactions (submission {submission}/{MAX_SUBMISSIONS})")
+
+        outcomes = await asyncio.gather(*[
+            CONFIRMATION_WATCHER.wait(tx["signature"], timeout=MAX_CONFIRMATION_ATTEMPTS * CONFIRMATION_CHECK_INTERVAL)
+            for tx in pending
+        ])
+
+        unresolved = []
+        for tx, (status, error) in zip(pending, outcomes):
+            if status in (CONFIRM_FINALIZED, CONFIRM_FAILED):
+                await _finish_transaction(tx, status, error, results)
+            else:
+                unresolved.append(tx)
+
+        if not unresolved:
+            return
+
+        if not await _wait_for_blockhash_expiry(last_valid_block_height):
+            # Can't rule out a late landing, so never re-sign these
+            for tx in unresolved:
+                _record_outcome(tx, False, f"Transaction {tx['signature']} unconfirmed; not resubmitted", results)
+            return
+
+        try:
+            statuses = (await RPC_POOL.call(
+                "get_signature_statuses",
+                [tx["signature"] for tx in unresolved],
+                search_transaction_history=True
+            )).value
+        except Exception as e:
+            logger.error(f"Final status check failed: {e}")
+            for tx in unresolved:
+                _record_outcome(tx, False, f"Transaction {tx['signature']} unconfirmed; not resubmitted", results)
+            return
+
+        pending = []
+        for tx, status in zip(unresolved, statuses):
+            if status is None:
+                if tx["send_error"]:
+                    _record_outcome(tx, False, f"Transaction failed: {tx['send_error']}", results)
+                else:
+                    # Expired without landing: safe to re-sign
+                    pending.append(tx)
+            elif status.err:
+                await _finish_transaction(tx, CONFIRM_FAILED, str(status.err), results)
+            else:
+                # Landed late; it only needs to reach finality now
+                status, error = await CONFIRMATION_WATCHER.wait(
+                    tx["signature"], timeout=MAX_CONFIRMATION_ATTEMPTS * CONFIRMATION_CHECK_INTERVAL
+                )
+                if status == CONFIRM_TIMEOUT:
+                    _record_outcome(tx, False, f"Transaction {tx['signature']} landed but not finalized", results)
+                else:
+                    await _finish_transaction(tx, status, error, results)
+
+    for tx in pending:
+        _record_outcome(tx, False, f"Blockhash expired {MAX_SUBMISSIONS} times without confirmation", results)
+
 
 # Helper function to find associated token address
 def find_associated_token_address(wallet: Pubkey, token_mint: Pubkey) -> Pubkey:
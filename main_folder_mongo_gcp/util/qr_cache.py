@@ -0,0 +1,86 @@
+# qr_cache.py
+# Deposit wallet QR codes: PNGs rendered off the event loop once, then Telegram file_ids reused
+
+import asyncio
+import io
+import logging
+from typing import Dict, List
+
+from telegram import InputFile
+from telegram.error import BadRequest
+
+import storage.wallets as wallets
+from util.lru_cache import LRUCache
+from util.wallet_keygen import render_qr_png
+
+logger = logging.getLogger(__name__)
+
+QR_CACHE_SIZE = 500
+
+# address -> PNG bytes, only needed until Telegram has the image
+QR_PNG_CACHE = LRUCache(QR_CACHE_SIZE)
+
+# address -> file_id of the uploaded QR photo
+QR_FILE_IDS: Dict[str, str] = {}
+
+
+def _render_many(addresses: List[str]) -> Dict[str, bytes]:
+    return {address: render_qr_png(address) for address in addresses}
+
+
+async def warm_qr_cache():
+    """
+    Run at pool load: pick up stored file_ids and PNGs, and render (in a thread)
+    and persist PNGs for wallets that have neither, up to QR_CACHE_SIZE.
+    """
+    QR_FILE_IDS.update(await wallets.load_qr_file_ids())
+
+    pending = [a for a in wallets.get_all_addresses() if a not in QR_FILE_IDS][:QR_CACHE_SIZE]
+    stored = await wallets.load_qr_pngs(pending)
+    missing = [a for a in pending if a not in stored]
+
+    rendered = await asyncio.to_thread(_render_many, missing) if missing else {}
+    await wallets.save_qr_pngs(rendered)
+
+    for address, png in {**stored, **rendered}.items():
+        QR_PNG_CACHE.set(address, png)
+
+    logger.info(
+        f"🖼️ QR cache warmed: {len(QR_FILE_IDS)} uploaded, {len(stored)} stored, {len(rendered)} rendered"
+    )
+
+
+async def get_qr_png(address: str) -> bytes:
+    png = QR_PNG_CACHE.get(address)
+    if png is None:
+        png = (await wallets.load_qr_pngs([address])).get(address)
+        if png is None:
+            png = await asyncio.to_thread(render_qr_png, address)
+            await wallets.save_qr_pngs({address: png})
+        QR_PNG_CACHE.set(address, png)
+    return png
+
+
+async def send_wallet_qr(chat, address: str, **kwargs):
+    """
+    chat.send_photo with the wallet's QR, reusing the uploaded file_id when there is one.
+    """
+    file_id = QR_FILE_IDS.get(address)
+    if file_id:
+        try:
+            return await chat.send_photo(photo=file_id, **kwargs)
+        except BadRequest as e:
+            logger.warning(f"⚠️ Cached QR file_id for {address} rejected, re-uploading: {e}")
+            QR_FILE_IDS.pop(address, None)
+
+    png = await get_qr_png(address)
+    message = await chat.send_photo(photo=InputFile(io.BytesIO(png), filename="qr.png"), **kwargs)
+
+    if message.photo:
+        QR_FILE_IDS[address] = message.photo[-1].file_id
+        QR_PNG_CACHE.pop(address)
+        try:
+            await wallets.save_qr_file_id(address, QR_FILE_IDS[address])
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to store QR file_id for {address}: {e}")
+    return message
@@ -0,0 +1,194 @@
+# rpc_pool.py
+# Shared async Solana RPC pool over storage.rpcs.RPC_LIST with health scoring
+
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, List, Optional
+
+import httpx
+from solana.exceptions import SolanaRpcException
+from solana.rpc.async_api import AsyncClient
+from config import SOLANA_RPC
+
+logger = logging.getLogger(__name__)
+
+LATENCY_EWMA_ALPHA = 0.3          # weight of the newest latency sample
+ERROR_SCORE_DECAY = 0.5           # error score multiplier on each success
+CIRCUIT_FAILURE_THRESHOLD = 3     # consecutive failures before opening the circuit
+CIRCUIT_BASE_COOLDOWN = 10        # seconds
+CIRCUIT_MAX_COOLDOWN = 300        # seconds
+DEFAULT_TIMEOUT = 10              # seconds per attempt
+
+
+class NoHealthyEndpoint(Exception):
+    pass
+
+
+def is_transport_error(error: BaseException) -> bool:
+    """
+    True for failures of the endpoint itself (timeout, connection, HTTP 429/5xx).
+    RPC errors such as preflight failures or bad params are the caller's problem.
+    """
+    if isinstance(error, SolanaRpcException):
+        # solana-py wraps the underlying httpx error
+        return error.__cause__ is None or is_transport_error(error.__cause__)
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, (TimeoutError, asyncio.TimeoutError, httpx.TransportError, OSError))
+
+
+class RpcEndpoint:
+    """
+    One RPC URL, its AsyncClient and health state.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.client = AsyncClient(url)
+        self.latency = 0.5            # seconds, EWMA
+        self.error_score = 0.0
+        self.consecutive_failures = 0
+        self.cooldown = CIRCUIT_BASE_COOLDOWN
+        self.open_until = 0.0
+        self.half_open_probe = False
+
+    def is_available(self, now: float) -> bool:
+        if self.open_until <= 0:
+            return True
+        # Half-open: let a single probe through once the cooldown has passed
+        return now >= self.open_until and not self.half_open_probe
+
+    def weight(self) -> float:
+        return 1.0 / (max(self.latency, 0.01) * (1.0 + self.error_score))
+
+    def record_success(self, elapsed: float):
+        self.latency = LATENCY_EWMA_ALPHA * elapsed + (1 - LATENCY_EWMA_ALPHA) * self.latency
+        self.error_score *= ERROR_SCORE_DECAY
+        self.consecutive_failures = 0
+        self.cooldown = CIRCUIT_BASE_COOLDOWN
+        self.open_until = 0.0
+        self.half_open_probe = False
+
+    def record_failure(self, now: float):
+        self.error_score += 1.0
+        self.consecutive_failures += 1
+
+        if self.half_open_probe:
+            # Probe failed: reopen with a longer cooldown
+            self.cooldown = min(self.cooldown * 2, CIRCUIT_MAX_COOLDOWN)
+            self.open_until = now + self.cooldown
+            self.half_open_probe = False
+        elif self.consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD:
+            self.open_until = now + self.cooldown
+            logger.warning(f"🔌 RPC circuit opened for {self.url} ({self.cooldown}s)")
+
+    def status(self) -> str:
+        if self.open_until <= 0:
+            state = "🟢"
+        elif time.monotonic() >= self.open_until:
+            state = "🟡"
+        else:
+            state = "🔴"
+        return f"{state} {self.latency * 1000:.0f} ms, err {self.error_score:.1f}"
+
+
+class RpcPool:
+    """
+    Latency-weighted selection across endpoints, with per-endpoint circuit
+    breaking and failover to the next endpoint on error or timeout.
+    """
+
+    def __init__(self, fallback_url: str):
+        self.fallback_url = fallback_url
+        self.endpoints: Dict[str, RpcEndpoint] = {}
+
+    def set_endpoints(self, urls: List[str]):
+        """
+        Sync with the RPC list, keeping health state of endpoints that remain.
+        """
+        urls = list(dict.fromkeys(urls)) or [self.fallback_url]
+
+        for url in list(self.endpoints):
+            if url not in urls:
+                endpoint = self.endpoints.pop(url)
+                self._close_later(endpoint)
+
+        for url in urls:
+            if url not in self.endpoints:
+                self.endpoints[url] = RpcEndpoint(url)
+
+        logger.info(f"📡 RPC pool synced with {len(self.endpoints)} endpoint(s)")
+
+    @staticmethod
+    def _close_later(endpoint: RpcEndpoint):
+        try:
+            asyncio.get_running_loop().create_task(endpoint.client.close())
+        except RuntimeError:
+            pass
+
+    def _pick(self, exclude: set) -> Optional[RpcEndpoint]:
+        now = time.monotonic()
+        candidates = [
+            ep for url, ep in self.endpoints.items()
+            if url not in exclude and ep.is_available(now)
+        ]
+        if not candidates:
+            return None
+        endpoint = random.choices(candidates, weights=[ep.weight() for ep in candidates])[0]
+        if endpoint.open_until > 0:
+            endpoint.half_open_probe = True
+        return endpoint
+
+    async def call(self, method: str, *args, timeout: float = DEFAULT_TIMEOUT, **kwargs):
+        """
+        Invoke an AsyncClient method (e.g. "get_balance") on the healthiest
+        endpoint, failing over to the others until one succeeds.
+        """
+        if not self.endpoints:
+            self.set_endpoints([])
+
+        tried = set()
+        last_error: Optional[Exception] = None
+
+        while True:
+            endpoint = self._pick(tried)
+            if endpoint is None:
+                break
+            tried.add(endpoint.url)
+
+            started = time.monotonic()
+            try:
+                async with asyncio.timeout(timeout):
+                    result = await getattr(endpoint.client, method)(*args, **kwargs)
+            except Exception as e:
+                if not is_transport_error(e):
+                    # The endpoint answered; surface the RPC error unchanged
+                    endpoint.record_success(time.monotonic() - started)
+                    raise
+                endpoint.record_failure(time.monotonic())
+                last_error = e
+                logger.warning(f"⚠️ RPC {method} failed on {endpoint.url}: {e!r}")
+                continue
+            finally:
+                # Cancelled mid-probe: release the probe slot so the endpoint isn't stuck half-open
+                endpoint.half_open_probe = False
+
+            endpoint.record_success(time.monotonic() - started)
+            return result
+
+        raise NoHealthyEndpoint(f"All RPC endpoints failed for {method}: {last_error!r}")
+
+    def status_lines(self) -> List[str]:
+        return [f"{url} — {ep.status()}" for url, ep in self.endpoints.items()]
+
+    async def close(self):
+        for endpoint in self.endpoints.values():
+            await endpoint.client.close()
+        self.endpoints.clear()
+
+
+# Shared pool; endpoints are kept in sync by storage.rpcs
+RPC_POOL = RpcPool(SOLANA_RPC)
@@ -0,0 +1,188 @@
+# sweep_scheduler.py
+# Collects funded deposit wallets and sweeps them to a payout wallet in multi-signer transactions
+
+import asyncio
+import html
+import logging
+from typing import Dict, List, Optional, Tuple
+from base58 import b58decode
+
+from solders.keypair import Keypair # type: ignore
+from solders.pubkey import Pubkey # type: ignore
+from solders.transaction import Transaction # type: ignore
+from solders.message import Message # type: ignore
+from solders.system_program import transfer, TransferParams
+
+from secrets_key import get_decrypted_wallet
+from storage.payout import get_next_payout_wallet
+import storage.wallets as wallets
+from util.utils import send_message
+from util.rpc_pool import RPC_POOL
+from util.confirmation_watcher import CONFIRMATION_WATCHER, CONFIRM_FINALIZED
+from config import SOLANA_RPC, DEFAULT_FEE_LAMPORTS, LAMPORTS_PER_SOL, BOT_PAYMENT_LOGS_ID, BOT_ERROR_LOGS_ID
+
+logger = logging.getLogger(__name__)
+
+CLUSTER = "mainnet" if "mainnet" in SOLANA_RPC.lower() else "devnet"
+
+SWEEP_INTERVAL = 300              # seconds between sweeps of whatever is queued
+MAX_SIGNERS_PER_SWEEP_TX = 8      # ~113 bytes per source wallet keeps 8 well under 1232 bytes
+SWEEP_THRESHOLD = MAX_SIGNERS_PER_SWEEP_TX  # sweep early once a full transaction is queued
+MAX_ACCOUNTS_PER_LOOKUP = 100     # getMultipleAccounts limit per request
+SWEEP_CONFIRM_TIMEOUT = 60        # seconds
+MIN_BALANCE_FOR_RENT = 890880     # lamports left behind in each deposit wallet
+MIN_SWEEP_LAMPORTS = DEFAULT_FEE_LAMPORTS * 2  # below this a wallet isn't worth a signature
+
+# wallet_address -> (user_id, usd_amount) of the payment that funded it
+SWEEP_QUEUE: Dict[str, Tuple[Optional[int], Optional[float]]] = {}
+_SWEEP_DUE = asyncio.Event()
+
+
+def schedule_sweep(wallet_address: str, user_id: Optional[int] = None, usd_amount: Optional[float] = None):
+    """
+    Queue a deposit wallet for the next sweep; replaces the per-payment forward task.
+    """
+    SWEEP_QUEUE[wallet_address] = (user_id, usd_amount)
+    if len(SWEEP_QUEUE) >= SWEEP_THRESHOLD:
+        _SWEEP_DUE.set()
+
+
+async def _fetch_balances(addresses: List[str]) -> Dict[str, int]:
+    chunks = [addresses[i:i + MAX_ACCOUNTS_PER_LOOKUP] for i in range(0, len(addresses), MAX_ACCOUNTS_PER_LOOKUP)]
+    responses = await asyncio.gather(*[
+        RPC_POOL.call("get_multiple_accounts", [Pubkey.from_string(a) for a in chunk])
+        for chunk in chunks
+    ])
+    balances = {}
+    for chunk, response in zip(chunks, responses):
+        for address, account in zip(chunk, response.value):
+            balances[address] = account.lamports if account is not None else 0
+    return balances
+
+
+def _build_sweep(sources: List[Tuple[Keypair, int]], to_pubkey: Pubkey, recent_blockhash) -> Tuple[Transaction, List[int]]:
+    """
+    One transfer per source; the first source pays the fee for every signature.
+    """
+    amounts = [balance - MIN_BALANCE_FOR_RENT for _, balance in sources]
+    amounts[0] -= DEFAULT_FEE_LAMPORTS * len(sources)
+
+    instructions = [
+        transfer(TransferParams(from_pubkey=keypair.pubkey(), to_pubkey=to_pubkey, lamports=amount))
+        for (keypair, _), amount in zip(sources, amounts)
+    ]
+    keypairs = [keypair for keypair, _ in sources]
+    message = Message.new_with_blockhash(instructions, keypairs[0].pubkey(), recent_blockhash)
+    return Transaction(keypairs, message, recent_blockhash), amounts
+
+
+async def _notify_sweep(bot, addresses: List[str], to_address: str, lamports: int, usd_total: float, sig):
+    sol_amount = round(lamports / LAMPORTS_PER_SOL, 4)
+    usd_display = f" (~${usd_total:.2f})" if usd_total else ""
+    sources = "\n".join(f"🔁 <code>{html.escape(a)}</code>" for a in addresses)
+    msg = (
+        f"💸 <b>Deposits Swept Successfully!</b>\n\n"
+        f"{sources}\n"
+        f"📥 To: <code>{html.escape(to_address)}</code>\n"
+        f"💰 Amount: {sol_amount} SOL{html.escape(usd_display)} from {len(addresses)} wallet(s)\n"
+        f"🔗 <a href='https://explorer.solana.com/tx/{html.escape(str(sig))}?cluster={CLUSTER}'>View TX</a>"
+    )
+    try:
+        await send_message(bot, msg, chat_id=BOT_PAYMENT_LOGS_ID, parse_mode="HTML")
+    except Exception as e:
+        logger.error(f"Failed to send sweep notification: {e}")
+
+
+async def sweep_pending(bot) -> int:
+    """
+    Sweep every queued wallet: one balance lookup per 100 wallets, one blockhash,
+    and one transaction per MAX_SIGNERS_PER_SWEEP_TX wallets. Returns wallets swept.
+    """
+    _SWEEP_DUE.clear()
+    queued = dict(SWEEP_QUEUE)
+    SWEEP_QUEUE.clear()
+    if not queued:
+        return 0
+
+    to_address = get_next_payout_wallet()
+    if not to_address:
+        SWEEP_QUEUE.update(queued)
+        await send_message(bot, "⚠️ Deposit sweep skipped — no payout wallet available.", chat_id=BOT_ERROR_LOGS_ID)
+        return 0
+
+    try:
+        balances = await _fetch_balances(list(queued))
+        recent_blockhash = (await RPC_POOL.call("get_latest_blockhash")).value.blockhash
+    except Exception:
+        SWEEP_QUEUE.update(queued)
+        raise
+
+    sources = []
+    empty = []
+    for address, balance in balances.items():
+        if balance - MIN_BALANCE_FOR_RENT - DEFAULT_FEE_LAMPORTS * MAX_SIGNERS_PER_SWEEP_TX < MIN_SWEEP_LAMPORTS:
+            empty.append(address)  # nothing worth moving (or already swept)
+            continue
+        private_key_b58 = get_decrypted_wallet(address)
+        if not private_key_b58:
+            logger.error(f"Private key not found for wallet: {address}")
+            continue
+        sources.append((address, Keypair.from_bytes(b58decode(private_key_b58)), balance))
+
+    # Held wallets go back to the free list only once nothing is left to sweep
+    await wallets.release_swept_wallets(empty)
+    if not sources:
+        return 0
+
+    to_pubkey = Pubkey.from_string(to_address)
+    groups = [sources[i:i + MAX_SIGNERS_PER_SWEEP_TX] for i in range(0, len(sources), MAX_SIGNERS_PER_SWEEP_TX)]
+
+    async def sweep_group(group) -> int:
+        addresses = [address for address, _, _ in group]
+        txn, amounts = _build_sweep([(kp, balance) for _, kp, balance in group], to_pubkey, recent_blockhash)
+        sig = txn.signatures[0]
+        try:
+            await RPC_POOL.call("send_transaction", txn)
+            status, error = await CONFIRMATION_WATCHER.wait(sig, timeout=SWEEP_CONFIRM_TIMEOUT)
+        except Exception as e:
+            status, error = None, str(e)
+
+        if status != CONFIRM_FINALIZED:
+            # Balances are re-read next time, so a retry can't move funds twice
+            for address in addresses:
+                SWEEP_QUEUE.setdefault(address, queued[address])
+            await send_message(
+                bot,
+                f"⚠️ Deposit sweep of {len(addresses)} wallet(s) failed ({sig}) — Error: {error or status}. Requeued.",
+                chat_id=BOT_ERROR_LOGS_ID
+            )
+            return 0
+
+        await wallets.release_swept_wallets(addresses)
+        usd_total = sum(queued[a][1] or 0 for a in addresses)
+        await _notify_sweep(bot, addresses, to_address, sum(amounts), usd_total, sig)
+        return len(addresses)
+
+    swept = sum(await asyncio.gather(*[sweep_group(group) for group in groups]))
+    logger.info(f"🧹 Swept {swept}/{len(sources)} deposit wallets in {len(groups)} transaction(s)")
+    return swept
+
+
+async def run_sweep_scheduler(app, interval: float = SWEEP_INTERVAL):
+    """
+    Sweep on a cadence, or sooner once SWEEP_THRESHOLD wallets are queued.
+    Funds left from before a restart are picked up by queueing the whole pool first.
+    """
+    for address in wallets.get_all_addresses():
+        SWEEP_QUEUE.setdefault(address, (None, None))
+
+    while True:
+        try:
+            await asyncio.wait_for(_SWEEP_DUE.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+        try:
+            await sweep_pending(app.bot)
+        except Exception as e:
+            logger.error(f"❌ Deposit sweep failed: {e}")
@@ -0,0 +1,63 @@
+# tx_cache.py
+# Signature-keyed cache of parsed getTransaction results for payment verification
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from util.jsonrpc_client import JSONRPC_CLIENT, JsonRpcError
+from util.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+TX_CACHE_SIZE = 2000
+MISS_TTL = 15  # seconds a "not found" answer is trusted before asking again
+
+# signature -> (transaction or None, cached_at)
+TX_CACHE = LRUCache(TX_CACHE_SIZE)
+
+# signature -> future of the lookup currently in flight
+_IN_FLIGHT: Dict[str, asyncio.Future] = {}
+
+
+async def _fetch_transaction(tx_sig: str) -> Optional[Dict[str, Any]]:
+    try:
+        # getTransaction defaults to finalized commitment, so a hit never changes
+        return await JSONRPC_CLIENT.call("getTransaction", [tx_sig, {"encoding": "jsonParsed"}])
+    except JsonRpcError as e:
+        # Malformed signatures and the like read as "not found"
+        logger.warning(f"⚠️ getTransaction for {tx_sig} returned an error: {e}")
+        return None
+
+
+async def get_transaction(tx_sig: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the parsed transaction for a signature, or None if it isn't on-chain.
+    Finalized transactions stay cached; misses are re-checked after MISS_TTL.
+    Concurrent lookups of one signature share a single RPC call.
+    """
+    cached = TX_CACHE.get(tx_sig)
+    if cached is not None:
+        transaction, cached_at = cached
+        if transaction is not None or time.monotonic() - cached_at < MISS_TTL:
+            return transaction
+
+    in_flight = _IN_FLIGHT.get(tx_sig)
+    if in_flight is not None:
+        return await asyncio.shield(in_flight)
+
+    future = asyncio.get_running_loop().create_future()
+    _IN_FLIGHT[tx_sig] = future
+    try:
+        transaction = await _fetch_transaction(tx_sig)
+        TX_CACHE.set(tx_sig, (transaction, time.monotonic()))
+        future.set_result(transaction)
+        return transaction
+    except Exception as e:
+        future.set_exception(e)
+        # Followers re-raise it; mark it retrieved so it isn't reported as unhandled
+        future.exception()
+        raise
+    finally:
+        _IN_FLIGHT.pop(tx_sig, None)
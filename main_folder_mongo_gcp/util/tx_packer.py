@@ -0,0 +1,84 @@
+# tx_packer.py
+# Packs payout instructions into as few transactions as the size and compute limits allow
+
+import math
+from typing import Any, List, Tuple
+
+from solders.hash import Hash # type: ignore
+from solders.instruction import Instruction # type: ignore
+from solders.message import Message # type: ignore
+from solders.pubkey import Pubkey # type: ignore
+
+MAX_TRANSACTION_SIZE = 1232        # bytes, packet data limit for a serialized transaction
+MAX_TRANSACTION_COMPUTE = 1_400_000  # compute units per transaction
+SIGNATURE_SIZE = 64
+LAMPORTS_PER_SIGNATURE = 5000
+
+# Conservative compute estimates per payout instruction
+TRANSFER_COMPUTE_UNITS = 6_000
+CREATE_ATA_COMPUTE_UNITS = 30_000
+
+# (instructions, compute_units, payload) — payload is returned untouched
+PackItem = Tuple[List[Instruction], int, Any]
+
+
+def transaction_size(instructions: List[Instruction], payer: Pubkey) -> int:
+    """
+    Serialized size of a transaction carrying these instructions, signatures included.
+    The blockhash doesn't change the size, so a default one is used.
+    """
+    message = Message.new_with_blockhash(instructions, payer, Hash.default())
+    num_signatures = message.header.num_required_signatures
+    # compact-u16 signature count (1 byte below 128) + signatures + message
+    return 1 + SIGNATURE_SIZE * num_signatures + len(bytes(message))
+
+
+def pack_instructions(
+        items: List[PackItem],
+        payer: Pubkey,
+        max_size: int = MAX_TRANSACTION_SIZE,
+        max_compute: int = MAX_TRANSACTION_COMPUTE
+        ) -> List[List[PackItem]]:
+    """
+    Greedily fill each transaction, in order, until the next item would push it
+    past max_size or max_compute. An item's instructions are never split.
+    """
+    packed: List[List[PackItem]] = []
+    current: List[PackItem] = []
+    current_instructions: List[Instruction] = []
+    current_compute = 0
+
+    for item in items:
+        instructions, compute_units, _ = item
+        candidate = current_instructions + instructions
+
+        fits = (
+            current_compute + compute_units <= max_compute
+            and transaction_size(candidate, payer) <= max_size
+        )
+        if fits:
+            current.append(item)
+            current_instructions = candidate
+            current_compute += compute_units
+            continue
+
+        if not current:
+            raise ValueError("A single payout does not fit in one transaction")
+
+        packed.append(current)
+        if compute_units > max_compute or transaction_size(instructions, payer) > max_size:
+            raise ValueError("A single payout does not fit in one transaction")
+        current = [item]
+        current_instructions = list(instructions)
+        current_compute = compute_units
+
+    if current:
+        packed.append(current)
+    return packed
+
+
+def legacy_transaction_count(plain_transfers: int, ata_transfers: int) -> int:
+    """
+    Transactions the previous fixed batching needed: 5 transfers, or 2 ATA-creating ones, per tx.
+    """
+    return math.ceil(plain_transfers / 5) + math.ceil(ata_transfers / 2)
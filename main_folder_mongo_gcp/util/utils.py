@@ -117,6 +117,31 @@ def build_custom_update_from_query(query):
     message = CustomMessage(chat_id=user_id, query=query)
     return CustomUpdate(effective_chat=chat, message=message)
 
+
+class CustomChatMessage:
+    """Incoming-message stand-in for background flows; replies are sent as new messages."""
+    def __init__(self, bot, chat_id, text=""):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.text = text
+
+    async def reply_text(self, text, parse_mode=None, reply_markup=None, disable_web_page_preview=False):
+        return await self.bot.send_message(
+            chat_id=self.chat_id,
+            text=text,
+            parse_mode=parse_mode,
+            reply_markup=reply_markup,
+            disable_web_page_preview=disable_web_page_preview
+        )
+
+
+def build_custom_update_for_user(bot, user_id, text=""):
+    """Update as if the user had sent `text` in their private chat with the bot."""
+    chat = CustomEffectiveChat(id=user_id)
+    update = CustomUpdate(effective_chat=chat, message=CustomChatMessage(bot, user_id, text))
+    update.effective_user = chat
+    return update
+
 # Helper function to handle action confirmation
 async def confirm_action(update, context, confirm_callback_data, cancel_callback_data, confirm_message):
     keyboard = [
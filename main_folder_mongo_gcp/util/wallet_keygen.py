@@ -0,0 +1,51 @@
+# wallet_keygen.py
+# CPU-bound wallet work run in worker processes: keypairs, encryption and QR rendering.
+# Kept free of bot/storage imports so workers start cheaply.
+
+import io
+from typing import List, Optional, Tuple
+
+import qrcode
+from base58 import b58decode, b58encode
+from cryptography.fernet import Fernet
+from solders.keypair import Keypair # type: ignore
+
+# (address, base58 secret, encrypted secret, QR PNG) per wallet
+ProvisionedWallet = Tuple[str, str, str, bytes]
+
+
+def render_qr_png(address: str) -> bytes:
+    """
+    PNG of the address-only QR shown on payment screens.
+    """
+    bio = io.BytesIO()
+    qrcode.make(address).save(bio, "PNG")
+    return bio.getvalue()
+
+
+def _provision(keypair: Keypair, fernet: Fernet) -> ProvisionedWallet:
+    address = str(keypair.pubkey())
+    secret = b58encode(bytes(keypair)).decode()
+    encrypted = fernet.encrypt(secret.encode()).decode()
+    return address, secret, encrypted, render_qr_png(address)
+
+
+def generate_wallets(count: int, key: bytes) -> List[ProvisionedWallet]:
+    fernet = Fernet(key)
+    return [_provision(Keypair(), fernet) for _ in range(count)]
+
+
+def import_wallets(secrets: List[str], key: bytes) -> List[Tuple[str, Optional[ProvisionedWallet], Optional[str]]]:
+    """
+    Returns (input, wallet, error) per secret; invalid secrets carry an error instead.
+    """
+    fernet = Fernet(key)
+    results = []
+    for secret in secrets:
+        try:
+            keypair = Keypair.from_bytes(b58decode(secret))
+        except Exception as e:
+            results.append((secret, None, str(e)))
+            continue
+        results.append((secret, _provision(keypair, fernet), None))
+    return results
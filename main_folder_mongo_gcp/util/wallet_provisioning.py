@@ -0,0 +1,90 @@
+# wallet_provisioning.py
+# Bulk deposit wallet generation/import: CPU work on a process pool, one write per store
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import secrets_key as secrets_key
+import storage.wallets as wallets
+import util.wallet_keygen as wallet_keygen
+
+logger = logging.getLogger(__name__)
+
+MAX_PROVISION_COUNT = 5000
+CHUNK_SIZE = 100  # wallets per worker task
+MAX_WORKERS = os.cpu_count() or 1
+
+# Spawn rather than fork: forking the running bot (event loop, pymongo monitor
+# threads) can leave a child deadlocked on a lock another thread held
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+
+def _chunks(items: List, size: int) -> List[List]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+async def _run_on_pool(fn, jobs: List) -> List:
+    if not jobs:
+        return []
+    loop = asyncio.get_running_loop()
+    key = secrets_key.get_key()  # derived once here; workers only build a Fernet
+    with ProcessPoolExecutor(max_workers=min(MAX_WORKERS, len(jobs)), mp_context=_MP_CONTEXT) as pool:
+        chunks = await asyncio.gather(*[loop.run_in_executor(pool, fn, job, key) for job in jobs])
+    return [item for chunk in chunks for item in chunk]
+
+
+async def _store(provisioned: List[wallet_keygen.ProvisionedWallet]) -> List[str]:
+    """
+    Encrypted secrets in one update, pool docs (with QR PNGs) in one bulk write.
+    """
+    new_secrets: Dict[str, str] = {}
+    qr_codes: Dict[str, bytes] = {}
+    for address, secret, encrypted, qr_png in provisioned:
+        new_secrets[address] = encrypted
+        qr_codes[address] = qr_png
+
+    await secrets_key.add_encrypted_keys(new_secrets)
+    secrets_key.DECRYPTED_WALLETS.update({address: secret for address, secret, _, _ in provisioned})
+    return await wallets.add_wallets(list(new_secrets), qr_codes)
+
+
+async def generate_deposit_wallets(count: int) -> List[str]:
+    """
+    Generate `count` new deposit wallets and add them to the pool as available.
+    """
+    if not secrets_key.DECRYPTED_WALLETS:
+        await secrets_key.load_encrypted_keys()
+
+    jobs = [len(chunk) for chunk in _chunks(list(range(count)), CHUNK_SIZE)]
+    provisioned = await _run_on_pool(wallet_keygen.generate_wallets, jobs)
+    added = await _store(provisioned)
+    logger.info(f"🏭 Generated {len(added)} deposit wallets")
+    return added
+
+
+async def import_deposit_wallets(base58_keys: List[str]) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """
+    Import existing secret keys; returns (added addresses, [(key or address, reason)]).
+    """
+    if not secrets_key.DECRYPTED_WALLETS:
+        await secrets_key.load_encrypted_keys()
+
+    results = await _run_on_pool(wallet_keygen.import_wallets, _chunks(list(dict.fromkeys(base58_keys)), CHUNK_SIZE))
+
+    provisioned = []
+    failed = []
+    for secret, wallet, error in results:
+        if wallet is None:
+            failed.append((secret[:6] + "...", error))
+        elif wallet[0] in secrets_key.DECRYPTED_WALLETS:
+            failed.append((wallet[0], "Already exists"))
+        else:
+            provisioned.append(wallet)
+
+    added = await _store(provisioned)
+    logger.info(f"📥 Imported {len(added)} deposit wallets ({len(failed)} rejected)")
+    return added, failed
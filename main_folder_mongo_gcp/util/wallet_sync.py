@@ -5,26 +5,15 @@ import logging
 logger = logging.getLogger(__name__)
 
 async def sync_wallets_from_secrets():
-    existing_addresses = {wallet["address"] for wallet in wallets.WALLET_LIST}
-
-    for address in secrets_key.DECRYPTED_WALLETS:
-        if address not in existing_addresses:
-            wallets.WALLET_LIST.append({
-                "address": address,
-                "status": "available"
-            })
-
-    await wallets.save_wallets()
-    logger.info("✅ WALLET SYNCED with secrets using in-memory cache")
+    added = await wallets.add_wallets(secrets_key.DECRYPTED_WALLETS)
+    logger.info(f"✅ WALLET SYNCED with secrets ({len(added)} new)")
 
 async def purge_orphan_wallets():
     valid_addresses = set(secrets_key.DECRYPTED_WALLETS)
-    before = len(wallets.WALLET_LIST)
-    wallets.WALLET_LIST[:] = [w for w in wallets.WALLET_LIST if w["address"] in valid_addresses]
-    after = len(wallets.WALLET_LIST)
-    if before != after:
-        await wallets.save_wallets()
-        logging.info(f"🧹 Purged {before - after} orphan wallets from pool.")
+    orphans = [addr for addr in wallets.get_all_addresses() if addr not in valid_addresses]
+    removed = await wallets.remove_wallets(orphans)
+    if removed:
+        logging.info(f"🧹 Purged {len(removed)} orphan wallets from pool.")
 
 def is_wallet_in_use(address: str) -> bool:
     wallet = wallets.get_wallet_by_address(address)
@@ -1,147 +1,169 @@
 import asyncio
 import logging
-from typing import Dict, List, Tuple, Any
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Any
+from pymongo import UpdateOne
 from solders.pubkey import Pubkey # type: ignore
-from solana.rpc.api import Client
-from config import SOLANA_RPC
 from telegram import Message
+from util.rpc_pool import RPC_POOL
+import storage.user_collection as user_collection
 
 
 logger = logging.getLogger(__name__)
 
+MAX_ACCOUNTS_PER_LOOKUP = 100  # getMultipleAccounts limit per request
+REQUEST_TIMEOUT = 10  # seconds
+
+# How long a cached verdict on referral.wallet_check stays trusted
+VALID_VERDICT_TTL = timedelta(days=7)
+INVALID_VERDICT_TTL = timedelta(hours=1)  # an uninitialized wallet may get funded soon
+
+SYSTEM_PROGRAM_ID = "11111111111111111111111111111111"
+TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+
+
+def _cached_verdict(data: Dict[str, Any], now: datetime) -> Optional[Dict[str, Any]]:
+    """
+    Return the stored verdict if it is for the current wallet and still fresh.
+    """
+    verdict = data.get("wallet_check")
+    if not verdict or verdict.get("address") != data["wallet_address"]:
+        return None
+
+    ttl = VALID_VERDICT_TTL if verdict.get("valid") else INVALID_VERDICT_TTL
+    try:
+        checked_at = datetime.fromisoformat(verdict["checked_at"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return verdict if now - checked_at < ttl else None
+
+
+def _classify_account(account) -> Optional[str]:
+    """
+    Return None for a plain user wallet, otherwise the rejection reason.
+    """
+    if account is None:
+        return "Address is uninitialized and ownership can't be verified"
+
+    owner = str(account.owner)
+    data_len = len(account.data) if hasattr(account.data, '__len__') else 0
+
+    if owner == TOKEN_PROGRAM_ID:
+        return "Address owned by Token Program - likely token or mint"
+    if owner != SYSTEM_PROGRAM_ID:
+        return f"Address owned by program {owner}, not System Program"
+    if data_len > 0:
+        return f"Address has {data_len} bytes of data (user wallets have none)"
+    if account.executable:
+        return "Address is executable (user wallets are not executable)"
+    return None
+
+
 async def validate_wallet_addresses(
         eligible_users: List[Tuple[str, Dict[str, Any]]],
-        status_msg: Message
-        ) -> Tuple[List[Tuple[str, Dict[str, Any]]], List[Tuple[str, str]]]:
+        status_msg: Optional[Message] = None
+        ) -> Tuple[List[Tuple[str, Dict[str, Any]]], List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """
+    Split users into (valid, invalid, unknown). Unknown users hit a lookup error
+    and should simply be retried on a later run; they get no verdict and no notice.
+    """
     valid_users = []
     invalid_users = []
+    unknown_users = []
 
     if not eligible_users:
-        return valid_users, invalid_users
-
-    client = Client(SOLANA_RPC)
-    logger.info(f"Using RPC endpoint: {SOLANA_RPC}")
-
-    BATCH_SIZE = 5
-    MAX_CONCURRENT = 5
-    REQUEST_TIMEOUT = 5  # seconds
+        return valid_users, invalid_users, unknown_users
 
-    request_semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+    now = datetime.now()
+    to_check: List[Tuple[str, Dict[str, Any], Pubkey]] = []
+    cached = 0
 
-    TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
-
-    async def validate_single_wallet(user_id: str, data: Dict[str, Any]):
+    for user_id, data in eligible_users:
         addr = data["wallet_address"]
-        logger.debug(f"Validating wallet for user {user_id}: {addr}")
 
         # Basic format validation (fast, no RPC call)
         if not (32 <= len(addr) <= 44):
             logger.warning(f"Invalid wallet format for user {user_id}: {addr}")
-            return (user_id, "Invalid wallet format"), None
+            invalid_users.append((user_id, "Invalid wallet format"))
+            continue
 
-        # Try to create a Pubkey object (fast, no RPC call)
         try:
             pubkey = Pubkey.from_string(addr)
         except Exception as e:
             logger.warning(f"Invalid base58 public key for user {user_id}: {addr} - {str(e)}")
-            return (user_id, "Invalid base58 public key"), None
-
-        # RPC call with timeout and concurrency control
-        async with request_semaphore:
-            try:
-                # Use asyncio timeout to prevent hanging
-                async with asyncio.timeout(REQUEST_TIMEOUT):
-                    logger.debug(f"Fetching account info for: {addr}")
-                    #resp = client.get_account_info(pubkey)
-                    resp = await asyncio.to_thread(client.get_account_info, pubkey)
-
-                    logger.debug(f"RPC response for {addr}: {resp}")
-
-                    if resp is None or resp.value is None:
-                        logger.warning(f"Uninitialized address: {addr} — cannot determine owner. Rejecting to be safe.")
-                        return (user_id, "Address is uninitialized and ownership can't be verified"), None
-
-                    owner = str(resp.value.owner)
-                    is_system_owned = owner == "11111111111111111111111111111111"
-                    is_token_owned = owner == TOKEN_PROGRAM_ID
-                    data_len = len(resp.value.data) if hasattr(resp.value.data, '__len__') else 0
-                    is_executable = resp.value.executable
-
-                    logger.debug(f"Wallet {addr} details: System owned: {is_system_owned}, Token owned: {is_token_owned}, Data len: {data_len}, Executable: {is_executable}")
-
-                    if is_token_owned:
-                        logger.warning(f"Address is a token mint or token account owned by the Token Program: {addr}")
-                        return (user_id, "Address owned by Token Program - likely token or mint"), None
-
-                    if is_system_owned and data_len == 0 and not is_executable:
-                        logger.info(f"Valid initialized user wallet for user {user_id}: {addr}")
-                        return None, (user_id, data)
-                    else:
-                        reason = "Not a user wallet address"
-                        if not is_system_owned:
-                            reason = f"Address owned by program {owner}, not System Program"
-                        elif data_len > 0:
-                            reason = f"Address has {data_len} bytes of data (user wallets have none)"
-                        elif is_executable:
-                            reason = "Address is executable (user wallets are not executable)"
-
-                        logger.warning(f"Invalid wallet for user {user_id}: {addr} - {reason}")
-                        return (user_id, reason), None
-
-            except asyncio.TimeoutError:
-                logger.error(f"Timeout validating wallet for user {user_id}: {addr}")
-                return (user_id, "Validation timed out"), None
-            except Exception as e:
-                logger.error(f"Error validating wallet for user {user_id}: {addr} - {str(e)}", exc_info=True)
-                return (user_id, f"Validation error: {str(e)}"), None
-
-    logger.info(f"Starting validation of {len(eligible_users)} wallets")
-
-    # Use asyncio.gather with return_exceptions=True to prevent one failure from stopping all validations
-    tasks = []
-    for user_id, data in eligible_users:
-        tasks.append(validate_single_wallet(user_id, data))
-
-    # Process in batches to avoid memory issues with too many simultaneous tasks
-    for i in range(0, len(tasks), BATCH_SIZE):
-        batch = tasks[i:i + BATCH_SIZE]
-        batch_num = i // BATCH_SIZE + 1
-        total_batches = (len(tasks) + BATCH_SIZE - 1) // BATCH_SIZE
-
-        logger.info(f"Processing batch {batch_num}/{total_batches} with {len(batch)} wallets")
-        results = await asyncio.gather(*batch, return_exceptions=True)
-
-        batch_valid = 0
-        batch_invalid = 0
-        batch_errors = 0
-
-        for result in results:
-            if isinstance(result, Exception):
-                batch_errors += 1
-                logger.error(f"Validation task threw exception: {str(result)}")
-                continue
-            
-            invalid_result, valid_result = result
-            if invalid_result:
-                invalid_users.append(invalid_result)
-                batch_invalid += 1
-            if valid_result:
-                valid_users.append(valid_result)
-                batch_valid += 1
-
-        if i % (BATCH_SIZE * 5) == 0 or i + BATCH_SIZE >= len(eligible_users):
-            await status_msg.edit_text(
-                f"⏳ Validating wallets... {min(i + BATCH_SIZE, len(eligible_users))}/{len(eligible_users)} checked"
+            invalid_users.append((user_id, "Invalid base58 public key"))
+            continue
+
+        verdict = _cached_verdict(data, now)
+        if verdict is not None:
+            cached += 1
+            if verdict["valid"]:
+                valid_users.append((user_id, data))
+            else:
+                invalid_users.append((user_id, verdict["reason"]))
+            continue
+
+        to_check.append((user_id, data, pubkey))
+
+    logger.info(f"Validating {len(eligible_users)} wallets: {cached} cached verdicts, {len(to_check)} to look up")
+
+    chunks = [
+        to_check[i:i + MAX_ACCOUNTS_PER_LOOKUP]
+        for i in range(0, len(to_check), MAX_ACCOUNTS_PER_LOOKUP)
+    ]
+    responses = await asyncio.gather(*[
+        RPC_POOL.call("get_multiple_accounts", [pubkey for _, _, pubkey in chunk], timeout=REQUEST_TIMEOUT)
+        for chunk in chunks
+    ], return_exceptions=True)
+
+    checked_at = now.isoformat()
+    verdict_updates = []
+
+    for chunk, response in zip(chunks, responses):
+        if isinstance(response, Exception):
+            # A failed batch says nothing about the wallets in it: no verdict, retry later
+            logger.error(f"Wallet lookup batch failed: {response}")
+            for user_id, _, _ in chunk:
+                unknown_users.append((user_id, f"Validation error: {str(response)}"))
+            continue
+
+        for (user_id, data, _), account in zip(chunk, response.value):
+            reason = _classify_account(account)
+            verdict = {
+                "address": data["wallet_address"],
+                "valid": reason is None,
+                "reason": reason,
+                "checked_at": checked_at
+            }
+
+            # data is the cached referral dict, so this updates USER_COLLECTION too
+            data["wallet_check"] = verdict
+            verdict_updates.append(
+                UpdateOne({"_id": user_id}, {"$set": {"referral.wallet_check": verdict}})
             )
 
-        logger.info(f"Completed batch {batch_num}/{total_batches}: {batch_valid} valid, {batch_invalid} invalid, {batch_errors} errors")
+            if reason is None:
+                valid_users.append((user_id, data))
+            else:
+                logger.warning(f"Invalid wallet for user {user_id}: {data['wallet_address']} - {reason}")
+                invalid_users.append((user_id, reason))
+
+    if verdict_updates:
+        await user_collection.bulk_update_user_fields(verdict_updates)
 
-    logger.info(f"Wallet validation complete: {len(valid_users)} valid, {len(invalid_users)} invalid")
+    if status_msg:
+        await status_msg.edit_text(
+            f"⏳ Validating wallets... {len(eligible_users)}/{len(eligible_users)} checked"
+        )
+
+    logger.info(
+        f"Wallet validation complete: {len(valid_users)} valid, {len(invalid_users)} invalid, "
+        f"{len(unknown_users)} unknown"
+    )
 
     if invalid_users:
         logger.info("Invalid wallets details:")
         for user_id, reason in invalid_users:
             logger.info(f"  User {user_id}: {reason}")
 
-    return valid_users, invalid_users
-
+    return valid_users, invalid_users, unknown_users
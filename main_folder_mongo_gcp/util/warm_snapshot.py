@@ -0,0 +1,267 @@
+# warm_snapshot.py
+# Local on-disk snapshot of the boot caches for fast /restart recovery
+
+import hashlib
+import hmac
+import logging
+import mmap
+import os
+import pickle
+import stat
+import struct
+import time
+from typing import Optional
+
+from bson import Timestamp
+
+import mongo_client
+import secrets_key as secrets_key
+import storage.history as history
+import storage.notify as notify
+import storage.payment_collection as payment_collection
+import storage.symbols as symbols
+import storage.token_collection as token_collection
+import storage.tokens as tokens
+import storage.user_collection as user_collection
+
+logger = logging.getLogger(__name__)
+
+# Kept in a 0700 directory owned by the bot user; the file itself is 0600
+SNAPSHOT_PATH = os.getenv(
+    "WARM_SNAPSHOT_PATH",
+    os.path.join(os.path.expanduser("~"), ".price_alert_bot", "warm.snapshot")
+)
+SNAPSHOT_VERSION = 2
+SNAPSHOT_MAX_AGE = 15 * 60  # seconds; older snapshots fall back to a full reload
+
+# magic, version, created_at, payload length, HMAC-SHA256 of header fields + payload
+_MAGIC = b"PABSNAP\x00"
+_HEADER = struct.Struct("<8sIdQ32s")
+
+# Collections whose changes since the snapshot are replayed on boot
+RECONCILED_COLLECTIONS = ("users", "tokens", "payments", "user_notify")
+
+
+class SnapshotInvalid(Exception):
+    pass
+
+
+# --- Integrity & Permissions ---
+def _hmac_key() -> bytes:
+    # Derived from the wallet key material, which only the bot can obtain
+    return hmac.new(secrets_key.get_key(), b"warm-snapshot", hashlib.sha256).digest()
+
+
+def _sign(version: int, created_at: float, payload) -> bytes:
+    mac = hmac.new(_hmac_key(), struct.pack("<Id", version, created_at), hashlib.sha256)
+    mac.update(payload)
+    return mac.digest()
+
+
+def _check_private(st: os.stat_result, what: str):
+    if st.st_uid != os.getuid():
+        raise SnapshotInvalid(f"{what} not owned by the bot user")
+    if st.st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+        raise SnapshotInvalid(f"{what} is accessible to other users")
+
+
+def _ensure_private_dir(path: str):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    _check_private(os.stat(directory), "snapshot directory")
+
+
+# --- Write Snapshot ---
+async def _operation_time() -> Optional[Timestamp]:
+    reply = await mongo_client.db.command("ping")
+    return reply.get("operationTime")
+
+
+async def write_snapshot() -> bool:
+    """
+    Persist the in-memory caches to SNAPSHOT_PATH. Call on clean shutdown,
+    while MongoDB is still connected (the change-stream watermark comes from it).
+    """
+    try:
+        watermark = await _operation_time()
+        if watermark is None:
+            logger.warning("⚠️ No operationTime from MongoDB; warm snapshot skipped.")
+            return False
+
+        state = {
+            "watermark": (watermark.time, watermark.inc),
+            "users": user_collection.USER_COLLECTION,
+            "token_history": history.TOKEN_DATA_HISTORY,
+            "active_token_data": history.ACTIVE_TOKEN_DATA,
+            "token_hashes": history.LAST_SAVED_HASHES,
+            "tracked_token_meta": token_collection.TRACKED_TOKEN_META,
+            "legacy_token_list": token_collection.LEGACY_TOKEN_LIST,
+            "active_tokens": token_collection.ACTIVE_TOKEN_DATA_CACHE,
+            "tracked_tokens": tokens.TRACKED_TOKENS,
+            "symbols": symbols.ADDRESS_TO_SYMBOL,
+            "payment_config": payment_collection.PAYMENT_COLLECTION,
+            "notify": notify.USER_NOTIFY_CACHE,
+        }
+        payload = pickle.dumps(state, protocol=5)
+        created_at = time.time()
+        header = _HEADER.pack(
+            _MAGIC, SNAPSHOT_VERSION, created_at, len(payload), _sign(SNAPSHOT_VERSION, created_at, payload)
+        )
+        _ensure_private_dir(SNAPSHOT_PATH)
+
+        # Write-then-rename so a crash never leaves a half-written snapshot
+        tmp_path = f"{SNAPSHOT_PATH}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(payload)
+        os.replace(tmp_path, SNAPSHOT_PATH)
+
+        logger.info(f"💾 Warm snapshot written ({len(payload)} bytes) to {SNAPSHOT_PATH}")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Failed to write warm snapshot: {e}")
+        return False
+
+
+# --- Read Snapshot ---
+def read_snapshot(path: str = SNAPSHOT_PATH) -> dict:
+    """
+    Memory-map and validate a snapshot file. Raises SnapshotInvalid on any mismatch.
+    Only a private file whose HMAC checks out is ever unpickled.
+    """
+    _check_private(os.stat(os.path.dirname(path) or "."), "snapshot directory")
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
+    with os.fdopen(fd, "rb") as f:
+        _check_private(os.fstat(f.fileno()), "snapshot file")
+        return _read_verified(f)
+
+
+def _read_verified(f) -> dict:
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if len(mm) < _HEADER.size:
+            raise SnapshotInvalid("truncated header")
+
+        magic, version, created_at, length, digest = _HEADER.unpack_from(mm, 0)
+        if magic != _MAGIC:
+            raise SnapshotInvalid("bad magic")
+        if version != SNAPSHOT_VERSION:
+            raise SnapshotInvalid(f"version {version} != {SNAPSHOT_VERSION}")
+        if time.time() - created_at > SNAPSHOT_MAX_AGE:
+            raise SnapshotInvalid("snapshot too old")
+        if len(mm) != _HEADER.size + length:
+            raise SnapshotInvalid("length mismatch")
+
+        view = memoryview(mm)[_HEADER.size:]
+        try:
+            if not hmac.compare_digest(_sign(version, created_at, view), digest):
+                raise SnapshotInvalid("signature mismatch")
+            return pickle.loads(view)
+        finally:
+            view.release()
+
+
+def _restore_caches(state: dict):
+    def refill(target: dict, source: dict):
+        target.clear()
+        target.update(source)
+
+    refill(user_collection.USER_COLLECTION, state["users"])
+    refill(history.TOKEN_DATA_HISTORY, state["token_history"])
+    refill(history.ACTIVE_TOKEN_DATA, state["active_token_data"])
+    refill(history.LAST_SAVED_HASHES, state["token_hashes"])
+    refill(token_collection.TRACKED_TOKEN_META, state["tracked_token_meta"])
+    refill(token_collection.LEGACY_TOKEN_LIST, state["legacy_token_list"])
+    token_collection.ACTIVE_TOKEN_DATA_CACHE = state["active_tokens"]
+    refill(tokens.TRACKED_TOKENS, state["tracked_tokens"])
+    refill(symbols.ADDRESS_TO_SYMBOL, state["symbols"])
+    payment_collection.PAYMENT_COLLECTION = state["payment_config"]
+    payment_collection.USER_PAYMENT_CACHE.clear()
+    notify.USER_NOTIFY_CACHE = state["notify"]
+
+
+# --- Reconcile Changes Since Snapshot ---
+def _apply_change(change: dict):
+    op = change["operationType"]
+    if op in ("drop", "rename", "dropDatabase", "invalidate"):
+        raise SnapshotInvalid(f"collection-level change: {op}")
+
+    coll = change["ns"]["coll"]
+    doc_id = change["documentKey"]["_id"]
+    doc = change.get("fullDocument")  # None for deletes or docs deleted since
+
+    if coll == "users":
+        if doc is None:
+            user_collection.USER_COLLECTION.pop(doc_id, None)
+        else:
+            user_collection.USER_COLLECTION[doc_id] = doc
+
+    elif coll == "tokens":
+        if doc is not None:
+            history.cache_token_document(doc)
+        elif doc_id == token_collection.LEGACY_TRACKED_DOC_ID:
+            token_collection.LEGACY_TOKEN_LIST.clear()
+        else:
+            history.forget_token(doc_id)
+
+    elif coll == "payments":
+        if doc_id in payment_collection.CONFIG_DOC_IDS:
+            if doc is None:
+                payment_collection.PAYMENT_COLLECTION.pop(doc_id, None)
+            else:
+                payment_collection.PAYMENT_COLLECTION[doc_id] = doc
+
+    elif coll == "user_notify":
+        if doc is None:
+            notify.USER_NOTIFY_CACHE.pop(doc_id, None)
+        else:
+            notify.USER_NOTIFY_CACHE[doc_id] = notify.notify_entry_from_doc(doc)
+
+
+async def _reconcile(watermark: tuple) -> int:
+    pipeline = [{"$match": {"ns.coll": {"$in": list(RECONCILED_COLLECTIONS)}}}]
+    applied = 0
+
+    stream = await mongo_client.db.watch(
+        pipeline,
+        start_at_operation_time=Timestamp(*watermark),
+        full_document="updateLookup",
+        max_await_time_ms=100,
+    )
+    async with stream:
+        while True:
+            change = await stream.try_next()
+            if change is None:
+                break
+            _apply_change(change)
+            applied += 1
+
+    return applied
+
+
+async def restore_from_snapshot() -> bool:
+    """
+    Restore the boot caches from a local snapshot and replay MongoDB changes made
+    since it was written. Returns False when the caller must do a full reload.
+    """
+    if not os.path.exists(SNAPSHOT_PATH):
+        return False
+
+    started = time.perf_counter()
+    try:
+        state = read_snapshot()
+        _restore_caches(state)
+        applied = await _reconcile(state["watermark"])
+    except Exception as e:
+        logger.warning(f"⚠️ Warm snapshot unusable, falling back to full reload: {e}")
+        return False
+    finally:
+        # A snapshot is only good for the restart right after it was written
+        try:
+            os.remove(SNAPSHOT_PATH)
+        except OSError:
+            pass
+
+    elapsed = (time.perf_counter() - started) * 1000
+    logger.info(f"⚡ Warm restart from snapshot: reconciled {applied} changes in {elapsed:.0f} ms")
+    return True